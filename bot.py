@@ -5,28 +5,32 @@ from aiogram.types import ParseMode
 from aiogram.utils.executor import start_webhook
 from aiohttp import ClientSession
 
-from tgbot.config import Config, load_config
+from tgbot.config import Config
+from tgbot.context import AppContext
 from tgbot.filters.admin import AdminFilter
 from tgbot.handlers.admin import register_admin_handlers
 from tgbot.handlers.commands import register_other_handlers
 from tgbot.handlers.dialog import register_dialog_handlers
 from tgbot.handlers.error import register_errors_handlers
+from tgbot.middlewares.context import ContextMiddleware
 from tgbot.middlewares.localization import i18n
 from tgbot.misc.commands import set_default_commands
+from tgbot.misc.locale_bundle import locale_bundles
 from tgbot.misc.logger import logger
 from tgbot.misc.scheduler import schedule
-from tgbot.services.database import database
 
 __all__: tuple = ()
 
 
-def _register_all_middlewares(dp: Dispatcher) -> None:
+def _register_all_middlewares(dp: Dispatcher, context: AppContext) -> None:
     """
     Registers middlewares.
 
     :param dp: Aiogram dispatcher instance.
+    :param context: Application context.
     :return: None
     """
+    dp.middleware.setup(ContextMiddleware(context=context))
     dp.middleware.setup(i18n)
 
 
@@ -59,12 +63,13 @@ def main() -> None:
 
     :return: None
     """
-    config: Config = load_config()
+    context: AppContext = AppContext()
+    config: Config = context.config
     bot: Bot = Bot(token=config.tg_bot.token, parse_mode=ParseMode.HTML)
     dp: Dispatcher = Dispatcher(bot=bot, storage=config.storage)
     bot["config"] = config
 
-    _register_all_middlewares(dp=dp)
+    _register_all_middlewares(dp=dp, context=context)
     _register_all_filters(dp=dp)
     _register_all_handlers(dp=dp)
 
@@ -75,24 +80,23 @@ def main() -> None:
         :param dp_: Aiogram dispatcher instance.
         :return: None
         """
-        await database.create_tables()
+        await context.start()
+        await locale_bundles.build()
         await set_default_commands(dp=dp_)
-        await schedule(dp=dp_)
+        await schedule(dp=dp_, context=context)
         await bot.set_webhook(
             url=f"{config.tg_bot.webhook.wh_host}/{config.tg_bot.webhook.wh_path}",
             secret_token=config.tg_bot.webhook.wh_token,
         )
 
-    async def on_shutdown(dp_: Dispatcher) -> None:
+    async def on_shutdown(dp_: Dispatcher) -> None:  # pylint: disable=unused-argument
         """
         Performs actions on bot shutdown.
 
         :param dp_: Aiogram dispatcher instance.
         :return: None
         """
-        await dp_.storage.close()
-        await dp_.storage.wait_closed()
-        await database.close()
+        await context.close()
         session: ClientSession = await bot.get_session()
         await session.close()
 
@@ -0,0 +1,71 @@
+"""Checks the states of the circuit breaker."""
+
+import pytest
+
+from tgbot.services import breaker
+from tgbot.services.breaker import CircuitBreaker
+
+
+class _Clock:
+    """Monotonic clock that is moved by the test."""
+
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    """
+    Replaces the clock of the circuit breaker.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: Clock of the circuit breaker.
+    """
+    clock: _Clock = _Clock()
+    monkeypatch.setattr(breaker, "monotonic", clock)
+    return clock
+
+
+def test_circuit_opens_after_consecutive_failures(clock: _Clock) -> None:
+    """
+    Checks that the circuit opens only after the threshold of consecutive failures.
+
+    :param clock: Clock of the circuit breaker.
+    :return: None
+    """
+    circuit: CircuitBreaker = CircuitBreaker(name="API", failure_threshold=3, recovery_timeout=30.0)
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()  # The failures are no longer consecutive
+    circuit.record_failure()
+    circuit.record_failure()
+    assert not circuit.is_open and circuit.allow_request()
+    circuit.record_failure()
+    clock.now += 29.9
+    assert circuit.is_open and not circuit.allow_request()
+
+
+def test_circuit_allows_one_trial_per_recovery_timeout(clock: _Clock) -> None:
+    """
+    Checks that the open circuit lets one trial request through after the recovery timeout, a failed trial keeps the
+    circuit open for another timeout and a successful trial closes it.
+
+    :param clock: Clock of the circuit breaker.
+    :return: None
+    """
+    circuit: CircuitBreaker = CircuitBreaker(name="API", failure_threshold=1, recovery_timeout=30.0)
+    circuit.record_failure()
+    clock.now += 30.0
+    assert circuit.allow_request()
+    assert not circuit.allow_request()  # The trial request is still in flight
+    circuit.record_failure()
+    clock.now += 29.9
+    assert not circuit.allow_request()
+    clock.now += 0.1
+    assert circuit.allow_request()
+    circuit.record_success()
+    assert not circuit.is_open
+    assert all(circuit.allow_request() for _ in range(3))
@@ -0,0 +1,162 @@
+"""Checks the pacing of Telegram requests during a broadcast."""
+
+from asyncio import Future, Task, create_task, gather, get_running_loop, run
+from asyncio import sleep as real_sleep
+from collections.abc import Coroutine, Iterator
+from heapq import heappop, heappush
+from itertools import count
+from typing import Any, TypeVar
+
+import pytest
+from aiogram.utils.exceptions import RetryAfter
+
+from tgbot.services import broadcast, ratelimit
+from tgbot.services.broadcast import BroadcastLimiter
+
+_Result = TypeVar("_Result")
+
+
+class _Clock:
+    """
+    Monotonic clock of virtual time: the waits do not take real time, the clock jumps to the end of the earliest wait
+    once the other tasks are waiting as well.
+    """
+
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+        self._waits: list[tuple[float, int, Future[None]]] = []  # Heap of the ends of the waits
+        self._order: Iterator[int] = count()
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        """
+        Waits until the clock reaches the end of the delay.
+
+        Like the real clock, the clock always moves forward, even if the delay is lost in the rounding of the time.
+
+        :param delay: Time in seconds.
+        :return: None
+        """
+        waiter: Future[None] = get_running_loop().create_future()
+        heappush(self._waits, (self.now + max(delay, 1e-6), next(self._order), waiter))
+        await waiter
+
+    async def drive(self, coro: Coroutine[Any, Any, _Result]) -> _Result:
+        """
+        Runs the coroutine, moving the clock whenever all of its tasks are waiting.
+
+        :param coro: Coroutine to run.
+        :return: Result of the coroutine.
+        """
+        task: Task[_Result] = create_task(coro)
+        while not task.done():
+            for _ in range(10):  # Lets the woken tasks run up to their next wait
+                await real_sleep(0)
+            if self._waits and not task.done():
+                wakes_at, _, waiter = heappop(self._waits)
+                self.now = max(self.now, wakes_at)
+                waiter.set_result(None)
+        return task.result()
+
+
+class _Requests:
+    """Telegram requests that are limited by flood control a given number of times."""
+
+    def __init__(self, clock: _Clock, failures: int) -> None:
+        self._clock: _Clock = clock
+        self._failures: int = failures
+        self.times: list[float] = []  # Times of the requests
+
+    async def send(self) -> str:
+        """
+        Makes the request.
+
+        :return: Result of the request.
+        :raises RetryAfter: While the failures of the request are not exhausted.
+        """
+        self.times.append(self._clock.now)
+        if self._failures:
+            self._failures -= 1
+            raise RetryAfter(5)
+        return "sent"
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    """
+    Replaces the clocks and the waits of the limiter and its token bucket.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: Clock of the limiter.
+    """
+    clock: _Clock = _Clock()
+    for module in (broadcast, ratelimit):
+        monkeypatch.setattr(module, "monotonic", clock)
+        monkeypatch.setattr(module, "sleep", clock.sleep)
+    return clock
+
+
+def test_retry_after_pauses_and_slows_down(clock: _Clock) -> None:
+    """
+    Checks that a RetryAfter error pauses the requests for the requested time, halves the rate and the request is
+    repeated, then the rate is restored step by step with the successful requests.
+
+    :param clock: Clock of the limiter.
+    :return: None
+    """
+    limiter: BroadcastLimiter = BroadcastLimiter(rate=20, chat_interval=1)
+    requests: _Requests = _Requests(clock=clock, failures=1)
+    assert run(clock.drive(limiter.call(chat_id=1, func=requests.send))) == "sent"
+    assert requests.times[1] - requests.times[0] >= 5
+    assert limiter.rate == pytest.approx(10 + 20 / 200)
+
+    async def send_to_other_chats(number: int) -> None:
+        for chat_id in range(2, 2 + number):
+            await limiter.call(chat_id=chat_id, func=_Requests(clock=clock, failures=0).send)
+
+    run(clock.drive(send_to_other_chats(number=98)))
+    assert limiter.rate == pytest.approx(19.9)
+    run(clock.drive(send_to_other_chats(number=10)))
+    assert limiter.rate == 20
+
+
+def test_retry_after_gives_up_after_the_retries(clock: _Clock) -> None:
+    """
+    Checks that the error is raised when Telegram still limits the requests after all retries, and that the rate is
+    not slowed down below its minimum share.
+
+    :param clock: Clock of the limiter.
+    :return: None
+    """
+    limiter: BroadcastLimiter = BroadcastLimiter(rate=20, chat_interval=1)
+    requests: _Requests = _Requests(clock=clock, failures=10)
+    with pytest.raises(RetryAfter):
+        run(clock.drive(limiter.call(chat_id=1, func=requests.send)))
+    assert len(requests.times) == 4
+    assert limiter.rate == pytest.approx(2)
+
+
+def test_messages_to_one_chat_are_spaced_out(clock: _Clock) -> None:
+    """
+    Checks that the messages to the same chat keep the interval, while the other requests only keep the rate.
+
+    :param clock: Clock of the limiter.
+    :return: None
+    """
+    limiter: BroadcastLimiter = BroadcastLimiter(rate=10, chat_interval=1)
+    messages: _Requests = _Requests(clock=clock, failures=0)
+    deletions: _Requests = _Requests(clock=clock, failures=0)
+
+    async def send() -> None:
+        await gather(
+            *(limiter.call(chat_id=1, func=messages.send) for _ in range(3)),
+            *(limiter.call(chat_id=1, func=deletions.send, is_message=False) for _ in range(3)),
+        )
+
+    run(clock.drive(send()))
+    assert all(later - earlier >= 1 for earlier, later in zip(messages.times, messages.times[1:]))
+    times: list[float] = sorted(messages.times + deletions.times)
+    assert all(later - earlier >= 0.1 - 1e-9 for earlier, later in zip(times, times[1:]))
+    assert max(deletions.times) - min(deletions.times) < 1
@@ -0,0 +1,69 @@
+"""Checks the eviction and expiry of the in-memory cache."""
+
+import pytest
+
+from tgbot.services import cache
+from tgbot.services.cache import CacheStats, LRUCache
+
+
+class _Clock:
+    """Monotonic clock that is moved by the test."""
+
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    """
+    Replaces the clock of the cache.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: Clock of the cache.
+    """
+    clock: _Clock = _Clock()
+    monkeypatch.setattr(cache, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_their_lifetime(clock: _Clock) -> None:
+    """
+    Checks that an entry is returned until its lifetime ends, then it is removed, and that saving it again renews it.
+
+    :param clock: Clock of the cache.
+    :return: None
+    """
+    lru: LRUCache[str] = LRUCache(maxsize=10, ttl=60.0)
+    lru.set(key="a", value="A")
+    clock.now += 30.0
+    lru.set(key="b", value="B")
+    clock.now += 29.9
+    assert lru.get(key="a") == "A"
+    clock.now += 0.1
+    assert lru.get(key="a") is None and lru.get(key="b") == "B"
+    lru.set(key="a", value="A2")
+    clock.now += 59.9
+    assert lru.get(key="a") == "A2" and lru.get(key="b") is None
+    assert lru.stats == CacheStats(hits=3, misses=2, size=1, maxsize=10)
+
+
+def test_least_recently_used_entries_are_evicted(clock: _Clock) -> None:
+    """
+    Checks that a full cache evicts the entry that has not been used for the longest time, and that entries without
+    a lifetime do not expire.
+
+    :param clock: Clock of the cache.
+    :return: None
+    """
+    lru: LRUCache[int] = LRUCache(maxsize=2)
+    lru.set(key="a", value=1)
+    lru.set(key="b", value=2)
+    assert lru.get(key="a") == 1
+    lru.set(key="c", value=3)
+    clock.now += 10**9
+    assert lru.get(key="b") is None
+    assert (lru.get(key="a"), lru.get(key="c")) == (1, 3)
+    assert lru.stats.size == 2
@@ -0,0 +1,97 @@
+"""Checks the shutdown of the application context."""
+
+from asyncio import run
+from typing import NamedTuple, cast
+
+import pytest
+
+from tgbot.config import Config
+from tgbot.context import AppContext
+from tgbot.services.database import Database
+from tgbot.services.weather import WeatherAPI
+
+
+class _Resource:
+    """Resource that records its closing and can fail to save the data or to close."""
+
+    def __init__(self, name: str, closed: list[str], fail_flush: bool = False, fail_close: bool = False) -> None:
+        self._name: str = name
+        self._closed: list[str] = closed
+        self._fail_flush: bool = fail_flush
+        self._fail_close: bool = fail_close
+
+    async def flush_api_counters(self) -> None:
+        """
+        Saves the pending data.
+
+        :return: None
+        :raises ConnectionError: If the resource fails to save the data.
+        """
+        if self._fail_flush:
+            raise ConnectionError("flush")
+
+    async def close(self) -> None:
+        """
+        Closes the resource.
+
+        :return: None
+        :raises ConnectionError: If the resource fails to close.
+        """
+        self._closed.append(self._name)
+        if self._fail_close:
+            raise ConnectionError("close")
+
+    async def aclose(self) -> None:
+        """
+        Closes the resource as a Redis client does.
+
+        :return: None
+        """
+        await self.close()
+
+
+class _Config(NamedTuple):
+    """Config with the Redis client only."""
+
+    redis: _Resource
+
+
+def _get_context(closed: list[str], fail_flush: bool, fail_close: bool) -> AppContext:
+    """
+    Returns the application context with created services.
+
+    :param closed: List that receives the names of the closed resources.
+    :param fail_flush: Whether the database fails to save the pending data.
+    :param fail_close: Whether the database fails to close.
+    :return: Application context.
+    """
+    return AppContext(
+        config=cast(Config, _Config(redis=_Resource(name="redis", closed=closed))),
+        database=cast(
+            Database, _Resource(name="database", closed=closed, fail_flush=fail_flush, fail_close=fail_close)
+        ),
+        weather=cast(WeatherAPI, _Resource(name="weather", closed=closed)),
+    )
+
+
+def test_close_after_failed_flush() -> None:
+    """
+    Checks that all resources are closed when the pending data could not be saved, and the error is raised.
+
+    :return: None
+    """
+    closed: list[str] = []
+    with pytest.raises(ConnectionError, match="flush"):
+        run(_get_context(closed=closed, fail_flush=True, fail_close=False).close())
+    assert closed == ["database", "weather", "redis"]
+
+
+def test_close_after_failed_close() -> None:
+    """
+    Checks that the failure to close a resource does not prevent closing the other ones.
+
+    :return: None
+    """
+    closed: list[str] = []
+    run(_get_context(closed=closed, fail_flush=False, fail_close=True).close())
+    assert closed == ["database", "weather", "redis"]
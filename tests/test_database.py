@@ -0,0 +1,225 @@
+"""Checks the queries of the database service against an in-memory connection pool."""
+
+from asyncio import run
+from collections.abc import Generator
+from typing import Any, cast
+
+import pytest
+
+from tgbot.config import DbPoolParams
+from tgbot.services import database
+from tgbot.services.database import Database, User
+from tgbot.services.user_cache import UserCache
+
+_POOL_PARAMS: DbPoolParams = DbPoolParams(
+    min_size=2, max_size=2, max_inactive_connection_lifetime=300.0, statement_cache_size=100
+)
+
+
+class _FakeConnection:
+    """Connection that answers the dialog id queries and fails when it is used outside of a checkout."""
+
+    def __init__(self, dialog_ids: dict[int, int], units: dict[int, str | None] | None = None) -> None:
+        self.dialog_ids: dict[int, int] = dialog_ids
+        self.units: dict[int, str | None] = units or {}  # Measurement units of the users, None if not set up
+        self.queries: list[tuple[str, tuple[Any, ...]]] = []
+        self.checked_out: bool = False
+
+    async def fetchrow(self, query: str, *args: Any) -> dict[str, int] | None:
+        """
+        Returns the dialog id of the user whose id is the first argument of the query.
+
+        :param query: The database query.
+        :param args: Positional arguments for the query.
+        :return: Row with the dialog id or None if there is no such user.
+        """
+        assert self.checked_out, "The connection is used after it was released to the pool"
+        self.queries.append((query, args))
+        dialog_id: int | None = self.dialog_ids.get(args[0])
+        return {"dialog_id": dialog_id} if dialog_id is not None else None
+
+    async def fetch(self, query: str, *args: Any) -> list[dict[str, Any]]:
+        """
+        Returns a page of the set up users in the order of their ids, as the query of the users does.
+
+        :param query: The database query.
+        :param args: The last user id of the previous page and the page size.
+        :return: Rows of the users.
+        """
+        assert self.checked_out, "The connection is used after it was released to the pool"
+        self.queries.append((query, args))
+        last_id, limit = args
+        user_ids: list[int] = sorted(
+            user_id for user_id, units in self.units.items() if units is not None and user_id > last_id
+        )
+        return [
+            {
+                "id": user_id,
+                "dialog_id": self.dialog_ids[user_id],
+                "lang": "en",
+                "city": "City",
+                "latitude": 0.0,
+                "longitude": 0.0,
+                "units": self.units[user_id],
+            }
+            for user_id in user_ids[:limit]
+        ]
+
+
+class _FakeAcquireContext:
+    """Result of pool.acquire() that can be awaited or used as an asynchronous context manager, as in asyncpg."""
+
+    def __init__(self, pool: "_FakePool") -> None:
+        self._pool: _FakePool = pool
+        self._conn: _FakeConnection | None = None
+
+    def __await__(self) -> Generator[Any, None, _FakeConnection]:
+        return self._pool.checkout().__await__()
+
+    async def __aenter__(self) -> _FakeConnection:
+        self._conn = await self._pool.checkout()
+        return self._conn
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        assert self._conn is not None
+        await self._pool.release(self._conn)
+
+
+class _FakePool:
+    """Pool that hands out its connections in turn."""
+
+    def __init__(self, connections: list[_FakeConnection]) -> None:
+        self.connections: list[_FakeConnection] = connections
+        self._checkouts: int = 0
+
+    def get_min_size(self) -> int:
+        """
+        Returns the number of connections of the pool.
+
+        :return: Number of connections.
+        """
+        return len(self.connections)
+
+    async def checkout(self) -> _FakeConnection:
+        """
+        Hands out the next connection.
+
+        :return: Connection.
+        """
+        conn: _FakeConnection = self.connections[self._checkouts % len(self.connections)]
+        self._checkouts += 1
+        conn.checked_out = True
+        return conn
+
+    def acquire(self) -> _FakeAcquireContext:
+        """
+        Returns the context of acquiring a connection.
+
+        :return: Acquire context.
+        """
+        return _FakeAcquireContext(pool=self)
+
+    async def release(self, conn: _FakeConnection) -> None:
+        """
+        Takes the connection back.
+
+        :param conn: Connection.
+        :return: None
+        """
+        conn.checked_out = False
+
+
+class _MissingUserCache:
+    """User cache that never has the user."""
+
+    async def get_dialog_id(self, user_id: int) -> None:  # pylint: disable=unused-argument
+        """
+        Misses the user.
+
+        :param user_id: Telegram user id.
+        :return: None
+        """
+        return None
+
+    async def update(self, user_id: int, fields: dict[str, Any]) -> None:
+        """
+        Drops the user fields.
+
+        :param user_id: Telegram user id.
+        :param fields: Values of the user fields by their names.
+        :return: None
+        """
+
+
+def _get_database(monkeypatch: pytest.MonkeyPatch, pool: _FakePool) -> Database:
+    """
+    Returns the database service that works with the pool.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :param pool: Connection pool.
+    :return: Database service.
+    """
+
+    async def create_pool(**_: Any) -> _FakePool:
+        return pool
+
+    monkeypatch.setattr(database, "create_pool", create_pool)
+    return Database(db_dsn="", pool_params=_POOL_PARAMS, user_cache=cast(UserCache, _MissingUserCache()))
+
+
+def test_dialog_id_query_after_warm_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Checks that the dialog id query runs on each connection during the warm-up and then again through the pool after
+    the connections have been released.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: None
+    """
+    connections: list[_FakeConnection] = [_FakeConnection(dialog_ids={1: 10, 2: 20}) for _ in range(2)]
+    db: Database = _get_database(monkeypatch=monkeypatch, pool=_FakePool(connections=connections))
+
+    async def run_queries() -> list[int | None]:
+        await db.start()
+        return [await db.get_dialog_id_if_exists(user_id=user_id) for user_id in (1, 2, 3)]
+
+    assert run(run_queries()) == [10, 20, None]
+    assert all(not conn.checked_out for conn in connections)
+    queries: list[str] = [query for conn in connections for query, _ in conn.queries]
+    assert len(queries) == 5 and len(set(queries)) == 1
+    assert all(len(conn.queries) >= 2 for conn in connections)
+
+
+@pytest.mark.parametrize(
+    ("chunk_size", "chunks", "queries"),
+    [
+        (2, [[1, 2], [3, 5], [6]], 3),  # The last partial page ends the paging without another query
+        (5, [[1, 2, 3, 5, 6]], 2),  # A full last page is followed by an empty one
+        (10, [[1, 2, 3, 5, 6]], 1),
+    ],
+)
+def test_users_are_read_by_pages(
+    monkeypatch: pytest.MonkeyPatch, chunk_size: int, chunks: list[list[int]], queries: int
+) -> None:
+    """
+    Checks that the set up users are read in pages that continue after the last user id of the previous page.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :param chunk_size: Number of users in a page.
+    :param chunks: Expected user ids of the pages.
+    :param queries: Expected number of queries.
+    :return: None
+    """
+    units: dict[int, str | None] = {6: "imperial", 2: "metric", 1: "metric", 4: None, 5: "metric", 3: "imperial"}
+    conn: _FakeConnection = _FakeConnection(dialog_ids={user_id: user_id * 10 for user_id in units}, units=units)
+    db: Database = _get_database(monkeypatch=monkeypatch, pool=_FakePool(connections=[conn]))
+
+    async def read_users() -> list[list[User]]:
+        return [batch async for batch in db.iter_users(chunk_size=chunk_size)]
+
+    batches: list[list[User]] = run(read_users())
+    assert [[user.id for user in batch] for batch in batches] == chunks
+    assert all(user.dialog_id == user.id * 10 and user.settings.units == units[user.id] for user in batches[0])
+    assert [args for _, args in conn.queries] == [
+        (-(2**63), chunk_size),
+        *((batch[-1].id, chunk_size) for batch in batches[: queries - 1]),
+    ]
@@ -0,0 +1,31 @@
+"""Checks the command line arguments of the encoder benchmark."""
+
+from argparse import Namespace
+
+import pytest
+
+from tgbot.misc.encoder_benchmark import _parse_args
+
+
+@pytest.mark.parametrize("option", ["--images", "--rounds"])
+@pytest.mark.parametrize("value", ["0", "-1", "two"])
+def test_invalid_counts_are_rejected(option: str, value: str) -> None:
+    """
+    Checks that the number of images and rounds must be positive integers.
+
+    :param option: Command line option.
+    :param value: Invalid value of the option.
+    :return: None
+    """
+    with pytest.raises(SystemExit):
+        _parse_args([option, value])
+
+
+def test_valid_counts_are_accepted() -> None:
+    """
+    Checks the parsing of valid numbers of images and rounds.
+
+    :return: None
+    """
+    args: Namespace = _parse_args(["--images", "5", "--rounds", "1", "--seed", "-3"])
+    assert (args.images, args.rounds, args.seed) == (5, 1, -3)
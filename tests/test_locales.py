@@ -0,0 +1,33 @@
+"""Checks that the translation files match the strings marked for translation in the code."""
+
+from pathlib import Path
+
+import pytest
+from babel.messages.extract import extract_from_dir
+from babel.messages.pofile import read_po
+
+_PACKAGE_DIR: Path = Path(__file__).parent.parent / "tgbot"
+_LOCALES_DIR: Path = _PACKAGE_DIR / "locales"
+
+
+def _get_extracted_messages() -> set[str]:
+    """
+    Returns the strings that pybabel extracts from the code.
+
+    :return: Message ids.
+    """
+    return {message for _, _, message, _, _ in extract_from_dir(dirname=_PACKAGE_DIR) if isinstance(message, str)}
+
+
+@pytest.mark.parametrize("lang_code", sorted(path.name for path in _LOCALES_DIR.iterdir() if path.is_dir()))
+def test_translation_file_matches_code(lang_code: str) -> None:
+    """
+    Checks that the translation file has all strings marked in the code, and only them, and all of them are translated.
+
+    :param lang_code: Language code.
+    :return: None
+    """
+    with open(_LOCALES_DIR / lang_code / "LC_MESSAGES" / "tgbot.po", "rb") as po_file:
+        catalog = read_po(po_file)
+    assert {message.id for message in catalog if message.id} == _get_extracted_messages()
+    assert all(message.string and not message.fuzzy for message in catalog if message.id)
@@ -0,0 +1,162 @@
+"""Checks the distribution of requests within the rate limit and the monthly budget."""
+
+from asyncio import Event, Task, create_task, gather, run
+from asyncio import sleep as real_sleep
+
+import pytest
+
+from tgbot.services import ratelimit
+from tgbot.services.quota import Priority, QuotaExceeded, QuotaGovernor
+from tgbot.services.ratelimit import TokenBucket
+
+
+class _Clock:
+    """Monotonic clock that is moved by the waits of the token bucket instead of real time."""
+
+    def __init__(self) -> None:
+        self.now: float = 1000.0
+        self.frozen: Event | None = None  # If set, the waits last until the event is set
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        """
+        Moves the clock by the delay and lets the other tasks run.
+
+        :param delay: Time in seconds.
+        :return: None
+        """
+        if self.frozen is not None:
+            await self.frozen.wait()
+        self.now += delay
+        await real_sleep(0)
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    """
+    Replaces the clock and the waits of the token bucket.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: Clock of the token bucket.
+    """
+    clock: _Clock = _Clock()
+    monkeypatch.setattr(ratelimit, "monotonic", clock)
+    monkeypatch.setattr(ratelimit, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.mark.usefixtures("clock")
+def test_bucket_keeps_the_reserve() -> None:
+    """
+    Checks that the tokens are taken down to the reserve of the caller.
+
+    :return: None
+    """
+    bucket: TokenBucket = TokenBucket(rate=1, capacity=10)
+    assert sum(bucket.try_acquire(reserve=2) for _ in range(10)) == 8
+    assert sum(bucket.try_acquire() for _ in range(10)) == 2
+
+
+def test_bucket_serves_the_smaller_reserve_first(clock: _Clock) -> None:
+    """
+    Checks that a caller without a reserve gets a token before a caller with a reserve that started waiting earlier.
+
+    :param clock: Clock of the token bucket.
+    :return: None
+    """
+    bucket: TokenBucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire() and bucket.try_acquire()
+    served: list[str] = []
+
+    async def acquire(name: str, reserve: float) -> None:
+        await bucket.acquire(reserve=reserve)
+        served.append(name)
+
+    async def run_callers() -> None:
+        await gather(acquire(name="scheduled", reserve=1), acquire(name="interactive", reserve=0))
+
+    run(run_callers())
+    assert served == ["interactive", "scheduled"]
+    assert clock.now == pytest.approx(1003.0)
+
+
+def _get_governor(monthly_budget: int, calls_per_minute: int = 6000) -> QuotaGovernor:
+    """
+    Returns the governor of a single API token.
+
+    :param monthly_budget: Maximum number of requests per month.
+    :param calls_per_minute: Maximum number of requests per minute.
+    :return: QuotaGovernor object.
+    """
+    return QuotaGovernor(
+        tokens=("token",), calls_per_minute=calls_per_minute, monthly_budget=monthly_budget, reserve=0.2
+    )
+
+
+@pytest.mark.usefixtures("clock")
+def test_scheduled_requests_leave_the_reserved_budget() -> None:
+    """
+    Checks that the scheduled requests do not spend the share of the budget reserved for interactive requests.
+
+    :return: None
+    """
+    governor: QuotaGovernor = _get_governor(monthly_budget=10)
+
+    async def spend(priority: Priority) -> int:
+        spent: int = 0
+        try:
+            while True:
+                await governor.acquire(priority=priority)
+                spent += 1
+        except QuotaExceeded:
+            return spent
+
+    assert run(spend(priority=Priority.SCHEDULED)) == 8
+    assert run(spend(priority=Priority.INTERACTIVE)) == 2
+
+
+@pytest.mark.usefixtures("clock")
+def test_waiting_requests_stay_within_the_budget() -> None:
+    """
+    Checks that the requests waiting for the rate limit at the same time are counted against the budget.
+
+    :return: None
+    """
+    governor: QuotaGovernor = _get_governor(monthly_budget=3, calls_per_minute=1)
+
+    async def acquire_all() -> list[BaseException | str]:
+        return list(
+            await gather(*(governor.acquire(priority=Priority.INTERACTIVE) for _ in range(5)), return_exceptions=True)
+        )
+
+    results: list[BaseException | str] = run(acquire_all())
+    assert results.count("token") == 3
+    assert sum(isinstance(result, QuotaExceeded) for result in results) == 2
+
+
+def test_cancelled_request_returns_the_budget(clock: _Clock) -> None:
+    """
+    Checks that a request cancelled while it waits for the rate limit is not counted against the budget.
+
+    :param clock: Clock of the token bucket.
+    :return: None
+    """
+    governor: QuotaGovernor = _get_governor(monthly_budget=2, calls_per_minute=1)
+    clock.frozen = Event()
+
+    async def cancel_and_acquire() -> bool:
+        await governor.acquire(priority=Priority.INTERACTIVE)
+        waiting: Task[str] = create_task(governor.acquire(priority=Priority.INTERACTIVE))
+        await real_sleep(0)
+        waiting.cancel()
+        await gather(waiting, return_exceptions=True)
+        next_request: Task[str] = create_task(governor.acquire(priority=Priority.INTERACTIVE))
+        await real_sleep(0)
+        allowed: bool = not next_request.done()  # It waits for the rate limit instead of exceeding the budget
+        next_request.cancel()
+        await gather(next_request, return_exceptions=True)
+        return allowed
+
+    assert run(cancel_and_acquire())
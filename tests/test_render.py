@@ -0,0 +1,180 @@
+"""Checks the rendering of forecast images in the bot process."""
+
+from asyncio import gather, run
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from random import Random
+from typing import Any
+
+import pytest
+
+from tgbot.config import CacheParams, RenderParams
+from tgbot.misc.encoder_benchmark import _generate_forecast
+from tgbot.services import render
+from tgbot.services.cache import CacheStats
+from tgbot.services.classes import ForecastData, ForecastImage
+from tgbot.services.image import TileCacheStats
+from tgbot.services.render import ForecastRenderer, _draw_images, _get_drawer
+
+_PARAMS: RenderParams = RenderParams(
+    workers=0, encoder="png", image_cache=CacheParams(maxsize=10, ttl=60.0), tile_cache_size=5
+)
+
+
+class _FakeDrawer:
+    """Drawer that encodes the content hash of the forecast instead of drawing it."""
+
+    created: int = 0
+    drawn: list[str] = []  # Content hashes of the drawn forecasts
+
+    def __init__(self, encoder: str, tile_cache_size: int) -> None:
+        self.encoder: str = encoder
+        self.tile_cache_size: int = tile_cache_size
+        _FakeDrawer.created += 1
+
+    @staticmethod
+    def draw_image(data: ForecastData) -> bytes:
+        """
+        Returns the content hash of the forecast as the image.
+
+        :param data: Weather forecast data.
+        :return: Encoded image.
+        """
+        _FakeDrawer.drawn.append(data.content_hash)
+        return data.content_hash.encode()
+
+    @property
+    def tile_cache_stats(self) -> TileCacheStats:
+        """
+        Returns the statistics of the forecast columns cache with a single column.
+
+        :return: Statistics as TileCacheStats object.
+        """
+        return TileCacheStats(cache=CacheStats(hits=0, misses=1, size=1, maxsize=self.tile_cache_size), memory=0)
+
+
+@pytest.fixture(name="fake_drawer")
+def fixture_fake_drawer(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """
+    Replaces the drawer with the fake one and clears the drawer of the process.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: Iterator that clears the drawer of the process after the test.
+    """
+    monkeypatch.setattr(render, "DrawWeatherImage", _FakeDrawer)
+    monkeypatch.setattr(_FakeDrawer, "created", 0)
+    monkeypatch.setattr(_FakeDrawer, "drawn", [])
+    _get_drawer.cache_clear()
+    yield
+    _get_drawer.cache_clear()
+
+
+@pytest.mark.usefixtures("fake_drawer")
+def test_drawer_is_reused_after_warm_up() -> None:
+    """
+    Checks that the drawer created when the renderer starts is the one that draws the images.
+
+    :return: None
+    """
+    run(ForecastRenderer(params=_PARAMS).start())
+    _draw_images([], _PARAMS.encoder, _PARAMS.tile_cache_size)
+    assert _get_drawer.cache_info().hits == 1 and _get_drawer.cache_info().misses == 1
+    assert _FakeDrawer.created == 1
+
+
+@pytest.mark.usefixtures("fake_drawer")
+def test_drawer_is_reused_after_process_initializer() -> None:
+    """
+    Checks that the drawer created by the initializer of a rendering process is the one that draws the images.
+
+    :return: None
+    """
+    _get_drawer(_PARAMS.encoder, _PARAMS.tile_cache_size)
+    _draw_images([], _PARAMS.encoder, _PARAMS.tile_cache_size)
+    assert _get_drawer.cache_info().hits == 1 and _get_drawer.cache_info().misses == 1
+    assert _FakeDrawer.created == 1
+
+
+class _FakeProcessPool(ThreadPoolExecutor):
+    """Pool of rendering threads that stands in for the pool of processes and can be broken."""
+
+    generation: int = 0  # Number of pools created, the threads of each pool report it in their process id
+
+    def __init__(
+        self,
+        max_workers: int,
+        mp_context: Any,  # pylint: disable=unused-argument
+        initializer: Callable[..., Any],
+        initargs: tuple[Any, ...],
+    ) -> None:
+        super().__init__(max_workers=max_workers, initializer=initializer, initargs=initargs)
+        _FakeProcessPool.generation += 1
+        self.broken: bool = False
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future[Any]:
+        """
+        Schedules the call, unless the pool is broken.
+
+        :param fn: Function to call.
+        :param args: Positional arguments of the function.
+        :param kwargs: Keyword arguments of the function.
+        :return: Future of the result.
+        :raises BrokenProcessPool: If the pool is broken.
+        """
+        if self.broken:
+            raise BrokenProcessPool("A process in the pool was terminated abruptly")
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.mark.usefixtures("fake_drawer")
+def test_tile_stats_of_stopped_processes_are_dropped(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Checks that only the processes of the current pool are counted in the statistics of the columns caches after the
+    pool has been restarted and after it has been stopped.
+
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: None
+    """
+    monkeypatch.setattr(render, "ProcessPoolExecutor", _FakeProcessPool)
+    monkeypatch.setattr(_FakeProcessPool, "generation", 0)
+    monkeypatch.setattr(render, "getpid", lambda: 1000 + _FakeProcessPool.generation)
+    renderer: ForecastRenderer = ForecastRenderer(params=_PARAMS._replace(workers=1))
+    rng: Random = Random(0)
+
+    async def render_after_restart() -> None:
+        await renderer.start()
+        await renderer.get_image(data=_generate_forecast(rng=rng, units="metric"))
+        assert renderer.tile_cache_stats.cache.size == 1
+        pool: Any = getattr(renderer, "_pool")
+        pool.broken = True
+        await renderer.get_image(data=_generate_forecast(rng=rng, units="imperial"))
+
+    try:
+        run(render_after_restart())
+        assert _FakeProcessPool.generation == 2
+        assert renderer.tile_cache_stats.cache.size == 1
+    finally:
+        renderer.close()
+    assert renderer.tile_cache_stats.cache.size == 0
+
+
+@pytest.mark.usefixtures("fake_drawer")
+def test_images_in_flight_are_drawn_once() -> None:
+    """
+    Checks that the images requested at the same time for a single user and for a batch of users are drawn once.
+
+    :return: None
+    """
+    rng: Random = Random(0)
+    forecasts: list[ForecastData] = [_generate_forecast(rng=rng, units="metric") for _ in range(3)]
+    renderer: ForecastRenderer = ForecastRenderer(params=_PARAMS)
+
+    async def get_images() -> tuple[ForecastImage, list[ForecastImage]]:
+        await renderer.start()
+        return await gather(renderer.get_image(data=forecasts[0]), renderer.get_images(batch=forecasts + forecasts))
+
+    image, images = run(get_images())
+    assert sorted(_FakeDrawer.drawn) == sorted(data.content_hash for data in forecasts)
+    assert image.image == forecasts[0].content_hash.encode()
+    assert [item.image for item in images] == [data.content_hash.encode() for data in forecasts + forecasts]
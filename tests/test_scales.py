@@ -0,0 +1,181 @@
+"""Checks that the scale tables match the emoji and color ladders they replaced."""
+
+import pytest
+
+from tgbot.services.scales import ScaleColors, get_temp_colors, get_weather_emoji, get_wind_colors
+
+# region The ladders used before the scale tables, kept as they were
+
+
+def _get_weather_emoji(weather_code: int) -> str:
+    """
+    Returns emoji by weather code from OpenWeatherMap.
+
+    :param weather_code: Weather code.
+    :return: Corresponding emoji.
+    """
+    if weather_code in (800,):  # clear
+        weather_emoji: str = "☀"
+    elif weather_code in (801,):  # light clouds
+        weather_emoji = "🌤"
+    elif weather_code in (803, 804):  # clouds
+        weather_emoji = "🌥"
+    elif weather_code in (802,):  # scattered clouds
+        weather_emoji = "☁"
+    elif weather_code in (500, 501, 502, 503, 504):  # rain
+        weather_emoji = "🌦"
+    elif weather_code in (300, 301, 302, 310, 311, 312, 313, 314, 321, 520, 521, 522, 531):  # drizzle
+        weather_emoji = "🌧"
+    elif weather_code in (200, 201, 202, 210, 211, 212, 221, 230, 231, 232):  # thunderstorm
+        weather_emoji = "⛈"
+    elif weather_code in (511, 600, 601, 602, 611, 612, 613, 615, 616, 620, 621, 622):  # snow
+        weather_emoji = "🌨"
+    elif weather_code in (701, 711, 721, 731, 741, 751, 761, 762, 771, 781):  # atmosphere
+        weather_emoji = "🌫"
+    else:  # default
+        weather_emoji = "🌀"
+    return weather_emoji
+
+
+def _get_temp_color(temp: int) -> str:  # pylint: disable=too-many-branches
+    """
+    Returns the color code, depending on the temperature value.
+
+    :param temp: Temperature in Celsius.
+    :return: Temperature color code.
+    """
+    if temp >= 50:
+        temp_color: str = "#2b0001"
+    elif 49 >= temp >= 40:
+        temp_color = "#6b1527"
+    elif 39 >= temp >= 30:
+        temp_color = "#b73466"
+    elif 29 >= temp >= 25:
+        temp_color = "#db6c54"
+    elif 24 >= temp >= 20:
+        temp_color = "#e09f41"
+    elif 19 >= temp >= 15:
+        temp_color = "#e1ce39"
+    elif 14 >= temp >= 10:
+        temp_color = "#b8db41"
+    elif 9 >= temp >= 5:
+        temp_color = "#5ac84b"
+    elif 4 >= temp >= 0:
+        temp_color = "#4db094"
+    elif -1 >= temp >= -5:
+        temp_color = "#4178be"
+    elif -6 >= temp >= -10:
+        temp_color = "#5751ac"
+    elif -11 >= temp >= -15:
+        temp_color = "#291e6a"
+    elif -16 >= temp >= -20:
+        temp_color = "#8e108e"
+    elif -21 >= temp >= -30:
+        temp_color = "#f3a5f3"
+    else:
+        temp_color = "#e3e3e3"
+    return temp_color
+
+
+def _get_wind_color(speed: int) -> str:  # pylint: disable=too-many-branches
+    """
+    Returns the color code, depending on the wind speed value.
+
+    :param speed: Wind speed in meters per second.
+    :return: Wind speed color code.
+    """
+    if 0 <= speed <= 9:
+        wind_speed_color: str = "#5a5673"
+    elif 10 <= speed <= 19:
+        wind_speed_color = "#5258ab"
+    elif 20 <= speed <= 29:
+        wind_speed_color = "#4083b8"
+    elif 30 <= speed <= 39:
+        wind_speed_color = "#4ea98f"
+    elif 40 <= speed <= 49:
+        wind_speed_color = "#4abe47"
+    elif 50 <= speed <= 59:
+        wind_speed_color = "#8ec94b"
+    elif 60 <= speed <= 69:
+        wind_speed_color = "#cad63e"
+    elif 70 <= speed <= 79:
+        wind_speed_color = "#d8bf3d"
+    elif 80 <= speed <= 89:
+        wind_speed_color = "#d69b44"
+    elif 90 <= speed <= 99:
+        wind_speed_color = "#d5784c"
+    elif 100 <= speed <= 109:
+        wind_speed_color = "#c7466f"
+    elif 110 <= speed <= 119:
+        wind_speed_color = "#a3355b"
+    elif 120 <= speed <= 129:
+        wind_speed_color = "#901c4f"
+    elif 130 <= speed <= 139:
+        wind_speed_color = "#631a1b"
+    else:
+        wind_speed_color = "#2b0001"
+    return wind_speed_color
+
+
+def _get_color_of_text_temperature(temp: int) -> str:
+    """
+    Returns the temperature text color code, depending on the temperature value.
+
+    :param temp: Temperature in Celsius.
+    :return: Temperature text color code.
+    """
+    if 24 >= temp >= 0 or temp <= -21:
+        return "#000000"
+    return "#ffffff"
+
+
+def _get_color_of_text_wind(speed: int) -> str:
+    """
+    Returns the wind speed text color code, depending on the wind speed value.
+
+    :param speed: Wind speed in meters per second.
+    :return: Wind speed text color code.
+    """
+    if 99 >= speed >= 40:
+        return "#000000"
+    return "#ffffff"
+
+
+# endregion
+
+
+@pytest.mark.parametrize("weather_code", range(-10, 2000))
+def test_weather_emoji(weather_code: int) -> None:
+    """
+    Checks the emoji of every weather code and of the codes around them.
+
+    :param weather_code: Weather code.
+    :return: None
+    """
+    assert get_weather_emoji(weather_code=weather_code) == _get_weather_emoji(weather_code=weather_code)
+
+
+@pytest.mark.parametrize("temp", range(-300, 300))
+def test_temp_colors(temp: int) -> None:
+    """
+    Checks the colors of the temperatures inside the bands and far beyond the clamped edges.
+
+    :param temp: Temperature in Celsius.
+    :return: None
+    """
+    assert get_temp_colors(temp=temp) == ScaleColors(
+        background=_get_temp_color(temp=temp), text=_get_color_of_text_temperature(temp=temp)
+    )
+
+
+@pytest.mark.parametrize("speed", range(-50, 500))
+def test_wind_colors(speed: int) -> None:
+    """
+    Checks the colors of the wind speeds inside the bands and far beyond the clamped edges.
+
+    :param speed: Wind speed in meters per second.
+    :return: None
+    """
+    assert get_wind_colors(speed=speed) == ScaleColors(
+        background=_get_wind_color(speed=speed), text=_get_color_of_text_wind(speed=speed)
+    )
@@ -0,0 +1,97 @@
+"""Checks the coalescing of concurrent calls."""
+
+from asyncio import CancelledError, Event, create_task, gather, run, sleep
+from functools import partial
+
+from tgbot.services.singleflight import SingleFlight
+
+
+def test_do_coalesces_calls_with_the_same_key() -> None:
+    """
+    Checks that the concurrent calls with the same key run once and share the result, and that the call runs again
+    once it is completed.
+
+    :return: None
+    """
+    calls: list[str] = []
+    release: Event = Event()
+
+    async def load(key: str) -> str:
+        calls.append(key)
+        await release.wait()
+        return key.upper()
+
+    async def run_calls() -> tuple[list[str], int, str]:
+        flight: SingleFlight[str] = SingleFlight()
+        tasks = [create_task(flight.do(key=key, func=partial(load, key=key))) for key in ("a", "a", "b", "a")]
+        await sleep(0)
+        in_flight: int = flight.in_flight
+        release.set()
+        results: list[str] = list(await gather(*tasks))
+        return results, in_flight, await flight.do(key="a", func=partial(load, key="a"))
+
+    results, in_flight, next_result = run(run_calls())
+    assert results == ["A", "A", "B", "A"]
+    assert in_flight == 2
+    assert next_result == "A" and calls == ["a", "b", "a"]
+
+
+def test_do_shares_the_error_and_survives_cancelled_callers() -> None:
+    """
+    Checks that an error of the call is raised to every caller, and that cancelling one caller does not cancel the
+    call for the others.
+
+    :return: None
+    """
+    release: Event = Event()
+
+    async def fail() -> str:
+        await release.wait()
+        raise ValueError("failed")
+
+    async def run_calls() -> list[BaseException | str]:
+        flight: SingleFlight[str] = SingleFlight()
+        cancelled = create_task(flight.do(key="a", func=fail))
+        waiting = create_task(flight.do(key="a", func=fail))
+        await sleep(0)
+        cancelled.cancel()
+        release.set()
+        results: list[BaseException | str] = list(await gather(cancelled, waiting, return_exceptions=True))
+        assert flight.in_flight == 0
+        return results
+
+    cancelled_result, waiting_result = run(run_calls())
+    assert isinstance(cancelled_result, CancelledError)
+    assert isinstance(waiting_result, ValueError)
+
+
+def test_do_many_joins_calls_in_flight() -> None:
+    """
+    Checks that the keys in flight are joined, and the other keys are run by a single call.
+
+    :return: None
+    """
+    calls: list[list[str]] = []
+    release: Event = Event()
+
+    async def load(keys: list[str]) -> dict[str, str]:
+        calls.append(keys)
+        await release.wait()
+        return {key: key.upper() for key in keys}
+
+    async def run_calls() -> tuple[list[dict[str, str]], list[dict[str, str]], int]:
+        flight: SingleFlight[dict[str, str]] = SingleFlight()
+        first = create_task(flight.do_many(keys=["a", "b"], func=load))
+        await sleep(0)
+        second = create_task(flight.do_many(keys=["b", "c", "c"], func=load))
+        await sleep(0)
+        in_flight: int = flight.in_flight
+        release.set()
+        first_results, second_results = await gather(first, second)
+        return first_results, second_results, in_flight
+
+    first_results, second_results, in_flight = run(run_calls())
+    assert calls == [["a", "b"], ["c"]]
+    assert in_flight == 3
+    assert first_results == [{"a": "A", "b": "B"}]
+    assert second_results == [{"a": "A", "b": "B"}, {"c": "C"}]
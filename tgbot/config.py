@@ -1,13 +1,29 @@
 """Configuration settings for the bot."""
 
+from os import cpu_count
 from pathlib import Path
 from typing import NamedTuple
 
 from aiogram.contrib.fsm_storage.redis import RedisStorage2
 from environs import Env
-
-
-__all__: tuple[str, ...] = ("BASE_DIR", "BOT_LOGO", "LOCALES_DIR", "LOG_FILE", "Config", "load_config")
+from redis.asyncio import Redis
+
+
+__all__: tuple[str, ...] = (
+    "BASE_DIR",
+    "BOT_LOGO",
+    "LOCALES_DIR",
+    "LOG_FILE",
+    "BroadcastParams",
+    "CacheParams",
+    "Config",
+    "DbPoolParams",
+    "HttpClient",
+    "RenderParams",
+    "UserCacheParams",
+    "WeatherApiKeys",
+    "load_config",
+)
 
 BASE_DIR: Path = Path(__file__).resolve().parent.parent
 _USE_PG_SOCKET: bool = False
@@ -49,14 +65,120 @@ class TgBot(NamedTuple):
     webhook: Webhook
 
 
-class WeatherToken(NamedTuple):
+class WeatherApiKeys(NamedTuple):
     """
-    OpenWeatherMap weather API token.
+    OpenWeatherMap weather API tokens and their limits.
 
-    :param token: OpenWeatherMap weather API token.
+    :param tokens: OpenWeatherMap weather API tokens.
+    :param calls_per_minute: Maximum number of requests per minute for one token.
+    :param monthly_budget: Maximum number of requests per month for one token.
+    :param reserve: Share of the limits of each token reserved for requests from the user dialog.
     """
 
-    token: str
+    tokens: tuple[str, ...]
+    calls_per_minute: int
+    monthly_budget: int
+    reserve: float
+
+
+class HttpClient(NamedTuple):
+    """
+    Parameters of the HTTP client for requests to the OpenWeatherMap API.
+
+    :param limit_per_host: Maximum number of simultaneous connections to the API host.
+    :param keepalive_timeout: Time in seconds to keep an idle connection open.
+    :param dns_cache_ttl: Time in seconds to cache resolved DNS addresses.
+    :param connect_timeout: Timeout in seconds for establishing a connection.
+    :param total_timeout: Timeout in seconds for the whole request.
+    :param retries: Number of repeated attempts after a failed request.
+    :param retry_backoff: Base delay in seconds before a repeated attempt, it doubles with each attempt.
+    :param failure_threshold: Number of consecutive failed requests after which requests to the API are stopped.
+    :param recovery_timeout: Time in seconds after which requests to the API are tried again.
+    """
+
+    limit_per_host: int
+    keepalive_timeout: float
+    dns_cache_ttl: int
+    connect_timeout: float
+    total_timeout: float
+    retries: int
+    retry_backoff: float
+    failure_threshold: int
+    recovery_timeout: float
+
+
+class CacheParams(NamedTuple):
+    """
+    Parameters of an in-memory cache.
+
+    :param maxsize: Maximum number of cached entries.
+    :param ttl: Lifetime of a cached entry in seconds.
+    """
+
+    maxsize: int
+    ttl: float
+
+
+class RenderParams(NamedTuple):
+    """
+    Parameters of the forecast images rendering.
+
+    :param workers: Number of rendering processes, 0 to render in a thread of the bot process.
+    :param encoder: Name of the image encoder profile.
+    :param image_cache: Parameters of the forecast images cache.
+    :param tile_cache_size: Maximum number of cached forecast columns in each rendering process.
+    """
+
+    workers: int
+    encoder: str
+    image_cache: CacheParams
+    tile_cache_size: int
+
+
+class BroadcastParams(NamedTuple):
+    """
+    Parameters of the scheduled weather broadcast.
+
+    :param chunk_size: Number of users whose weather is requested and drawn at once.
+    :param write_batch_size: Number of sending results (dialog ids and blocked users) saved to the database at once.
+    :param concurrency: Maximum number of users whose weather is being sent at the same time.
+    :param rate: Maximum number of requests per second for all users, sending and deleting messages.
+    :param chat_interval: Minimum interval between messages to the same user in seconds.
+    :param progress_interval: Interval between progress reports in the log in seconds.
+    """
+
+    chunk_size: int
+    write_batch_size: int
+    concurrency: int
+    rate: float
+    chat_interval: float
+    progress_interval: int
+
+
+class DbPoolParams(NamedTuple):
+    """
+    Parameters of the database connection pool.
+
+    :param min_size: Number of connections opened at startup and kept open.
+    :param max_size: Maximum number of connections.
+    :param max_inactive_connection_lifetime: Time in seconds after which an idle connection is closed.
+    :param statement_cache_size: Number of prepared statements cached by each connection, 0 to disable them.
+    """
+
+    min_size: int
+    max_size: int
+    max_inactive_connection_lifetime: float
+    statement_cache_size: int
+
+
+class UserCacheParams(NamedTuple):
+    """
+    Parameters of the Redis cache of the dialog message ids of the users.
+
+    :param ttl: Lifetime of a cached user in seconds.
+    """
+
+    ttl: int
 
 
 class Config(NamedTuple):
@@ -64,15 +186,31 @@ class Config(NamedTuple):
     Bot config.
 
     :param tg_bot: TgBot instance.
-    :param weather_api: OpenWeatherMap weather API token.
+    :param weather_api: OpenWeatherMap weather API tokens and their limits.
+    :param http_client: HTTP client parameters for the OpenWeatherMap API.
+    :param weather_cache: Parameters of the weather data cache.
+    :param geocoding_cache: Parameters of the city search results cache.
+    :param render: Parameters of the forecast images rendering.
+    :param broadcast: Parameters of the scheduled weather broadcast.
     :param pg_dsn: Postgres database connection string.
+    :param db_pool: Parameters of the database connection pool.
+    :param redis: Redis client, its connections are shared by the FSM storage and the cache of users.
     :param storage: Redis storage for FSM.
+    :param user_cache: Parameters of the Redis cache of users.
     """
 
     tg_bot: TgBot
-    weather_api: WeatherToken
+    weather_api: WeatherApiKeys
+    http_client: HttpClient
+    weather_cache: CacheParams
+    geocoding_cache: CacheParams
+    render: RenderParams
+    broadcast: BroadcastParams
     pg_dsn: str
+    db_pool: DbPoolParams
+    redis: Redis
     storage: RedisStorage2
+    user_cache: UserCacheParams
 
 
 def _get_db_dsn(env: Env, use_socket: bool) -> str:
@@ -94,29 +232,75 @@ def _get_db_dsn(env: Env, use_socket: bool) -> str:
     return f"postgres://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
 
 
-def _get_redis_storage(env: Env, use_socket: bool) -> RedisStorage2:
+def _get_db_pool_params(env: Env) -> DbPoolParams:
     """
-    Returns the Redis storage for FSM.
+    Returns the parameters of the database connection pool.
+
+    :param env: Env instance.
+    :return: Database connection pool parameters.
+    """
+    return DbPoolParams(
+        min_size=env.int("POSTGRES_POOL_MIN_SIZE", 10),
+        max_size=env.int("POSTGRES_POOL_MAX_SIZE", 50),
+        max_inactive_connection_lifetime=env.float("POSTGRES_POOL_MAX_INACTIVE_LIFETIME", 300.0),
+        statement_cache_size=env.int("POSTGRES_STATEMENT_CACHE_SIZE", 100),
+    )
+
+
+def _get_redis_address(env: Env, use_socket: bool) -> tuple[str, int]:
+    """
+    Returns the Redis host and port.
 
     :param env: Env instance.
     :param use_socket: True, if a redis socket is used, otherwise False.
-    :return: Redis storage for FSM.
+    :return: Redis host and port.
     """
     if use_socket:
-        host: str = env.str("REDIS_HOST")
-        port: int = env.int("REDIS_PORT")
-    else:
-        host = env.str("REDIS_SOCKET_PATH")
-        port = 0
-    return RedisStorage2(
+        return env.str("REDIS_HOST"), env.int("REDIS_PORT")
+    return env.str("REDIS_SOCKET_PATH"), 0
+
+
+def _get_redis(env: Env, use_socket: bool) -> Redis:
+    """
+    Returns the Redis client of the bot.
+
+    :param env: Env instance.
+    :param use_socket: True, if a redis socket is used, otherwise False.
+    :return: Redis client.
+    """
+    host, port = _get_redis_address(env=env, use_socket=use_socket)
+    return Redis(
         host=host,
         port=port,
         db=env.int("REDIS_DB_INDEX"),
         password=env.str("REDIS_DB_PASS"),
-        prefix="open_weather_bot_fsm",
+        decode_responses=True,
     )
 
 
+def _get_redis_storage(redis: Redis) -> RedisStorage2:
+    """
+    Returns the Redis storage for FSM.
+
+    The storage works through the connection pool of the Redis client, so it does not open connections of its own.
+    The pool is closed by the client that created it, closing the storage leaves it open.
+
+    :param redis: Redis client.
+    :return: Redis storage for FSM.
+    """
+    return RedisStorage2(prefix="open_weather_bot_fsm", connection_pool=redis.connection_pool)
+
+
+def _get_user_cache_params(env: Env) -> UserCacheParams:
+    """
+    Returns the parameters of the Redis cache of users.
+
+    :param env: Env instance.
+    :return: User cache parameters.
+    """
+    return UserCacheParams(ttl=env.int("USER_CACHE_TTL", 86400))
+
+
 def _get_webhook(env: Env) -> Webhook:
     """
     Returns the webhook parameters.
@@ -133,6 +317,102 @@ def _get_webhook(env: Env) -> Webhook:
     )
 
 
+def _get_weather_api_keys(env: Env) -> WeatherApiKeys:
+    """
+    Returns the OpenWeatherMap weather API tokens and their limits.
+
+    :param env: Env instance.
+    :return: Weather API tokens and their limits.
+    """
+    return WeatherApiKeys(
+        tokens=tuple(env.list("WEATHER_API_TOKEN")),
+        calls_per_minute=env.int("WEATHER_API_CALLS_PER_MINUTE", 60),
+        monthly_budget=env.int("WEATHER_API_MONTHLY_BUDGET", 1000000),
+        reserve=env.float("WEATHER_API_RESERVE", 0.05),
+    )
+
+
+def _get_http_client(env: Env) -> HttpClient:
+    """
+    Returns the HTTP client parameters for the OpenWeatherMap API.
+
+    :param env: Env instance.
+    :return: HTTP client parameters.
+    """
+    return HttpClient(
+        limit_per_host=env.int("WEATHER_HTTP_LIMIT_PER_HOST", 50),
+        keepalive_timeout=env.float("WEATHER_HTTP_KEEPALIVE_TIMEOUT", 60.0),
+        dns_cache_ttl=env.int("WEATHER_HTTP_DNS_CACHE_TTL", 300),
+        connect_timeout=env.float("WEATHER_HTTP_CONNECT_TIMEOUT", 5.0),
+        total_timeout=env.float("WEATHER_HTTP_TOTAL_TIMEOUT", 15.0),
+        retries=env.int("WEATHER_HTTP_RETRIES", 2),
+        retry_backoff=env.float("WEATHER_HTTP_RETRY_BACKOFF", 0.5),
+        failure_threshold=env.int("WEATHER_HTTP_FAILURE_THRESHOLD", 5),
+        recovery_timeout=env.float("WEATHER_HTTP_RECOVERY_TIMEOUT", 30.0),
+    )
+
+
+def _get_weather_cache(env: Env) -> CacheParams:
+    """
+    Returns the parameters of the weather data cache.
+
+    :param env: Env instance.
+    :return: Weather data cache parameters.
+    """
+    return CacheParams(
+        maxsize=env.int("WEATHER_CACHE_SIZE", 10000),
+        ttl=env.float("WEATHER_CACHE_TTL", 600.0),  # OpenWeatherMap updates the weather data every 10 minutes
+    )
+
+
+def _get_geocoding_cache(env: Env) -> CacheParams:
+    """
+    Returns the parameters of the city search results cache.
+
+    :param env: Env instance.
+    :return: City search results cache parameters.
+    """
+    return CacheParams(
+        maxsize=env.int("GEOCODING_CACHE_SIZE", 5000),
+        ttl=env.float("GEOCODING_CACHE_TTL", 2592000.0),  # Geocoding data almost never changes, so keep it for 30 days
+    )
+
+
+def _get_render_params(env: Env) -> RenderParams:
+    """
+    Returns the parameters of the forecast images rendering.
+
+    :param env: Env instance.
+    :return: Rendering parameters.
+    """
+    return RenderParams(
+        workers=env.int("RENDER_WORKERS", cpu_count() or 1),
+        encoder=env.str("IMAGE_ENCODER", "png"),
+        image_cache=CacheParams(
+            maxsize=env.int("IMAGE_CACHE_SIZE", 1000),
+            ttl=env.float("IMAGE_CACHE_TTL", 10800.0),  # The forecast changes by the next scheduled update in 3 hours
+        ),
+        tile_cache_size=env.int("TILE_CACHE_SIZE", 500),
+    )
+
+
+def _get_broadcast_params(env: Env) -> BroadcastParams:
+    """
+    Returns the parameters of the scheduled weather broadcast.
+
+    :param env: Env instance.
+    :return: Broadcast parameters.
+    """
+    return BroadcastParams(
+        chunk_size=env.int("BROADCAST_CHUNK_SIZE", 50),
+        write_batch_size=env.int("BROADCAST_WRITE_BATCH_SIZE", 500),
+        concurrency=env.int("BROADCAST_CONCURRENCY", 25),
+        rate=env.float("BROADCAST_RATE", 25),
+        chat_interval=env.float("BROADCAST_CHAT_INTERVAL", 1),
+        progress_interval=env.int("BROADCAST_PROGRESS_INTERVAL", 60),
+    )
+
+
 def load_config() -> Config:
     """
     Loads data from environment variables.
@@ -141,11 +421,20 @@ def load_config() -> Config:
     """
     env: Env = Env()
     env.read_env()
+    redis: Redis = _get_redis(env=env, use_socket=_USE_REDIS_SOCKET)
     return Config(
         tg_bot=TgBot(
             token=env.str("BOT_TOKEN"), admin_ids=tuple(map(int, env.list("ADMINS_IDS"))), webhook=_get_webhook(env=env)
         ),
-        weather_api=WeatherToken(token=env.str("WEATHER_API_TOKEN")),
+        weather_api=_get_weather_api_keys(env=env),
+        http_client=_get_http_client(env=env),
+        weather_cache=_get_weather_cache(env=env),
+        geocoding_cache=_get_geocoding_cache(env=env),
+        render=_get_render_params(env=env),
+        broadcast=_get_broadcast_params(env=env),
         pg_dsn=_get_db_dsn(env=env, use_socket=_USE_PG_SOCKET),
-        storage=_get_redis_storage(env=env, use_socket=_USE_REDIS_SOCKET),
+        db_pool=_get_db_pool_params(env=env),
+        redis=redis,
+        storage=_get_redis_storage(redis=redis),
+        user_cache=_get_user_cache_params(env=env),
     )
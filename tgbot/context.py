@@ -0,0 +1,129 @@
+"""Application context that holds the config and the services of the bot."""
+
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING
+
+from tgbot.config import Config, load_config
+from tgbot.misc.logger import logger
+
+if TYPE_CHECKING:
+    from tgbot.services.database import Database
+    from tgbot.services.weather import WeatherAPI
+
+__all__: tuple[str] = ("AppContext",)
+
+
+class AppContext:
+    """
+    Loads the config once and creates each service on its first use.
+
+    The services are imported only when they are created, so importing the handlers does not load the database driver
+    and the image libraries. Ready services can be passed in instead, e.g. stand-ins for benchmarks.
+    """
+
+    def __init__(
+        self, config: Config | None = None, database: "Database | None" = None, weather: "WeatherAPI | None" = None
+    ) -> None:
+        """
+        Defines the config and the services that are already created.
+
+        :param config: Bot config or None to load it from the environment variables.
+        :param database: Database service or None to create it on the first use.
+        :param weather: Weather service or None to create it on the first use.
+        """
+        self._config: Config | None = config
+        self._database: "Database | None" = database
+        self._weather: "WeatherAPI | None" = weather
+
+    @property
+    def config(self) -> Config:
+        """
+        Returns the bot config, loading it on the first call.
+
+        :return: Config instance.
+        """
+        if self._config is None:
+            self._config = load_config()
+        return self._config
+
+    @property
+    def database(self) -> "Database":
+        """
+        Returns the database service, creating it on the first call.
+
+        :return: Database instance.
+        """
+        if self._database is None:
+            # pylint: disable=import-outside-toplevel
+            from tgbot.services.database import Database
+            from tgbot.services.user_cache import UserCache
+
+            self._database = Database(
+                db_dsn=self.config.pg_dsn,
+                pool_params=self.config.db_pool,
+                user_cache=UserCache(redis=self.config.redis, ttl=self.config.user_cache.ttl),
+            )
+        return self._database
+
+    @property
+    def weather(self) -> "WeatherAPI":
+        """
+        Returns the weather service, creating it on the first call.
+
+        :return: WeatherAPI instance.
+        """
+        if self._weather is None:
+            from tgbot.services.weather import WeatherAPI  # pylint: disable=import-outside-toplevel
+
+            self._weather = WeatherAPI(
+                api_keys=self.config.weather_api,
+                http_client=self.config.http_client,
+                weather_cache=self.config.weather_cache,
+                geocoding_cache=self.config.geocoding_cache,
+                render=self.config.render,
+                database=self.database,
+            )
+        return self._weather
+
+    async def start(self) -> None:
+        """
+        Prepares the services for work: creates the tables, opens the database connections and starts the rendering.
+
+        :return: None
+        """
+        await self.database.create_tables()
+        await self.database.start()
+        await self.weather.start()
+
+    @staticmethod
+    async def _close_resource(name: str, close: Callable[[], Awaitable[None]]) -> None:
+        """
+        Closes the resource, an error is logged so that it does not prevent closing the other resources.
+
+        :param name: Name of the resource for the log.
+        :param close: Function that closes the resource.
+        :return: None
+        """
+        try:
+            await close()
+        except Exception as exc:  # The other resources are closed anyway
+            logger.error("Failed to close the %s: %s", name, exc)
+
+    async def close(self) -> None:
+        """
+        Saves the pending data and closes the services that have been created and the Redis connections.
+
+        The resources are closed even if the pending data could not be saved.
+
+        :return: None
+        """
+        try:
+            if self._database is not None:
+                await self._database.flush_api_counters()
+        finally:
+            if self._database is not None:
+                await self._close_resource(name="database", close=self._database.close)
+            if self._weather is not None:
+                await self._close_resource(name="weather service", close=self._weather.close)
+            if self._config is not None:
+                await self._close_resource(name="Redis connections", close=self._config.redis.aclose)
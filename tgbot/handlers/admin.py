@@ -6,37 +6,40 @@ from aiogram import Dispatcher
 from aiogram.types import InputFile, Message
 
 from tgbot.config import BOT_LOGO
+from tgbot.context import AppContext
 from tgbot.middlewares.localization import i18n
-from tgbot.services.database import database
 
 __all__: tuple[str] = ("register_admin_handlers",)
 
 _ = i18n.gettext  # Alias for gettext method
 
 
-async def _if_admin_sent_command_stats(message: Message) -> None:
+async def _if_admin_sent_command_stats(message: Message, context: AppContext) -> None:
     """
     Shows statistics for administrators.
 
     :param message: Message object from bot user.
+    :param context: Application context.
     :return: None
     """
     await message.delete()
     user_lang_code: str = message.from_user.language_code
-    api_counter: int = await database.get_api_counter_value()
-    users_counter: int = await database.get_number_of_users()
+    api_counter: int = await context.database.get_api_counter_value()
+    api_budget: int = context.weather.total_api_budget
+    users_counter: int = await context.database.get_number_of_users()
     bot_answer_text: str = (
         "ℹ️ <b>"
         + _("Statistics", locale=user_lang_code)
         + ":</b>\n\n• "
         + _("Since beginning of the month", locale=user_lang_code)
-        + f",\n  <b>{round((api_counter / 1000000) * 100)} %</b>"
+        + f",\n  <b>{round((api_counter / api_budget) * 100)} %</b>"
         + _("requests have been spent", locale=user_lang_code)
         + ":\n  <b>"
         + f"{api_counter:_}".replace("_", " ")
         + "</b> "
         + _("out of", locale=user_lang_code)
-        + " <b>1 000 000</b>\n\n• "
+        + f" <b>{api_budget:_}".replace("_", " ")
+        + "</b>\n\n• "
         + _("Users in the database", locale=user_lang_code)
         + f": <b>{users_counter}</b>"
     )
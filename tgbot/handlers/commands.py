@@ -7,14 +7,12 @@ from aiogram.dispatcher import FSMContext
 from aiogram.types import InputFile, Message
 
 from tgbot.config import BOT_LOGO
+from tgbot.context import AppContext
 from tgbot.handlers.dialog import delete_previous_dialog_message
-from tgbot.middlewares.localization import i18n
-from tgbot.services.database import database
+from tgbot.misc.locale_bundle import locale_bundles
 
 __all__: tuple[str] = ("register_other_handlers",)
 
-_ = i18n.gettext  # Alias for gettext method
-
 
 async def _if_user_sent_command_about(message: Message) -> None:
     """
@@ -24,38 +22,25 @@ async def _if_user_sent_command_about(message: Message) -> None:
     :return: None
     """
     await message.delete()
-    user_lang_code: str = message.from_user.language_code
-    bot_answer_text: str = (
-        "🤖 "
-        + _("OpenWeatherBot is written in Python using the Aiogram 2 framework", locale=user_lang_code)
-        + "\n\n"
-        + _("Weather data provided by", locale=user_lang_code)
-        + ' <a href="https://openweathermap.org/">OpenWeather</a>\n'
-        + _("Icon by", locale=user_lang_code)
-        + ' <a href="https://freeicons.io/profile/2257">www.wishforge.games</a> '
-        + _("on", locale=user_lang_code)
-        + ' <a href="https://freeicons.io">freeicons.io</a>\n'
-        + _("The source code is available on", locale=user_lang_code)
-        + ' <a href="https://github.com/iRingil/open-weather-bot">GitHub</a>'
-    )
+    bot_answer_text: str = locale_bundles.get(lang_code=message.from_user.language_code).about_text
     bot_answer: Message = await message.answer_photo(photo=InputFile(path_or_bytesio=BOT_LOGO), caption=bot_answer_text)
     await sleep(delay=15)
     await message.bot.delete_message(chat_id=bot_answer.chat.id, message_id=bot_answer.message_id)
 
 
-async def _if_user_sent_command_stop(message: Message, state: FSMContext) -> None:
+async def _if_user_sent_command_stop(message: Message, state: FSMContext, context: AppContext) -> None:
     """
     Handles command '/stop' from the user.
 
     :param message: Message object from bot user.
     :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
+    await delete_previous_dialog_message(obj=message, state=state, context=context)
     await state.reset_state()
-    user_lang_code: str = message.from_user.language_code
-    await delete_previous_dialog_message(obj=message)
-    await database.delete_user(user_id=message.from_user.id)
-    bot_answer_text: str = "❌ " + _("All of your data has been deleted", locale=user_lang_code)
+    await context.database.delete_user(user_id=message.from_user.id)
+    bot_answer_text: str = locale_bundles.get(lang_code=message.from_user.language_code).stop_text
     bot_answer: Message = await message.answer_photo(photo=InputFile(path_or_bytesio=BOT_LOGO), caption=bot_answer_text)
     await sleep(delay=5)
     await message.bot.delete_message(chat_id=bot_answer.chat.id, message_id=bot_answer.message_id)
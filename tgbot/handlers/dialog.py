@@ -1,8 +1,7 @@
 """Handling messages from bot users."""
 
 from asyncio import sleep
-from os import remove as os_remove
-from pathlib import Path
+from typing import Any
 
 from aiogram import Dispatcher
 from aiogram.dispatcher import FSMContext
@@ -18,24 +17,25 @@ from aiogram.types import (
 from aiogram.utils.exceptions import MessageCantBeDeleted, MessageToDeleteNotFound
 
 from tgbot.config import BOT_LOGO
-from tgbot.keyboards.inline import create_city_selection_kb, create_units_selection_kb
-from tgbot.keyboards.reply import create_geolocation_kb
-from tgbot.middlewares.localization import i18n
+from tgbot.context import AppContext
+from tgbot.keyboards.inline import create_city_selection_kb
+from tgbot.misc.locale_bundle import LocaleBundle, locale_bundles
 from tgbot.misc.states import WeatherSetupDialog
-from tgbot.services.classes import CityData
-from tgbot.services.database import database
-from tgbot.services.weather import weather
+from tgbot.services.classes import CityData, UserWeatherSettings, WeatherBundle
 
 __all__: tuple[str, ...] = ("delete_previous_dialog_message", "register_dialog_handlers")
 
-_ = i18n.gettext  # Alias for gettext method
 
-
-async def delete_previous_dialog_message(obj: Message | CallbackQuery) -> None:
+async def delete_previous_dialog_message(obj: Message | CallbackQuery, state: FSMContext, context: AppContext) -> None:
     """
-    Deletes the previous dialog message, if it exists.
+    Deletes the previous dialog messages, if they exist.
+
+    During the weather setup dialog the message id is kept in the FSM data, otherwise it is saved in the database.
+    A registered user keeps getting the scheduled weather during the dialog, so both messages are deleted.
 
     :param obj: Message or CallbackQuery object from bot user.
+    :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
     if isinstance(obj, Message):
@@ -45,146 +45,150 @@ async def delete_previous_dialog_message(obj: Message | CallbackQuery) -> None:
     else:
         return
     user_id: int = obj.from_user.id
-    dialog_id: int | None = await database.get_dialog_id_if_exists(user_id=user_id)
-    if dialog_id:
-        try:
-            await obj.bot.delete_message(chat_id=user_id, message_id=dialog_id)
-        except (MessageCantBeDeleted, MessageToDeleteNotFound):
-            pass
+    dialog_ids: set[int | None] = {
+        (await state.get_data()).get("dialog_id"),
+        await context.database.get_dialog_id_if_exists(user_id=user_id),
+    }
+    for dialog_id in dialog_ids:
+        if dialog_id:
+            try:
+                await obj.bot.delete_message(chat_id=user_id, message_id=dialog_id)
+            except (MessageCantBeDeleted, MessageToDeleteNotFound):
+                pass
 
 
-async def _dialog_start(message: Message, state: FSMContext) -> None:
+async def _dialog_start(message: Message, state: FSMContext, context: AppContext) -> None:
     """
     Handles command '/start' from the user.
 
+    The settings of a registered user are kept until the new settings are complete.
+
     :param message: Message object from bot user.
     :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
+    bundle: LocaleBundle = locale_bundles.get(lang_code=message.from_user.language_code)
+    await delete_previous_dialog_message(obj=message, state=state, context=context)
     await state.reset_state()
-    user_lang_code: str = message.from_user.language_code
-    user_id: int = message.from_user.id
-    await delete_previous_dialog_message(obj=message)
-    await database.delete_user(user_id=message.from_user.id)
-    dialog_text: str = (
-        _("Let's set the weather!", locale=user_lang_code)
-        + " 🌦\n\n"
-        + _("Write the name of the city or send your coordinates:", locale=user_lang_code)
-    )
     dialog: Message = await message.answer_photo(
-        photo=InputFile(path_or_bytesio=BOT_LOGO),
-        caption=dialog_text,
-        reply_markup=await create_geolocation_kb(lang_code=user_lang_code),
+        photo=InputFile(path_or_bytesio=BOT_LOGO), caption=bundle.start_text, reply_markup=bundle.geolocation_kb
     )
-    await database.save_dialog_id(user_id=user_id, dialog_id=dialog.message_id)
+    await state.update_data(dialog_id=dialog.message_id)
     await WeatherSetupDialog.EnterCityName.set()
 
 
-async def _dialog_select_city(message: Message) -> None:
+async def _dialog_select_city(message: Message, state: FSMContext, context: AppContext) -> None:
     """
     Handling of city search results by geolocation or address.
 
     :param message: Message object from bot user.
+    :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
     user_lang_code: str = message.from_user.language_code
-    user_id: int = message.from_user.id
-    await delete_previous_dialog_message(obj=message)
+    bundle: LocaleBundle = locale_bundles.get(lang_code=user_lang_code)
+    await delete_previous_dialog_message(obj=message, state=state, context=context)
     await WeatherSetupDialog.previous()  # Block user input while city search is being processed
     if message.content_type in (ContentType.LOCATION, ContentType.VENUE):  # If the user sent geolocation
-        list_found_cities: list[CityData] | None = await weather.get_list_cities(
+        list_found_cities: list[CityData] | None = await context.weather.get_list_cities(
             city_name_or_location=message.location, lang_code=user_lang_code
         )
     else:  # If the user sent the city name
-        list_found_cities = await weather.get_list_cities(city_name_or_location=message.text, lang_code=user_lang_code)
+        list_found_cities = await context.weather.get_list_cities(
+            city_name_or_location=message.text, lang_code=user_lang_code
+        )
     if list_found_cities:  # If cities are found
-        dialog_text: str = "🏙 " + _("Select the desired city:", locale=user_lang_code)
+        dialog_text: str = bundle.city_selection_text
         reply_markup: InlineKeyboardMarkup | ReplyKeyboardMarkup = await create_city_selection_kb(
-            list_cities=list_found_cities, lang_code=user_lang_code
+            list_cities=list_found_cities, another_city_button=bundle.another_city_button
         )
     else:  # If no cities are found
-        dialog_text = (
-            "❌ "
-            + _("I couldn't find a single city!", locale=user_lang_code)
-            + "\n\n"
-            + _("Try changing the name of the city:", locale=user_lang_code)
-        )
-        reply_markup = await create_geolocation_kb(lang_code=user_lang_code)
+        dialog_text = bundle.city_not_found_text
+        reply_markup = bundle.geolocation_kb
         await WeatherSetupDialog.EnterCityName.set()  # Unblock user input for another city name
     dialog: Message = await message.answer_photo(
         photo=InputFile(path_or_bytesio=BOT_LOGO), caption=dialog_text, reply_markup=reply_markup
     )
-    await database.save_dialog_id(user_id=user_id, dialog_id=dialog.message_id)
+    await state.update_data(dialog_id=dialog.message_id)
 
 
-async def _dialog_select_another_city(call: CallbackQuery) -> None:
+async def _dialog_select_another_city(call: CallbackQuery, state: FSMContext, context: AppContext) -> None:
     """
     Returns to the input of the city name.
 
     :param call: CallbackQuery object from bot user.
+    :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
-    user_lang_code: str = call.from_user.language_code
-    await delete_previous_dialog_message(obj=call)
+    bundle: LocaleBundle = locale_bundles.get(lang_code=call.from_user.language_code)
+    await delete_previous_dialog_message(obj=call, state=state, context=context)
     dialog: Message = await call.message.answer_photo(
         photo=InputFile(path_or_bytesio=BOT_LOGO),
-        caption=_("Write the name of the city or send your coordinates:", locale=user_lang_code),
-        reply_markup=await create_geolocation_kb(lang_code=user_lang_code),
+        caption=bundle.city_request_text,
+        reply_markup=bundle.geolocation_kb,
     )
-    await database.save_dialog_id(user_id=call.from_user.id, dialog_id=dialog.message_id)
+    await state.update_data(dialog_id=dialog.message_id)
     await WeatherSetupDialog.EnterCityName.set()
 
 
-async def _dialog_select_measure_units(call: CallbackQuery) -> None:
+async def _dialog_select_measure_units(call: CallbackQuery, state: FSMContext, context: AppContext) -> None:
     """
-    Processes the coordinates of the selected user city and displays a dialog to select the temperature units.
+    Keeps the selected user city in the FSM data and displays a dialog to select the temperature units.
 
     :param call: CallbackQuery object from bot user.
+    :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
-    user_id: int = call.from_user.id
-    await delete_previous_dialog_message(obj=call)
+    bundle: LocaleBundle = locale_bundles.get(lang_code=call.from_user.language_code)
+    await delete_previous_dialog_message(obj=call, state=state, context=context)
     dialog: Message = await call.message.answer_photo(
         photo=InputFile(path_or_bytesio=BOT_LOGO),
-        caption="🌡 " + _("Choose units of temperature measurement:", locale=call.from_user.language_code),
-        reply_markup=await create_units_selection_kb(),
+        caption=bundle.units_selection_text,
+        reply_markup=bundle.units_selection_kb,
     )
-    await database.save_dialog_id(user_id=user_id, dialog_id=dialog.message_id)
     latitude, longitude, city = call.data.removeprefix("data=").split("&")
-    await database.save_city_coords(user_id=user_id, city=city, latitude=float(latitude), longitude=float(longitude))
+    await state.update_data(
+        dialog_id=dialog.message_id, city=city, latitude=float(latitude), longitude=float(longitude)
+    )
 
 
-async def _dialog_finish(call: CallbackQuery, state: FSMContext) -> None:
+async def _dialog_finish(call: CallbackQuery, state: FSMContext, context: AppContext) -> None:
     """
-    Saves the language and units in the database, completes the weather setup dialog.
+    Saves the selected city, language and units in the database, completes the weather setup dialog.
 
     :param call: CallbackQuery object from bot user.
     :param state: Final State Machine context.
+    :param context: Application context.
     :return: None
     """
+    draft: dict[str, Any] = await state.get_data()
+    if "city" not in draft:  # The city has not been selected in this dialog, e.g. the keyboard is left from another one
+        await _dialog_select_another_city(call=call, state=state, context=context)
+        return
     user_lang_code: str = call.from_user.language_code
     user_id: int = call.from_user.id
-    await delete_previous_dialog_message(obj=call)
-    measure_units: str = "metric" if call.data.removeprefix("units=") == "c" else "imperial"
-    await database.save_user_settings(user_id=user_id, lang_code=user_lang_code, measure_units=measure_units)
-    weather_forecast: Path = await weather.get_weather_forecast(user_id=user_id)
-    dialog: Message = await call.message.answer_photo(
-        photo=InputFile(path_or_bytesio=weather_forecast), caption=await weather.get_current_weather(user_id=user_id)
+    await delete_previous_dialog_message(obj=call, state=state, context=context)
+    user_settings: UserWeatherSettings = UserWeatherSettings(
+        lang=user_lang_code,
+        city=draft["city"],
+        latitude=draft["latitude"],
+        longitude=draft["longitude"],
+        units="metric" if call.data.removeprefix("units=") == "c" else "imperial",
     )
-    if not str(weather_forecast).endswith("bot_logo.jpg"):
-        os_remove(path=weather_forecast)
-    await database.save_dialog_id(user_id=user_id, dialog_id=dialog.message_id)
-    final_message_text: str = (
-        "🌥 <code>"
-        + _("The weather setup is complete.", locale=user_lang_code)
-        + "\n\n"
-        + _("The data will be updated automatically every 3 hours.", locale=user_lang_code)
-        + "</code>"
+    weather_bundle: WeatherBundle = await context.weather.get_weather_bundle(user_settings=user_settings)
+    dialog: Message = await call.message.answer_photo(photo=weather_bundle.get_photo(), caption=weather_bundle.caption)
+    context.weather.save_image_file_id(weather_bundle=weather_bundle, file_id=dialog.photo[-1].file_id)
+    await context.database.save_user(user_id=user_id, dialog_id=dialog.message_id, user_settings=user_settings)
+    await state.reset_state()  # The dialog id is in the database now
+    final_message: Message = await call.message.answer(
+        text=locale_bundles.get(lang_code=user_lang_code).setup_complete_text
     )
-    final_message: Message = await call.message.answer(text=final_message_text)
     await sleep(delay=15)
     await call.bot.delete_message(chat_id=call.message.chat.id, message_id=final_message.message_id)
-    await state.reset_state()
 
 
 async def _any_other_messages(message: Message) -> None:
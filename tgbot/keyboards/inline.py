@@ -2,20 +2,19 @@
 
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-from tgbot.middlewares.localization import i18n
 from tgbot.services.classes import CityData
 
 __all__: tuple[str, ...] = ("create_city_selection_kb", "create_units_selection_kb")
 
-_ = i18n.gettext  # Alias for gettext method
 
-
-async def create_city_selection_kb(list_cities: list[CityData], lang_code: str) -> InlineKeyboardMarkup:
+async def create_city_selection_kb(
+    list_cities: list[CityData], another_city_button: InlineKeyboardButton
+) -> InlineKeyboardMarkup:
     """
     Creates a keyboard containing buttons with cities and their coordinates.
 
     :param list_cities: List of cities as CityData objects.
-    :param lang_code: User language code.
+    :param another_city_button: Button for returning to the input of the city name.
     :return: Generated keyboard.
     """
     keyboard: InlineKeyboardMarkup = InlineKeyboardMarkup(row_width=1)
@@ -25,9 +24,7 @@ async def create_city_selection_kb(list_cities: list[CityData], lang_code: str)
                 text=city.full_name, callback_data=f"data={city.latitude}&{city.longitude}&{city.name[:35]}"
             )
         )
-    keyboard.insert(
-        InlineKeyboardButton(text="◀️ " + _("Select another city:", locale=lang_code), callback_data="another_city")
-    )
+    keyboard.insert(another_city_button)
     return keyboard
 
 
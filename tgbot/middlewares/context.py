@@ -0,0 +1,33 @@
+"""Passes the application context to the handlers."""
+
+from typing import Any
+
+from aiogram.dispatcher.middlewares import LifetimeControllerMiddleware
+
+from tgbot.context import AppContext
+
+__all__: tuple[str] = ("ContextMiddleware",)
+
+
+class ContextMiddleware(LifetimeControllerMiddleware):
+    """Adds the application context to the data of each update, the handlers receive it as the 'context' argument."""
+
+    def __init__(self, context: AppContext) -> None:
+        """
+        Initializes the middleware.
+
+        :param context: Application context.
+        """
+        super().__init__()
+        self._context: AppContext = context
+
+    async def pre_process(self, obj: Any, data: dict[str, Any], *args: Any) -> None:
+        """
+        Adds the application context to the update data.
+
+        :param obj: Update object.
+        :param data: Data passed to the handlers.
+        :param args: Other arguments of the update processing.
+        :return: None
+        """
+        data["context"] = self._context
@@ -0,0 +1,124 @@
+"""
+Compares the encoder profiles of forecast images by encoding time and image size.
+
+Usage: python -m tgbot.misc.encoder_benchmark [--images 200] [--rounds 3] [--seed 0]
+"""
+
+from argparse import ArgumentParser, ArgumentTypeError, Namespace
+from array import array
+from math import cos, pi
+from random import Random
+from time import perf_counter
+
+from PIL import Image
+
+from tgbot.services.classes import FORECAST_ICON_CODES, ForecastData
+from tgbot.services.image import ENCODER_PROFILES, DrawWeatherImage
+
+__all__: tuple[str] = ("main",)
+
+# Typical weather of forecasts: icons and ranges of temperature in Celsius and wind speed in meters per second
+_WEATHER_TYPES: tuple[tuple[tuple[str, ...], int, int, int], ...] = (
+    (("01", "02"), -25, 40, 8),  # clear sky
+    (("03", "04"), -20, 30, 12),  # clouds
+    (("09", "10", "11"), 0, 30, 20),  # rain and thunderstorm
+    (("13",), -30, 2, 15),  # snow
+    (("50",), -10, 20, 5),  # mist
+)
+
+
+def _generate_forecast(rng: Random, units: str) -> ForecastData:
+    """
+    Generates a forecast for the next 24 hours with a daily temperature cycle and typical icons.
+
+    :param rng: Random number generator.
+    :param units: Measurement units ('metric' or 'imperial').
+    :return: ForecastData object.
+    """
+    icon_codes, min_temp, max_temp, max_wind_speed = rng.choice(_WEATHER_TYPES)
+    start: int = 1_700_000_000 + rng.randrange(8) * 10800
+    mean_temp: float = rng.uniform(min_temp, max_temp)
+    daily_amplitude: float = rng.uniform(2, 8)
+    wind_speed: float = rng.uniform(0, max_wind_speed)
+    temps: list[float] = [mean_temp + daily_amplitude * cos(2 * pi * (idx - 5) / 8) for idx in range(8)]
+    wind_speeds: list[float] = [max(wind_speed + rng.uniform(-2, 2), 0) for _ in range(8)]
+    return ForecastData(
+        time=array("q", (start + idx * 10800 for idx in range(8))),
+        icon=array(
+            "B",
+            (
+                FORECAST_ICON_CODES.index(
+                    rng.choice(icon_codes) + ("d" if 2 <= (idx + start // 10800) % 8 <= 5 else "n")
+                )
+                for idx in range(8)
+            ),
+        ),
+        temp=array("h", (round(temp if units == "metric" else temp * 9 / 5 + 32) for temp in temps)),
+        wind_speed=array("h", (round(speed if units == "metric" else speed * 2.237) for speed in wind_speeds)),
+        units=units,
+    )
+
+
+def _positive_int(value: str) -> int:
+    """
+    Converts the command line argument to a positive integer.
+
+    :param value: Argument value.
+    :return: Positive integer.
+    :raises ArgumentTypeError: If the value is not a positive integer.
+    """
+    try:
+        number: int = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise ArgumentTypeError(f"must be a positive integer: {value!r}")
+    return number
+
+
+def _parse_args(argv: list[str] | None = None) -> Namespace:
+    """
+    Parses the command line arguments.
+
+    :param argv: Arguments to parse or None to parse the arguments of the command line.
+    :return: Namespace object with the arguments.
+    """
+    parser: ArgumentParser = ArgumentParser(description="Compares the encoder profiles of forecast images.")
+    parser.add_argument("--images", type=_positive_int, default=200, help="number of forecasts in the corpus")
+    parser.add_argument("--rounds", type=_positive_int, default=3, help="number of times each image is encoded")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the forecast generator")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    """
+    Draws a corpus of forecasts and prints the encoding time and size of the images for each encoder profile.
+
+    :return: None
+    """
+    args: Namespace = _parse_args()
+    rng: Random = Random(args.seed)
+    drawer: DrawWeatherImage = DrawWeatherImage()
+    canvases: list[Image.Image] = [
+        drawer.draw_canvas(data=_generate_forecast(rng=rng, units=rng.choice(("metric", "imperial"))))
+        for _ in range(args.images)
+    ]
+    print(f"Corpus: {len(canvases)} forecasts, {args.rounds} rounds")
+    print(f"{'profile':<16}{'ms/image':>10}{'bytes/image':>14}{'size, %':>10}")
+    reference_size: float | None = None
+    for name in ENCODER_PROFILES:
+        encoder: DrawWeatherImage = DrawWeatherImage(encoder=name)
+        started_at: float = perf_counter()
+        for _ in range(args.rounds):
+            sizes: list[int] = [len(encoder.encode_image(canvas=canvas)) for canvas in canvases]
+        elapsed: float = perf_counter() - started_at
+        mean_size: float = sum(sizes) / len(sizes)
+        reference_size = reference_size or mean_size  # Sizes are compared with the first (default) profile
+        print(
+            f"{name:<16}{elapsed / (args.rounds * len(canvases)) * 1000:>10.2f}"
+            f"{mean_size:>14.0f}{mean_size / reference_size * 100:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Precompiled texts, keyboards and commands of the bot for each locale."""
+
+from typing import NamedTuple
+
+from aiogram.types import BotCommand, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
+
+from tgbot.keyboards.inline import create_units_selection_kb
+from tgbot.keyboards.reply import create_geolocation_kb
+from tgbot.middlewares.localization import i18n
+
+__all__: tuple[str, ...] = ("LocaleBundle", "LocaleBundles", "WeatherCaption", "locale_bundles")
+
+_ = i18n.gettext  # Alias for gettext method
+
+
+def N_(message: str) -> str:  # pylint: disable=invalid-name
+    """
+    Marks the string for extraction by pybabel without translating it, the translation is done at the place of use.
+
+    :param message: String to translate.
+    :return: The same string.
+    """
+    return message
+
+
+# Descriptions of OpenWeatherMap weather condition codes, translated when the bundles are built
+_WEATHER_DESCRIPTIONS: dict[int, str] = {
+    200: N_("thunderstorm with light rain"),
+    201: N_("thunderstorm with rain"),
+    202: N_("thunderstorm with heavy rain"),
+    210: N_("light thunderstorm"),
+    211: N_("thunderstorm"),
+    212: N_("heavy thunderstorm"),
+    221: N_("ragged thunderstorm"),
+    230: N_("thunderstorm with light drizzle"),
+    231: N_("thunderstorm with drizzle"),
+    232: N_("thunderstorm with heavy drizzle"),
+    300: N_("light intensity drizzle"),
+    301: N_("drizzle"),
+    302: N_("heavy intensity drizzle"),
+    310: N_("light intensity drizzle rain"),
+    311: N_("drizzle rain"),
+    312: N_("heavy intensity drizzle rain"),
+    313: N_("shower rain and drizzle"),
+    314: N_("heavy shower rain and drizzle"),
+    321: N_("shower drizzle"),
+    500: N_("light rain"),
+    501: N_("moderate rain"),
+    502: N_("heavy intensity rain"),
+    503: N_("very heavy rain"),
+    504: N_("extreme rain"),
+    511: N_("freezing rain"),
+    520: N_("light intensity shower rain"),
+    521: N_("shower rain"),
+    522: N_("heavy intensity shower rain"),
+    531: N_("ragged shower rain"),
+    600: N_("light snow"),
+    601: N_("snow"),
+    602: N_("heavy snow"),
+    611: N_("sleet"),
+    612: N_("light shower sleet"),
+    613: N_("shower sleet"),
+    615: N_("light rain and snow"),
+    616: N_("rain and snow"),
+    620: N_("light shower snow"),
+    621: N_("shower snow"),
+    622: N_("heavy shower snow"),
+    701: N_("mist"),
+    711: N_("smoke"),
+    721: N_("haze"),
+    731: N_("sand/dust whirls"),
+    741: N_("fog"),
+    751: N_("sand"),
+    761: N_("dust"),
+    762: N_("volcanic ash"),
+    771: N_("squalls"),
+    781: N_("tornado"),
+    800: N_("clear sky"),
+    801: N_("few clouds"),
+    802: N_("scattered clouds"),
+    803: N_("broken clouds"),
+    804: N_("overcast clouds"),
+}
+
+# Phrases of the current weather caption, translated when the bundles are built
+_CAPTION_PHRASES: dict[str, str] = {
+    "feels_like": N_("feels like"),
+    "humidity": N_("Humidity"),
+    "dew_point": N_("Dew point"),
+    "wind_speed": N_("Wind speed"),
+    "pressure": N_("Pressure"),
+    "sunrise": N_("Sunrise"),
+    "sunset": N_("Sunset"),
+    "precipitation": N_("of precipitation in one hour"),
+    "gust": N_("gusts to"),
+    "visibility": N_("Visibility"),
+    "stale_notice": N_("The weather service is unavailable, the data is shown as of"),
+}
+
+# Signs of temperature, speed, precipitation and visibility for each measurement units
+_UNITS_SIGNS: dict[str, tuple[str, str, str, str]] = {
+    "metric": ("°C", "m/s", "mm", "km"),
+    "imperial": ("°F", "mph", "in", "mi"),
+}
+
+
+class WeatherCaption(NamedTuple):
+    """
+    A class describing templates of the current weather caption for one locale and measurement units.
+
+    :param template: Caption template with named slots for the weather values.
+    :param precipitation: Template of the optional precipitation part.
+    :param gust: Template of the optional wind gust part.
+    :param visibility: Template of the optional visibility part.
+    :param stale_notice: Template of the notice about outdated data.
+    """
+
+    template: str
+    precipitation: str
+    gust: str
+    visibility: str
+    stale_notice: str
+
+
+class LocaleBundle(NamedTuple):
+    """
+    A class describing the texts, keyboards and commands of the bot for one locale.
+
+    The keyboards are shared between all messages and must not be modified.
+
+    :param weather_captions: Current weather caption templates by measurement units.
+    :param weather_descriptions: Translated descriptions of weather condition codes.
+    :param weather_failed_text: Caption when the current weather could not be obtained.
+    :param commands: Bot commands.
+    :param geolocation_kb: Keyboard for sending geolocation.
+    :param units_selection_kb: Keyboard with measurement unit selection buttons.
+    :param another_city_button: Button for returning to the input of the city name.
+    :param start_text: Caption of the weather setup dialog start.
+    :param city_request_text: Caption with a request for the city name.
+    :param city_selection_text: Caption of the city selection.
+    :param city_not_found_text: Caption when no cities are found.
+    :param units_selection_text: Caption of the measurement units selection.
+    :param setup_complete_text: Message about the completion of the weather setup.
+    :param about_text: Information about the bot.
+    :param stop_text: Message about the deletion of the user data.
+    """
+
+    weather_captions: dict[str, WeatherCaption]
+    weather_descriptions: dict[int, str]
+    weather_failed_text: str
+    commands: tuple[BotCommand, ...]
+    geolocation_kb: ReplyKeyboardMarkup
+    units_selection_kb: InlineKeyboardMarkup
+    another_city_button: InlineKeyboardButton
+    start_text: str
+    city_request_text: str
+    city_selection_text: str
+    city_not_found_text: str
+    units_selection_text: str
+    setup_complete_text: str
+    about_text: str
+    stop_text: str
+
+
+class LocaleBundles:
+    """Builds the bundles of all available locales once and returns them by the user language code."""
+
+    def __init__(self) -> None:
+        """Initializes the registry of bundles, the bundles are built at bot startup."""
+        self._bundles: dict[str, LocaleBundle] = {}
+
+    @staticmethod
+    def _translate_for_template(message: str, lang_code: str) -> str:
+        """
+        Translates the string and escapes the braces in it, so that the translation can be a part of a template.
+
+        :param message: String to translate.
+        :param lang_code: Language code.
+        :return: Escaped translation.
+        """
+        translation: str = _(message, locale=lang_code)
+        return translation.replace("{", "{{").replace("}", "}}")
+
+    def _build_weather_caption(self, lang_code: str, units: str) -> WeatherCaption:
+        """
+        Compiles the current weather caption templates.
+
+        :param lang_code: Language code.
+        :param units: Measurement units ('metric' or 'imperial').
+        :return: Caption templates as WeatherCaption object.
+        """
+        temp_units, wind_units, precip_units, vis_units = _UNITS_SIGNS[units]
+        phrases: dict[str, str] = {
+            name: self._translate_for_template(message=message, lang_code=lang_code)
+            for name, message in _CAPTION_PHRASES.items()
+        }
+        return WeatherCaption(
+            template=(
+                "<b>{city}, {time}</b>\n"
+                "{emoji} {description}{precipitation}\n\n"
+                f"🌡 <b>{{temp}}{temp_units}</b>, {phrases['feels_like']} <b>{{feels_like}}{temp_units}</b>\n\n"
+                f"💦 {phrases['humidity']}: <b>{{humidity}}%</b>, "
+                f"{phrases['dew_point']}: <b>{{dew_point}}{temp_units}</b>\n"
+                f"💨 {phrases['wind_speed']}: <b>{{wind_speed}} {wind_units}</b>{{gust}}\n"
+                f"🌡 {phrases['pressure']}: <b>{{pressure}} hPa</b>\n"
+                "{visibility}"
+                f"🌅 {phrases['sunrise']}: <b>{{sunrise}}</b>  🌇 {phrases['sunset']}: <b>{{sunset}}</b>"
+            ),
+            precipitation=f", <b>{{precipitation}} {precip_units} </b>{phrases['precipitation']}",
+            gust=f", {phrases['gust']}: <b>{{gust}} {wind_units}</b>",
+            visibility=f"🌫️ {phrases['visibility']}: <b>{{visibility}} {vis_units}</b>\n\n",
+            stale_notice=f"\n\n⚠️ {phrases['stale_notice']} <b>{{time}}</b>",
+        )
+
+    async def _build_bundle(self, lang_code: str, units_selection_kb: InlineKeyboardMarkup) -> LocaleBundle:
+        """
+        Builds the bundle of the locale.
+
+        :param lang_code: Language code.
+        :param units_selection_kb: Keyboard with measurement unit selection buttons (the same for all locales).
+        :return: Locale bundle as LocaleBundle object.
+        """
+        city_request_text: str = _("Write the name of the city or send your coordinates:", locale=lang_code)
+        return LocaleBundle(
+            weather_captions={
+                units: self._build_weather_caption(lang_code=lang_code, units=units) for units in _UNITS_SIGNS
+            },
+            weather_descriptions={
+                code: _(description, locale=lang_code) for code, description in _WEATHER_DESCRIPTIONS.items()
+            },
+            weather_failed_text="❌ " + _("Failed to obtain data about the current weather.", locale=lang_code),
+            commands=(
+                BotCommand(command="start", description="▶️ " + _("Set weather forecast", locale=lang_code)),
+                BotCommand(command="about", description="ℹ️ " + _("Bot info", locale=lang_code)),
+                BotCommand(command="stop", description="⏹ " + _("Stop bot and delete data", locale=lang_code)),
+            ),
+            geolocation_kb=await create_geolocation_kb(lang_code=lang_code),
+            units_selection_kb=units_selection_kb,
+            another_city_button=InlineKeyboardButton(
+                text="◀️ " + _("Select another city:", locale=lang_code), callback_data="another_city"
+            ),
+            start_text=_("Let's set the weather!", locale=lang_code) + " 🌦\n\n" + city_request_text,
+            city_request_text=city_request_text,
+            city_selection_text="🏙 " + _("Select the desired city:", locale=lang_code),
+            city_not_found_text=(
+                "❌ "
+                + _("I couldn't find a single city!", locale=lang_code)
+                + "\n\n"
+                + _("Try changing the name of the city:", locale=lang_code)
+            ),
+            units_selection_text="🌡 " + _("Choose units of temperature measurement:", locale=lang_code),
+            setup_complete_text=(
+                "🌥 <code>"
+                + _("The weather setup is complete.", locale=lang_code)
+                + "\n\n"
+                + _("The data will be updated automatically every 3 hours.", locale=lang_code)
+                + "</code>"
+            ),
+            about_text=(
+                "🤖 "
+                + _("OpenWeatherBot is written in Python using the Aiogram 2 framework", locale=lang_code)
+                + "\n\n"
+                + _("Weather data provided by", locale=lang_code)
+                + ' <a href="https://openweathermap.org/">OpenWeather</a>\n'
+                + _("Icon by", locale=lang_code)
+                + ' <a href="https://freeicons.io/profile/2257">www.wishforge.games</a> '
+                + _("on", locale=lang_code)
+                + ' <a href="https://freeicons.io">freeicons.io</a>\n'
+                + _("The source code is available on", locale=lang_code)
+                + ' <a href="https://github.com/iRingil/open-weather-bot">GitHub</a>'
+            ),
+            stop_text="❌ " + _("All of your data has been deleted", locale=lang_code),
+        )
+
+    async def build(self) -> None:
+        """
+        Builds the bundles of all available locales.
+
+        :return: None
+        """
+        units_selection_kb: InlineKeyboardMarkup = await create_units_selection_kb()
+        for lang_code in i18n.available_locales:
+            self._bundles[lang_code] = await self._build_bundle(
+                lang_code=lang_code, units_selection_kb=units_selection_kb
+            )
+
+    def get(self, lang_code: str | None) -> LocaleBundle:
+        """
+        Returns the bundle of the user locale.
+
+        :param lang_code: User language code.
+        :return: Bundle of the locale or of the default locale, if the user locale is not available.
+        """
+        bundle: LocaleBundle | None = self._bundles.get(lang_code) if lang_code else None
+        return bundle if bundle is not None else self._bundles[i18n.default]
+
+    @property
+    def locales(self) -> tuple[str, ...]:
+        """
+        Returns the locales for which the bundles are built.
+
+        :return: Language codes.
+        """
+        return tuple(self._bundles)
+
+
+locale_bundles: LocaleBundles = LocaleBundles()
@@ -1,64 +1,348 @@
 """Functions for sending scheduled weather data."""
 
-from asyncio import sleep
+from asyncio import Future, Semaphore, Task, create_task, gather, get_running_loop
+from contextlib import aclosing
 from datetime import timezone
-from os import remove as os_remove
-from pathlib import Path
+from time import monotonic
+from typing import TYPE_CHECKING, NamedTuple
 
 from aiogram import Dispatcher
-from aiogram.types import InputFile, Message
-from aiogram.utils.exceptions import BotBlocked, RetryAfter, UserDeactivated
+from aiogram.types import Message
+from aiogram.utils.exceptions import (
+    BotBlocked,
+    MessageCantBeDeleted,
+    MessageToDeleteNotFound,
+    TelegramAPIError,
+    UserDeactivated,
+)
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, JobSubmissionEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from tgbot.services.database import User, database
-from tgbot.services.weather import weather
+from tgbot.config import BroadcastParams
+from tgbot.context import AppContext
+from tgbot.services.broadcast import BroadcastLimiter
+from tgbot.services.classes import User, WeatherBundle
+from tgbot.misc.logger import logger
+from tgbot.services.quota import Priority
+
+if TYPE_CHECKING:
+    from tgbot.services.database import Database
+    from tgbot.services.image import TileCacheStats
 
 __all__: tuple[str] = ("schedule",)
 
 
-async def _update_weather_data(dp: Dispatcher) -> None:
+class _BroadcastStats(NamedTuple):
     """
-    Updates weather data for all users.
+    A class describing the progress of the weather broadcast.
 
-    :param dp: Aiogram dispatcher object.
-    :return: None
+    :param sent: Number of users who have received the weather.
+    :param blocked: Number of users who have blocked the bot or deleted the account.
+    :param failed: Number of users whose weather could not be sent.
+    :param skipped: Number of users whose weather is not updated because the API request budget is nearly spent.
     """
-    users: list[User] = await database.get_list_all_users()
-    for user in users:
-        weather_forecast: Path = await weather.get_weather_forecast(user_id=user.id)
-        current_weather: str = await weather.get_current_weather(user_id=user.id)
+
+    sent: int
+    blocked: int
+    failed: int
+    skipped: int
+
+
+# pylint: disable=too-many-instance-attributes
+class _BroadcastResults:
+    """Collects the results of sending weather to the users and saves them to the database in batches."""
+
+    def __init__(self, database: "Database", batch_size: int) -> None:
+        """
+        Defines the size of the batches saved to the database.
+
+        :param database: Database service.
+        :param batch_size: Number of results saved at once.
+        """
+        self._database: "Database" = database
+        self._batch_size: int = batch_size
+        self._dialog_ids: dict[int, int] = {}
+        self._blocked_users: list[int] = []
+        self._sent: int = 0
+        self._blocked: int = 0
+        self._failed: int = 0
+        self._skipped: int = 0
+
+    def add_dialog_id(self, user_id: int, dialog_id: int) -> None:
+        """
+        Adds the id of the weather message sent to the user.
+
+        :param user_id: Telegram user id.
+        :param dialog_id: Id of the sent message.
+        :return: None
+        """
+        self._dialog_ids[user_id] = dialog_id
+        self._sent += 1
+
+    def add_blocked_user(self, user_id: int) -> None:
+        """
+        Adds the user who has blocked the bot or deleted the account.
+
+        :param user_id: Telegram user id.
+        :return: None
+        """
+        self._blocked_users.append(user_id)
+        self._blocked += 1
+
+    def add_failed_user(self) -> None:
+        """
+        Counts the user whose weather could not be sent, the user keeps the previous weather message.
+
+        :return: None
+        """
+        self._failed += 1
+
+    def add_skipped_user(self) -> None:
+        """
+        Counts the user whose weather is not updated because of the API request budget.
+
+        :return: None
+        """
+        self._skipped += 1
+
+    async def flush(self, force: bool = False) -> None:
+        """
+        Saves the collected results to the database when a batch is collected.
+
+        :param force: Save the results regardless of their number.
+        :return: None
+        """
+        if len(self._dialog_ids) + len(self._blocked_users) < (1 if force else self._batch_size):
+            return
+        dialog_ids, self._dialog_ids = self._dialog_ids, {}
+        blocked_users, self._blocked_users = self._blocked_users, []
+        if dialog_ids:
+            await self._database.save_dialog_ids(dialog_ids=dialog_ids)
+        if blocked_users:
+            await self._database.delete_users(user_ids=blocked_users)
+
+    @property
+    def stats(self) -> _BroadcastStats:
+        """
+        Returns the number of users by the results of sending.
+
+        :return: Statistics as _BroadcastStats object.
+        """
+        return _BroadcastStats(sent=self._sent, blocked=self._blocked, failed=self._failed, skipped=self._skipped)
+
+
+# pylint: disable=too-many-instance-attributes
+class _WeatherBroadcast:
+    """
+    Sends the weather to all users, serving several users at the same time within the Telegram limits.
+
+    The users are read from the database in batches by a single query, the weather of a batch is requested together
+    and its forecast images are drawn in parallel. Each new forecast image is uploaded once: the other users of
+    the image wait for its file id.
+    """
+
+    def __init__(self, dp: Dispatcher, context: AppContext) -> None:
+        """
+        Prepares the broadcast.
+
+        :param dp: Aiogram dispatcher object.
+        :param context: Application context.
+        """
+        self._dp: Dispatcher = dp
+        self._context: AppContext = context
+        self._params: BroadcastParams = context.config.broadcast
+        self._limiter: BroadcastLimiter = BroadcastLimiter(
+            rate=self._params.rate, chat_interval=self._params.chat_interval
+        )
+        self._slots: Semaphore = Semaphore(value=self._params.concurrency)
+        self._tasks: set[Task[None]] = set()
+        self._uploads: dict[str, Future[str | None]] = {}  # File ids of the images uploaded in this broadcast
+        self._results: _BroadcastResults = _BroadcastResults(
+            database=context.database, batch_size=self._params.write_batch_size
+        )
+        self._started_at: float = monotonic()
+        self._reported_at: float = self._started_at
+
+    async def _share_upload(self, weather_bundle: WeatherBundle) -> tuple[WeatherBundle, Future[str | None] | None]:
+        """
+        Makes the first user of a new forecast image upload it, the other users of the image wait for its file id.
+
+        :param weather_bundle: Weather of the user with a forecast image that has not been uploaded yet.
+        :return: Weather bundle to send and the future of the file id if the image is uploaded by this user.
+        """
+        image_id: str = str(weather_bundle.image_id)
+        while True:
+            upload: Future[str | None] | None = self._uploads.get(image_id)
+            if upload is None:
+                upload = self._uploads[image_id] = get_running_loop().create_future()
+                return weather_bundle, upload
+            file_id: str | None = await upload
+            if file_id is not None:  # Otherwise the upload has failed and the next user uploads the image
+                return weather_bundle._replace(image=None, file_id=file_id), None
+
+    async def _delete_previous_message(self, user: User) -> None:
+        """
+        Deletes the previous weather message of the user.
+
+        :param user: User object.
+        :return: None
+        """
         try:
-            dialog: Message = await dp.bot.send_photo(
+            await self._limiter.call(
                 chat_id=user.id,
-                photo=InputFile(path_or_bytesio=weather_forecast),
-                caption=current_weather,
-                disable_notification=True,
+                func=lambda: self._dp.bot.delete_message(chat_id=user.id, message_id=user.dialog_id),
+                is_message=False,
             )
-            await database.save_dialog_id(user_id=user.id, dialog_id=dialog.message_id)
-        except (BotBlocked, UserDeactivated):
-            await database.delete_user(user_id=user.id)
-        except RetryAfter as exc:
-            await sleep(delay=exc.timeout)
-            dialog = await dp.bot.send_photo(
+        except (BotBlocked, UserDeactivated, MessageCantBeDeleted, MessageToDeleteNotFound):
+            pass  # The message has been deleted by the user or the user is no longer available
+        except TelegramAPIError as exc:
+            logger.warning("Failed to delete the previous weather message of user %s: %s", user.id, exc)
+
+    async def _send_weather(self, user: User, weather_bundle: WeatherBundle) -> None:
+        """
+        Sends the weather to the user and deletes the previous weather message, then frees the slot of the user.
+
+        :param user: User object.
+        :param weather_bundle: Weather of the user.
+        :return: None
+        """
+        upload: Future[str | None] | None = None
+        try:
+            if weather_bundle.image_id is not None and weather_bundle.file_id is None:
+                weather_bundle, upload = await self._share_upload(weather_bundle=weather_bundle)
+            dialog: Message = await self._limiter.call(
                 chat_id=user.id,
-                photo=InputFile(path_or_bytesio=weather_forecast),
-                caption=current_weather,
-                disable_notification=True,
+                func=lambda: self._dp.bot.send_photo(
+                    chat_id=user.id,
+                    photo=weather_bundle.get_photo(),
+                    caption=weather_bundle.caption,
+                    disable_notification=True,
+                ),
             )
-            await database.save_dialog_id(user_id=user.id, dialog_id=dialog.message_id)
+            file_id: str = dialog.photo[-1].file_id
+            if upload is not None:
+                upload.set_result(file_id)
+            self._context.weather.save_image_file_id(weather_bundle=weather_bundle, file_id=file_id)
+            self._results.add_dialog_id(user_id=user.id, dialog_id=dialog.message_id)
+            await self._delete_previous_message(user=user)
+        except (BotBlocked, UserDeactivated):
+            self._results.add_blocked_user(user_id=user.id)
+        except TelegramAPIError as exc:  # The user keeps the previous weather message
+            logger.warning("Failed to send weather to user %s: %s", user.id, exc)
+            self._results.add_failed_user()
+        except Exception as exc:  # E.g. a timeout, the task must not end with an exception nobody retrieves
+            logger.error("Failed to send weather to user %s: %s", user.id, repr(exc))
+            self._results.add_failed_user()
         finally:
-            await dp.bot.delete_message(chat_id=user.id, message_id=user.dialog_id)
-            if not str(weather_forecast).endswith("bot_logo.jpg"):
-                os_remove(weather_forecast)
+            if upload is not None and not upload.done():
+                del self._uploads[str(weather_bundle.image_id)]
+                upload.set_result(None)
+            self._slots.release()
+            self._log_progress()
 
+    def _log_progress(self, force: bool = False) -> None:
+        """
+        Reports the progress of the broadcast to the log at the configured interval.
 
-async def schedule(dp: Dispatcher) -> None:
+        :param force: Report the progress regardless of the interval.
+        :return: None
+        """
+        now: float = monotonic()
+        if not force and now - self._reported_at < self._params.progress_interval:
+            return
+        self._reported_at = now
+        stats: _BroadcastStats = self._results.stats
+        elapsed: float = now - self._started_at
+        logger.info(
+            "Weather broadcast: %s sent, %s blocked, %s failed, %s skipped in %.0f s (%.1f users/s, limit %.1f/s)",
+            stats.sent,
+            stats.blocked,
+            stats.failed,
+            stats.skipped,
+            elapsed,
+            (stats.sent + stats.blocked + stats.failed) / elapsed if elapsed else 0.0,
+            self._limiter.rate,
+        )
+
+    async def run(self) -> _BroadcastStats:
+        """
+        Sends the weather to all users and saves the results to the database.
+
+        :return: Statistics as _BroadcastStats object.
+        """
+        try:
+            # An interrupted broadcast closes the generator at once, not when it is collected
+            async with aclosing(self._context.database.iter_users(chunk_size=self._params.chunk_size)) as batches:
+                async for batch in batches:
+                    weather_bundles: list[WeatherBundle | None] = await self._context.weather.get_weather_bundles(
+                        users_settings=[user.settings for user in batch], priority=Priority.SCHEDULED
+                    )
+                    for user, weather_bundle in zip(batch, weather_bundles):
+                        # The user keeps the previous weather message until the budget is available
+                        if weather_bundle is None:
+                            self._results.add_skipped_user()
+                            continue
+                        await self._slots.acquire()
+                        task: Task[None] = create_task(self._send_weather(user=user, weather_bundle=weather_bundle))
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                    await self._results.flush()
+        finally:
+            await gather(*self._tasks, return_exceptions=True)
+            await self._results.flush(force=True)  # The results of an interrupted broadcast are saved as well
+        self._log_progress(force=True)
+        return self._results.stats
+
+
+async def _update_weather_data(dp: Dispatcher, context: AppContext) -> None:
+    """
+    Updates weather data for all users.
+
+    :param dp: Aiogram dispatcher object.
+    :param context: Application context.
+    :return: None
+    """
+    stats: _BroadcastStats = await _WeatherBroadcast(dp=dp, context=context).run()
+    if stats.skipped:
+        logger.warning("The API request budget is nearly spent, weather is not updated for %s users", stats.skipped)
+    tile_stats: "TileCacheStats" = context.weather.tile_cache_stats
+    logger.info(
+        "Weather is updated for %s users, hit ratio of images %.2f, of columns %.2f (%s columns, %.1f MB)",
+        stats.sent,
+        context.weather.image_cache_stats.hit_ratio,
+        tile_stats.cache.hit_ratio,
+        tile_stats.cache.size,
+        tile_stats.memory / 2**20,
+    )
+
+
+def _log_skipped_run(event: JobSubmissionEvent) -> None:
+    """
+    Reports the run of a task that is skipped because the previous run of the task is still in progress.
+
+    :param event: Event of the skipped run.
+    :return: None
+    """
+    logger.warning(
+        "The run of task %s at %s is skipped, the previous run is still in progress",
+        event.job_id,
+        ", ".join(str(run_time) for run_time in event.scheduled_run_times),
+    )
+
+
+async def schedule(dp: Dispatcher, context: AppContext) -> None:
     """
     Creates a weather update task in the scheduler.
 
+    A broadcast takes two requests per user, so at the rate of 25 requests per second about 135,000 users can be
+    served between the updates every 3 hours. The update is skipped if the previous broadcast is still running.
+
     :param dp: Aiogram dispatcher object.
+    :param context: Application context.
     :return: None
     """
     scheduler: AsyncIOScheduler = AsyncIOScheduler(timezone=timezone.utc)
-    scheduler.add_job(func=_update_weather_data, trigger="cron", hour="*/3", args=(dp,))
+    scheduler.add_listener(callback=_log_skipped_run, mask=EVENT_JOB_MAX_INSTANCES)
+    scheduler.add_job(func=_update_weather_data, trigger="cron", hour="*/3", args=(dp, context), id="weather_broadcast")
+    scheduler.add_job(func=context.database.flush_api_counters, trigger="interval", minutes=1)
     scheduler.start()
@@ -0,0 +1,73 @@
+"""Circuit breaker for requests to an external service."""
+
+from time import monotonic
+
+from tgbot.misc.logger import logger
+
+__all__: tuple[str] = ("CircuitBreaker",)
+
+
+class CircuitBreaker:
+    """Stops requests to a failing service for a while after several consecutive failures."""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float) -> None:
+        """
+        Defines the parameters of the circuit breaker, the circuit is initially closed.
+
+        :param name: Name of the service (for logging).
+        :param failure_threshold: Number of consecutive failures after which the circuit opens.
+        :param recovery_timeout: Time in seconds after which a trial request is allowed through the open circuit.
+        """
+        self._name: str = name
+        self._failure_threshold: int = failure_threshold
+        self._recovery_timeout: float = recovery_timeout
+        self._failures: int = 0
+        self._opened_at: float | None = None
+
+    def allow_request(self) -> bool:
+        """
+        Checks if a request to the service is allowed.
+
+        When the circuit is open, one trial request is allowed per recovery timeout.
+
+        :return: True if the request is allowed, otherwise False.
+        """
+        if self._opened_at is None:
+            return True
+        now: float = monotonic()
+        if now - self._opened_at >= self._recovery_timeout:
+            self._opened_at = now  # The next trial request is allowed only after another timeout
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """
+        Closes the circuit after a successful request.
+
+        :return: None
+        """
+        if self._opened_at is not None:
+            logger.info("%s is available again, the circuit is closed", self._name)
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """
+        Counts a failed request and opens the circuit if the failures follow each other.
+
+        :return: None
+        """
+        self._failures += 1
+        if self._failures >= self._failure_threshold:
+            if self._opened_at is None:
+                logger.warning("%s is unavailable, the circuit is open after %s failures", self._name, self._failures)
+            self._opened_at = monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        """
+        Checks if the circuit is open.
+
+        :return: True if requests to the service are stopped, otherwise False.
+        """
+        return self._opened_at is not None
@@ -0,0 +1,128 @@
+"""Pacing of Telegram requests during mass sending of messages."""
+
+from asyncio import sleep
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from time import monotonic
+from typing import Any, TypeVar
+
+from aiogram.utils.exceptions import RetryAfter
+
+from tgbot.misc.logger import logger
+from tgbot.services.ratelimit import TokenBucket
+
+__all__: tuple[str] = ("BroadcastLimiter",)
+
+_Result = TypeVar("_Result")
+
+
+class BroadcastLimiter:
+    """
+    Keeps a broadcast within the Telegram limits: about 30 requests per second in total and one message per second
+    per chat.
+
+    All requests, including the deletion of messages, take tokens from a global bucket without bursts, and messages
+    to the same chat are spaced out. A RetryAfter error pauses all requests for the time requested by Telegram and
+    halves the rate of requests, the rate is then restored gradually with each successful request.
+    """
+
+    _MAX_RETRIES: int = 3
+    _MIN_RATE_SHARE: float = 0.1  # The rate is never slowed down below this share of the maximum rate
+    _RECOVERY_STEPS: int = 200  # Number of successful requests that restore the whole maximum rate
+
+    def __init__(self, rate: float, chat_interval: float) -> None:
+        """
+        Defines the limits of the broadcast.
+
+        :param rate: Maximum number of requests per second.
+        :param chat_interval: Minimum interval between messages to the same chat in seconds.
+        """
+        self._max_rate: float = rate
+        self._bucket: TokenBucket = TokenBucket(rate=rate, capacity=1)
+        self._chat_interval: float = chat_interval
+        self._chat_slots: OrderedDict[int, float] = OrderedDict()  # Time of the latest message by chat ids
+        self._paused_until: float = 0.0
+
+    async def _wait_for_chat(self, chat_id: int) -> None:
+        """
+        Reserves the next slot for a message to the chat and waits for it.
+
+        :param chat_id: Telegram chat id.
+        :return: None
+        """
+        now: float = monotonic()
+        while self._chat_slots and next(iter(self._chat_slots.values())) + self._chat_interval <= now:
+            self._chat_slots.popitem(last=False)  # The slots are ordered by time, the oldest ones no longer matter
+        latest_slot: float | None = self._chat_slots.pop(chat_id, None)
+        slot: float = now if latest_slot is None else max(now, latest_slot + self._chat_interval)
+        self._chat_slots[chat_id] = slot
+        if slot > now:
+            await sleep(delay=slot - now)
+
+    async def _wait_for_pause(self) -> None:
+        """
+        Waits until the pause requested by Telegram is over.
+
+        :return: None
+        """
+        while (delay := self._paused_until - monotonic()) > 0:
+            await sleep(delay=delay)
+
+    def _slow_down(self, timeout: int) -> None:
+        """
+        Pauses all requests and halves the rate of requests.
+
+        :param timeout: Pause requested by Telegram in seconds.
+        :return: None
+        """
+        self._paused_until = max(self._paused_until, monotonic() + timeout)
+        self._bucket.rate = max(self._bucket.rate / 2, self._max_rate * self._MIN_RATE_SHARE)
+        logger.warning("Telegram flood control: pause for %s s, rate is reduced to %.1f/s", timeout, self._bucket.rate)
+
+    def _speed_up(self) -> None:
+        """
+        Raises the rate of requests by a small step up to the maximum rate.
+
+        :return: None
+        """
+        if self._bucket.rate < self._max_rate:
+            self._bucket.rate = min(self._bucket.rate + self._max_rate / self._RECOVERY_STEPS, self._max_rate)
+
+    async def call(
+        self, chat_id: int, func: Callable[[], Coroutine[Any, Any, _Result]], is_message: bool = True
+    ) -> _Result:
+        """
+        Makes the request within the limits, repeating it after RetryAfter errors.
+
+        :param chat_id: Telegram chat id.
+        :param func: Function that returns the coroutine of the request.
+        :param is_message: Whether the request sends a message, other requests (e.g. deleting messages) are not spaced
+            out per chat.
+        :return: Result of the request.
+        :raises RetryAfter: If Telegram still limits the requests after all retries.
+        """
+        attempt: int = 0
+        while True:
+            if is_message:
+                await self._wait_for_chat(chat_id=chat_id)
+            await self._wait_for_pause()
+            await self._bucket.acquire()
+            try:
+                result: _Result = await func()
+            except RetryAfter as exc:
+                self._slow_down(timeout=exc.timeout)
+                attempt += 1
+                if attempt > self._MAX_RETRIES:
+                    raise
+                continue
+            self._speed_up()
+            return result
+
+    @property
+    def rate(self) -> float:
+        """
+        Returns the current rate of requests.
+
+        :return: Number of requests per second.
+        """
+        return self._bucket.rate
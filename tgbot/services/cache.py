@@ -0,0 +1,103 @@
+"""In-memory cache with a limited size and lifetime of entries."""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+from math import inf
+from time import monotonic
+from typing import Generic, NamedTuple, TypeVar
+
+__all__: tuple[str, ...] = ("CacheStats", "LRUCache")
+
+_Value = TypeVar("_Value")
+
+
+class CacheStats(NamedTuple):
+    """
+    A class describing cache usage statistics.
+
+    :param hits: Number of requests answered from the cache.
+    :param misses: Number of requests for missing or expired entries.
+    :param size: Current number of entries in the cache.
+    :param maxsize: Maximum number of entries in the cache.
+    """
+
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Returns the share of requests answered from the cache.
+
+        :return: Hit ratio from 0 to 1.
+        """
+        requests: int = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+class LRUCache(Generic[_Value]):
+    """A cache that evicts the least recently used entries and expires entries after their lifetime."""
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        """
+        Defines the cache parameters.
+
+        :param maxsize: Maximum number of entries in the cache.
+        :param ttl: Lifetime of an entry in seconds or None if entries do not expire.
+        """
+        self._maxsize: int = maxsize
+        self._ttl: float | None = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, _Value]] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def get(self, key: Hashable) -> _Value | None:
+        """
+        Returns the cached value and marks it as recently used.
+
+        :param key: Entry key.
+        :return: Cached value or None if the entry is missing or expired.
+        """
+        entry: tuple[float, _Value] | None = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: _Value) -> None:
+        """
+        Saves the value in the cache, evicting the least recently used entries if the cache is full.
+
+        :param key: Entry key.
+        :param value: Value to cache.
+        :return: None
+        """
+        expires_at: float = inf if self._ttl is None else monotonic() + self._ttl
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    @property
+    def ttl(self) -> float | None:
+        """
+        Returns the lifetime of cache entries.
+
+        :return: Lifetime of an entry in seconds or None if entries do not expire.
+        """
+        return self._ttl
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Returns cache usage statistics.
+
+        :return: Cache statistics as CacheStats object.
+        """
+        return CacheStats(hits=self._hits, misses=self._misses, size=len(self._entries), maxsize=self._maxsize)
@@ -1,20 +1,30 @@
 """Classes for working with data."""
 
+from array import array
+from hashlib import sha256
+from io import BytesIO
 from typing import NamedTuple
 
-__all__: tuple[str, ...] = ("CityData", "CurrentWeatherData", "ForecastData", "User", "UserWeatherSettings")
+from aiogram.types import InputFile
 
+from tgbot.config import BOT_LOGO
 
-class User(NamedTuple):
-    """
-    A class that describes a user.
+__all__: tuple[str, ...] = (
+    "FORECAST_ICON_CODES",
+    "CityData",
+    "CurrentWeatherData",
+    "ForecastData",
+    "ForecastImage",
+    "User",
+    "UserWeatherSettings",
+    "WeatherBundle",
+    "WeatherResponse",
+)
 
-    :param id: User id.
-    :param dialog_id: Last dialogue message id.
-    """
-
-    id: int
-    dialog_id: int
+# Weather condition icons of OpenWeatherMap, the forecast stores indexes in this tuple
+FORECAST_ICON_CODES: tuple[str, ...] = tuple(
+    f"{code}{part_of_day}" for code in ("01", "02", "03", "04", "09", "10", "11", "13", "50") for part_of_day in "dn"
+)
 
 
 class UserWeatherSettings(NamedTuple):
@@ -35,6 +45,20 @@ class UserWeatherSettings(NamedTuple):
     units: str
 
 
+class User(NamedTuple):
+    """
+    A class that describes a user.
+
+    :param id: User id.
+    :param dialog_id: Last dialogue message id.
+    :param settings: User weather settings.
+    """
+
+    id: int
+    dialog_id: int
+    settings: UserWeatherSettings
+
+
 class CityData(NamedTuple):
     """
     A class describing city data.
@@ -53,18 +77,19 @@ class CityData(NamedTuple):
 
 class CurrentWeatherData(NamedTuple):
     """
-    A class describing current weather data.
+    A class describing current weather data in the user's measurement units.
 
-    :param temp: Temperature in Celsius.
-    :param feels_like: Temperature that feels like in Celsius.
+    :param temp: Temperature in Celsius or Fahrenheit.
+    :param feels_like: Temperature that feels like in Celsius or Fahrenheit.
     :param weather_code: Weather condition code.
-    :param weather_description: Description of weather condition.
-    :param wind_speed: Wind speed in meters per second.
-    :param gust: Wind gust in meters per second.
+    :param weather_description: Description of weather condition in English.
+    :param wind_speed: Wind speed in meters per second or miles per hour.
+    :param gust: Wind gust in meters per second or miles per hour.
     :param humidity: Humidity in percent.
+    :param dew_point: Dew point in Celsius or Fahrenheit.
     :param pressure: Atmospheric pressure in millibars.
-    :param visibility: Visibility in kilometers or None.
-    :param precipitation: Precipitation in millimeters or None.
+    :param visibility: Visibility in kilometers or miles or None.
+    :param precipitation: Precipitation in millimeters or inches or None.
     :param time: Time of the measurement.
     :param sunrise: Sunrise time in UTC.
     :param sunset: Sunset time in UTC.
@@ -77,6 +102,7 @@ class CurrentWeatherData(NamedTuple):
     wind_speed: int
     gust: int | None
     humidity: int
+    dew_point: int
     pressure: int
     visibility: float | None
     precipitation: float | None
@@ -89,13 +115,83 @@ class ForecastData(NamedTuple):
     """
     A class describing weather forecast data.
 
-    :param time: List of times of the measurements.
-    :param ico_code: List of weather condition codes.
-    :param temp: List of temperatures in Celsius.
-    :param wind_speed: List of wind speeds in meters per second.
+    :param time: Array of Unix timestamps of the measurements.
+    :param icon: Array of weather condition icon indexes in FORECAST_ICON_CODES.
+    :param temp: Array of temperatures in Celsius or Fahrenheit.
+    :param wind_speed: Array of wind speeds in meters per second or miles per hour.
+    :param units: Measurement units ('metric' or 'imperial').
+    """
+
+    time: array
+    icon: array
+    temp: array
+    wind_speed: array
+    units: str
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Returns the hash of the drawable content, the forecasts with the same hash have identical images.
+
+        :return: Hexadecimal SHA-256 digest.
+        """
+        digest = sha256(self.units.encode())
+        for values in (self.time, self.icon, self.temp, self.wind_speed):
+            digest.update(values.tobytes())
+        return digest.hexdigest()
+
+
+class ForecastImage(NamedTuple):
+    """
+    A class describing a rendered weather forecast image.
+
+    :param image_id: Content hash of the forecast data.
+    :param image: PNG image or None if the image has already been uploaded to Telegram.
+    :param file_id: Telegram file id of the uploaded image or None if the image has not been uploaded yet.
+    """
+
+    image_id: str
+    image: bytes | None
+    file_id: str | None
+
+
+class WeatherResponse(NamedTuple):
+    """
+    A class describing a response of the weather API.
+
+    :param data: Raw API response in metric units.
+    :param is_stale: True if the response is outdated and is used because the API is unavailable.
+    """
+
+    data: dict
+    is_stale: bool
+
+
+class WeatherBundle(NamedTuple):
+    """
+    A class describing the weather data sent to the user.
+
+    :param caption: Formatted description of the current weather.
+    :param image: PNG image of the weather forecast or None if it could not be drawn or has already been uploaded.
+    :param image_id: Content hash of the forecast image or None if there is no image.
+    :param file_id: Telegram file id of the already uploaded forecast image.
+    :param image_name: File name of the forecast image.
     """
 
-    time: list[str]
-    ico_code: list[str]
-    temp: list[str]
-    wind_speed: list[str]
+    caption: str
+    image: bytes | None
+    image_id: str | None = None
+    file_id: str | None = None
+    image_name: str = "forecast.png"
+
+    def get_photo(self) -> InputFile | str:
+        """
+        Returns the forecast image for sending, a new object is needed for each send.
+
+        :return: Telegram file id of the uploaded image, InputFile object with the forecast image or the bot logo.
+        """
+        if self.file_id is not None:
+            return self.file_id
+        if self.image is None:
+            return InputFile(path_or_bytesio=BOT_LOGO)
+        return InputFile(path_or_bytesio=BytesIO(self.image), filename=self.image_name)
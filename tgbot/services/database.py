@@ -1,29 +1,48 @@
 """Model describing the work with the database"""
 
+from asyncio import gather
+from collections.abc import AsyncGenerator
 from datetime import datetime
+from json import dumps, loads
 from typing import Any
 
 # pylint: disable=unused-import
 from asyncpg import Connection, Pool, Record, create_pool
 
-from tgbot.config import load_config
-from tgbot.services.classes import User, UserWeatherSettings
+from tgbot.config import DbPoolParams
+from tgbot.services.classes import CityData, User, UserWeatherSettings
+from tgbot.services.user_cache import UserCache
 
 
-__all__: tuple[str, ...] = ("Database", "User", "database")
+__all__: tuple[str, ...] = ("Database", "User")
+
+
+# Frequent query of the user dialog, it is prepared in advance on each connection
+_GET_USER_QUERY: str = """SELECT dialog_id FROM users WHERE id=$1;"""
+_WARM_UP_QUERIES: tuple[tuple[str, tuple[Any, ...]], ...] = ((_GET_USER_QUERY, (0,)),)
+_CACHED_FIELDS: tuple[str, ...] = ("dialog_id",)
 
 
 class Database:
     """A class for working with the database"""
 
-    def __init__(self, db_dsn: str) -> None:
+    def __init__(self, db_dsn: str, pool_params: DbPoolParams, user_cache: UserCache) -> None:
         """
         Defines the parameters of the database.
 
+        The dialog message ids are read through the cache, which is updated after each change of the users in the
+        database.
+
         :param db_dsn: PgDB connection string.
+        :param pool_params: Parameters of the connection pool.
+        :param user_cache: Cache of the dialog message ids.
         """
         self._db_dsn: str = db_dsn
+        self._pool_params: DbPoolParams = pool_params
+        self._user_cache: UserCache = user_cache
         self._pool: Pool | None = None
+        self._api_counters: dict[tuple[str, str], int] = {}  # Requests not yet saved, by month and API key id
+        self._users_count: int | None = None
 
     async def _get_pool(self) -> Pool:
         """
@@ -33,9 +52,45 @@ class Database:
         """
         if self._pool is None:
             # noinspection PyUnresolvedReferences
-            self._pool = await create_pool(dsn=self._db_dsn, max_size=50)
+            self._pool = await create_pool(
+                dsn=self._db_dsn,
+                min_size=self._pool_params.min_size,
+                max_size=self._pool_params.max_size,
+                max_inactive_connection_lifetime=self._pool_params.max_inactive_connection_lifetime,
+                statement_cache_size=self._pool_params.statement_cache_size,
+            )
         return self._pool
 
+    @staticmethod
+    async def _warm_up(conn: Connection) -> None:
+        """
+        Runs the frequent queries on the connection one after another, a connection runs one operation at a time.
+
+        The statements prepared by asyncpg for the queries stay in the statement cache of the connection, which
+        outlives the connection being released to the pool, so the later queries skip the preparation.
+
+        :param conn: Database connection.
+        :return: None
+        """
+        for query, args in _WARM_UP_QUERIES:
+            await conn.fetchrow(query, *args)
+
+    async def start(self) -> None:
+        """
+        Opens the initial connections of the pool and prepares the frequent queries on each of them.
+
+        It must be called after the tables are created.
+
+        :return: None
+        """
+        pool: Pool = await self._get_pool()
+        connections: list[Connection] = [await pool.acquire() for _ in range(pool.get_min_size())]
+        try:
+            await gather(*(self._warm_up(conn=conn) for conn in connections))
+        finally:
+            for conn in connections:
+                await pool.release(conn)
+
     async def _execute(self, query: str, *args: Any) -> None:
         """
         Executes a command in the database.
@@ -103,85 +158,135 @@ class Database:
             );
         """
         api_request_counters: str = """
-            CREATE TABLE IF NOT EXISTS api_request_counters (
-                month VARCHAR(7) PRIMARY KEY,
-                counter INTEGER NOT NULL DEFAULT 0
+            CREATE TABLE IF NOT EXISTS api_key_request_counters (
+                month VARCHAR(7),
+                key_id VARCHAR(8),
+                counter INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (month, key_id)
+            );
+        """
+        geocoding_cache: str = """
+            CREATE TABLE IF NOT EXISTS geocoding_cache (
+                key TEXT PRIMARY KEY,
+                cities JSONB NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT now()
             );
         """
         await self._execute(query=create_table_users)
         await self._execute(query=api_request_counters)
+        await self._execute(query=geocoding_cache)
 
-    async def save_dialog_id(self, user_id: int, dialog_id: int) -> None:
+    async def _cache_user(self, user_id: int, row: Record | None) -> None:
         """
-        Saves the identifier of the dialog message with the user in the database.
+        Saves the user row returned by the database in the cache.
 
         :param user_id: Telegram user id.
-        :param dialog_id: Last dialogue message id.
+        :param row: User row or None if the user is not in the database.
         :return: None
         """
-        query: str = """
-            INSERT INTO users (id, dialog_id) VALUES ($1, $2)
-            ON CONFLICT (id) DO UPDATE SET dialog_id=excluded.dialog_id;
-        """
-        await self._execute(query, user_id, dialog_id)
+        if row is not None:
+            await self._user_cache.update(user_id=user_id, fields={field: row[field] for field in _CACHED_FIELDS})
 
-    async def save_city_coords(self, user_id: int, city: str, latitude: float, longitude: float) -> None:
+    async def save_dialog_ids(self, dialog_ids: dict[int, int]) -> None:
         """
-        Saves the coordinates of the selected city in the database.
+        Saves the identifiers of the dialog messages with several users in a single query.
 
-        :param user_id: Telegram user id.
-        :param city: Selected city name.
-        :param latitude: Selected city latitude.
-        :param longitude: Selected city longitude.
+        A dialog id is saved only if it is newer than the saved one, so that a message sent by the user dialog in the
+        meantime is not replaced with an older one. Users who are no longer in the database are skipped.
+
+        :param dialog_ids: Last dialogue message ids by Telegram user ids.
         :return: None
         """
-        query: str = """UPDATE users SET city=$1, latitude=$2, longitude=$3 WHERE id=$4;"""
-        await self._execute(query, city, latitude, longitude, user_id)
+        query: str = """
+            UPDATE users SET dialog_id=data.dialog_id
+            FROM unnest($1::bigint[], $2::bigint[]) AS data(id, dialog_id)
+            WHERE users.id=data.id AND users.dialog_id < data.dialog_id
+            RETURNING users.id, users.dialog_id;
+        """
+        rows: list[Record] = await self._fetch(query, list(dialog_ids), list(dialog_ids.values()))
+        await self._user_cache.update_dialog_ids(dialog_ids={row["id"]: row["dialog_id"] for row in rows})
 
-    async def save_user_settings(self, user_id: int, lang_code: str, measure_units: str) -> None:
+    async def save_user(self, user_id: int, dialog_id: int, user_settings: UserWeatherSettings) -> None:
         """
-        Saves the user's weather settings in the database.
+        Saves the user with the complete weather settings in the database in a single query.
 
         :param user_id: Telegram user id.
-        :param lang_code: User language code.
-        :param measure_units: Measurement units ('metric' or 'imperial').
+        :param dialog_id: Last dialogue message id.
+        :param user_settings: User weather settings.
         :return: None
         """
-        query: str = """UPDATE users SET lang=$1, units=$2 WHERE id=$3;"""
-        await self._execute(query, lang_code, measure_units, user_id)
+        query: str = """
+            INSERT INTO users (id, dialog_id, lang, city, latitude, longitude, units) VALUES ($1, $2, $3, $4, $5, $6, $7)
+            ON CONFLICT (id) DO UPDATE SET
+                dialog_id=excluded.dialog_id,
+                lang=excluded.lang,
+                city=excluded.city,
+                latitude=excluded.latitude,
+                longitude=excluded.longitude,
+                units=excluded.units
+            RETURNING (xmax = 0) AS inserted, dialog_id;
+        """
+        row: Record | None = await self._fetchrow(
+            query,
+            user_id,
+            dialog_id,
+            user_settings.lang,
+            user_settings.city,
+            user_settings.latitude,
+            user_settings.longitude,
+            user_settings.units,
+        )
+        await self._cache_user(user_id=user_id, row=row)
+        if row is not None and row["inserted"] and self._users_count is not None:
+            self._users_count += 1
 
     async def get_dialog_id_if_exists(self, user_id: int) -> int | None:
         """
-        Returns the id of the dialog message with the user from the database.
+        Returns the id of the dialog message with the user from the cache or the database.
 
         :param user_id: Telegram user id.
         :return: Last dialogue message id or None.
         """
-        query: str = """SELECT dialog_id FROM users WHERE id=$1;"""
-        row: Record | None = await self._fetchrow(query, user_id)
+        dialog_id: int | None = await self._user_cache.get_dialog_id(user_id=user_id)
+        if dialog_id is not None:
+            return dialog_id
+        row: Record | None = await self._fetchrow(_GET_USER_QUERY, user_id)
+        await self._cache_user(user_id=user_id, row=row)
         return row["dialog_id"] if row else None
 
-    async def get_user_settings(self, user_id: int) -> UserWeatherSettings:
+    async def iter_users(self, chunk_size: int) -> AsyncGenerator[list[User], None]:
         """
-        Returns the user's weather settings.
+        Returns all users who have completed the setup, together with their weather settings, in chunks.
 
-        :param user_id: Telegram user id.
-        :return: User weather settings as UserWeatherSettings object.
-        """
-        query: str = """SELECT lang, city, latitude, longitude, units FROM users WHERE id=$1;"""
-        row: Record = await self._fetchrow(query, user_id)
-        return UserWeatherSettings(
-            lang=row["lang"], city=row["city"], latitude=row["latitude"], longitude=row["longitude"], units=row["units"]
-        )
+        Each chunk is read by a separate query that continues after the last user id of the previous chunk, so a long
+        broadcast neither holds a connection nor keeps a transaction snapshot open, and only one chunk is in memory.
 
-    async def get_list_all_users(self) -> list[User]:
+        :param chunk_size: Number of users in a chunk.
+        :return: Asynchronous generator of lists of users as User objects in the order of their ids.
         """
-        Returns the list of all users.
-
-        :return: List of all bot users as User objects.
-        """
-        query: str = """SELECT id, dialog_id FROM users WHERE units IS NOT NULL;"""
-        return [User(id=row["id"], dialog_id=row["dialog_id"]) for row in await self._fetch(query=query)]
+        query: str = """
+            SELECT id, dialog_id, lang, city, latitude, longitude, units FROM users
+            WHERE units IS NOT NULL AND id > $1 ORDER BY id LIMIT $2;
+        """
+        last_id: int = -(2**63)  # The minimum BIGINT value
+        while rows := await self._fetch(query, last_id, chunk_size):
+            yield [
+                User(
+                    id=row["id"],
+                    dialog_id=row["dialog_id"],
+                    settings=UserWeatherSettings(
+                        lang=row["lang"],
+                        city=row["city"],
+                        latitude=row["latitude"],
+                        longitude=row["longitude"],
+                        units=row["units"],
+                    ),
+                )
+                for row in rows
+            ]
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]["id"]
 
     async def delete_user(self, user_id: int) -> None:
         """
@@ -190,18 +295,60 @@ class Database:
         :param user_id: Telegram user id.
         :return: None
         """
-        query: str = """DELETE FROM users WHERE id=$1;"""
-        await self._execute(query, user_id)
+        query: str = """DELETE FROM users WHERE id=$1 RETURNING id;"""
+        deleted_id: int | None = await self._fetchval(query, user_id)
+        await self._user_cache.delete(user_ids=[user_id])
+        if deleted_id is not None and self._users_count is not None:
+            self._users_count -= 1
+
+    async def delete_users(self, user_ids: list[int]) -> None:
+        """
+        Deletes several users from the database in a single query.
+
+        :param user_ids: Telegram user ids.
+        :return: None
+        """
+        query: str = """DELETE FROM users WHERE id = ANY($1::bigint[]) RETURNING id;"""
+        deleted_ids: list[Record] = await self._fetch(query, user_ids)
+        await self._user_cache.delete(user_ids=user_ids)
+        if self._users_count is not None:
+            self._users_count -= len(deleted_ids)
 
     async def get_number_of_users(self) -> int:
         """
         Returns the number of users in the database.
 
+        The users are counted in the database only once, then the counter is updated when users are added or deleted.
+
         :return: Number of users in the database.
         """
-        query: str = """SELECT COUNT(*) FROM users;"""
-        users_count: int | None = await self._fetchval(query=query)
-        return users_count if users_count is not None else 0
+        if self._users_count is None:
+            query: str = """SELECT COUNT(*) FROM users;"""
+            users_count: int | None = await self._fetchval(query=query)
+            self._users_count = users_count if users_count is not None else 0
+        return self._users_count
+
+    async def migrate_api_counters(self, key_id: str) -> None:
+        """
+        Moves the request counters of the single API token, kept before the key rotation, to the counters by API keys.
+
+        The old table is removed in the same transaction, so the counters are moved only once.
+
+        :param key_id: Identifier of the API key the old counters belong to.
+        :return: None
+        """
+        query: str = """
+            INSERT INTO api_key_request_counters (month, key_id, counter)
+            SELECT month, $1, counter FROM api_request_counters
+            ON CONFLICT (month, key_id) DO UPDATE SET counter=api_key_request_counters.counter+excluded.counter;
+        """
+        pool: Pool = await self._get_pool()
+        async with pool.acquire() as conn:  # type: Connection
+            async with conn.transaction():
+                if await conn.fetchval("""SELECT to_regclass('api_request_counters');""") is None:
+                    return
+                await conn.execute(query, key_id)
+                await conn.execute("""DROP TABLE api_request_counters;""")
 
     async def get_api_counter_value(self) -> int:
         """
@@ -209,21 +356,88 @@ class Database:
 
         :return: Number of requests to OpenWeatherAPI.
         """
-        query: str = """SELECT counter FROM api_request_counters WHERE month=$1;"""
-        requests_count: int | None = await self._fetchval(query, datetime.now().strftime("%Y.%m"))
-        return requests_count if requests_count is not None else 0
+        return sum((await self.get_api_counters()).values())
+
+    async def get_api_counters(self) -> dict[str, int]:
+        """
+        Returns the number of requests to OpenWeatherAPI made by each API key since the beginning of the month.
+
+        :return: Number of requests by API key identifiers.
+        """
+        month: str = datetime.now().strftime("%Y.%m")
+        query: str = """SELECT key_id, counter FROM api_key_request_counters WHERE month=$1;"""
+        rows: list[Record] = await self._fetch(query, month)
+        counters: dict[str, int] = {row["key_id"]: row["counter"] for row in rows}
+        for (counter_month, key_id), counter in self._api_counters.items():
+            if counter_month == month:
+                counters[key_id] = counters.get(key_id, 0) + counter
+        return counters
 
-    async def increase_api_counter(self) -> None:
+    def increase_api_counter(self, key_id: str) -> None:
         """
         Increases OpenWeatherMap API request counter value.
 
+        The counter is kept in memory and saved to the database by flush_api_counters.
+
+        :param key_id: Identifier of the API key used for the request.
         :return: None
         """
+        counter_key: tuple[str, str] = (datetime.now().strftime("%Y.%m"), key_id)
+        self._api_counters[counter_key] = self._api_counters.get(counter_key, 0) + 1
+
+    async def flush_api_counters(self) -> None:
+        """
+        Saves the accumulated OpenWeatherMap API request counters to the database in a single query.
+
+        :return: None
+        """
+        if not self._api_counters:
+            return
+        counters, self._api_counters = self._api_counters, {}
+        query: str = """
+            INSERT INTO api_key_request_counters (month, key_id, counter)
+            SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::integer[])
+            ON CONFLICT (month, key_id) DO UPDATE SET counter=api_key_request_counters.counter+excluded.counter;
+        """
+        try:
+            await self._execute(
+                query,
+                [month for month, _ in counters],
+                [key_id for _, key_id in counters],
+                list(counters.values()),
+            )
+        except Exception:
+            for counter_key, counter in counters.items():  # Return the counters, so they are saved next time
+                self._api_counters[counter_key] = self._api_counters.get(counter_key, 0) + counter
+            raise
+
+    async def get_cached_cities(self, key: str, max_age: float) -> list[CityData] | None:
+        """
+        Returns the saved results of the city search.
+
+        :param key: City search key.
+        :param max_age: Maximum age of the saved results in seconds.
+        :return: List of cities as CityData objects or None if there are no fresh results.
+        """
         query: str = """
-            INSERT INTO api_request_counters (month, counter) VALUES ($1, $2)
-            ON CONFLICT (month) DO UPDATE SET counter=api_request_counters.counter+1;
+            SELECT cities FROM geocoding_cache WHERE key=$1 AND created_at > now() - make_interval(secs => $2);
         """
-        await self._execute(query, datetime.now().strftime("%Y.%m"), 1)
+        cities: str | None = await self._fetchval(query, key, max_age)
+        return [CityData(*city) for city in loads(cities)] if cities is not None else None
+
+    async def save_cached_cities(self, key: str, cities: list[CityData]) -> None:
+        """
+        Saves the results of the city search.
+
+        :param key: City search key.
+        :param cities: List of cities as CityData objects.
+        :return: None
+        """
+        query: str = """
+            INSERT INTO geocoding_cache (key, cities) VALUES ($1, $2::jsonb)
+            ON CONFLICT (key) DO UPDATE SET cities=excluded.cities, created_at=excluded.created_at;
+        """
+        await self._execute(query, key, dumps(cities, ensure_ascii=False))
 
     async def close(self) -> None:
         """
@@ -234,6 +448,3 @@ class Database:
         if self._pool:
             await self._pool.close()
             self._pool = None
-
-
-database: Database = Database(db_dsn=load_config().pg_dsn)
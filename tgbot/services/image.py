@@ -1,260 +1,268 @@
 """Generates an image with weather forecast information"""
 
-from dataclasses import dataclass
-from os import makedirs, path
+from datetime import datetime
+from io import BytesIO
+from os import path
 from pathlib import Path
+from threading import Lock
+from typing import Any, NamedTuple
 
 from PIL import Image, ImageDraw, ImageFont
 
 from tgbot.config import BASE_DIR
-from tgbot.services.classes import ForecastData
+from tgbot.services.cache import CacheStats, LRUCache
+from tgbot.services.classes import FORECAST_ICON_CODES, ForecastData
+from tgbot.services.scales import ScaleColors, get_temp_colors, get_wind_colors
 
-__all__: tuple[str] = ("DrawWeatherImage",)
+__all__: tuple[str, ...] = ("ENCODER_PROFILES", "DrawWeatherImage", "EncoderProfile", "TileCacheStats")
 
 
-@dataclass
-class Cursor:
+class EncoderProfile(NamedTuple):
     """
-    Cursor to draw objects on the canvas in a loop.
+    Parameters of encoding the forecast image into a file.
 
-    :param pos_x: Cursor position on the X-axis.
-    :param pos_y: Cursor position on the Y-axis.
+    :param image_format: Pillow format name.
+    :param file_extension: Extension of the image file.
+    :param mode: Mode to which the image is converted before encoding.
+    :param palette_colors: Number of colors of the palette to which the image is quantized, 0 to keep all colors.
+    :param options: Options of the format encoder.
     """
 
-    pos_x: int = 0
-    pos_y: int = 0
+    image_format: str
+    file_extension: str
+    mode: str
+    palette_colors: int
+    options: dict[str, Any]
 
 
+class TileCacheStats(NamedTuple):
+    """
+    A class describing usage statistics of the forecast columns cache.
+
+    :param cache: Cache statistics.
+    :param memory: Memory taken by the cached columns in bytes.
+    """
+
+    cache: CacheStats
+    memory: int
+
+
+# The forecast image has no transparency, so all profiles except the default one drop the alpha channel
+ENCODER_PROFILES: dict[str, EncoderProfile] = {
+    "png": EncoderProfile(image_format="PNG", file_extension="png", mode="RGBA", palette_colors=0, options={}),
+    "png-fast": EncoderProfile(
+        image_format="PNG", file_extension="png", mode="RGB", palette_colors=0, options={"compress_level": 1}
+    ),
+    "png-palette": EncoderProfile(
+        image_format="PNG", file_extension="png", mode="RGB", palette_colors=256, options={"compress_level": 6}
+    ),
+    "webp-lossless": EncoderProfile(
+        image_format="WEBP",
+        file_extension="webp",
+        mode="RGB",
+        palette_colors=0,
+        options={"lossless": True, "method": 1, "quality": 50},
+    ),
+    "jpeg": EncoderProfile(
+        image_format="JPEG",
+        file_extension="jpg",
+        mode="RGB",
+        palette_colors=0,
+        options={"quality": 90, "subsampling": 0},
+    ),
+}
+
+
+# pylint: disable=too-many-instance-attributes
 class DrawWeatherImage:
     """Draws an image with the weather forecast."""
 
     _ICONS_DIR: Path = Path(BASE_DIR, "tgbot/assets/ico")
     _FONT: Path = Path(BASE_DIR, "tgbot/assets/font/Rubik-Bold.ttf")
-    _TEMP_DIR: Path = Path(BASE_DIR, "tgbot/temp")
+    _TEMP_UNITS: dict[str, str] = {"metric": "°C", "imperial": "°F"}
+    _SPEED_UNITS: dict[str, str] = {"metric": " m/s", "imperial": " mph"}
+    _FONT_SIZES: tuple[int, ...] = (18, 24)
+    _BACKGROUND_COLOR: str = "#262626"
+    _TILE_SIZE: tuple[int, int] = (99, 199)  # Columns are separated by a 1 pixel gap of the background color
 
-    def __init__(self) -> None:
+    def __init__(self, encoder: str = "png", tile_cache_size: int = 500) -> None:
         """
         Initializes the DrawWeatherImage class.
 
         This function initializes the DrawWeatherImage class, which is used to draw an image with the weather
-        forecast. It creates the directory for temporary files if it does not already exist.
+        forecast. It preloads the assets: fonts of all used sizes and weather icons in normal and inverted colors.
+        The drawn forecast columns are cached, since the same columns recur in the forecasts of many users.
+
+        :param encoder: Name of the encoder profile from ENCODER_PROFILES.
+        :param tile_cache_size: Maximum number of cached forecast columns.
+        :raises ValueError: If the encoder profile is unknown.
         """
-        makedirs(name=self._TEMP_DIR, exist_ok=True)
+        if encoder not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown image encoder profile: {encoder}")
+        self._encoder: EncoderProfile = ENCODER_PROFILES[encoder]
+        self._fonts: dict[int, ImageFont.FreeTypeFont] = {
+            size: ImageFont.truetype(font=self._FONT, size=size) for size in self._FONT_SIZES
+        }
+        self._icons: tuple[Image.Image, ...] = tuple(self._load_icon(code=code) for code in FORECAST_ICON_CODES)
+        self._inverted_icons: tuple[Image.Image, ...] = tuple(
+            self._invert_image_color(image=icon) for icon in self._icons
+        )
+        # Offsets of centered texts, the set of texts is small: times, temperatures and wind speeds
+        self._text_offsets: dict[tuple[str, int], int] = {}
+        # Images can be drawn in several threads of the bot process, so the access to the cache is locked
+        self._tiles: LRUCache[Image.Image] = LRUCache(maxsize=tile_cache_size)
+        self._tiles_lock: Lock = Lock()
+        self._backgrounds: dict[int, Image.Image] = {}
 
     # region Auxiliary methods
-    @staticmethod
-    def _get_temp_color(temperature: str) -> str:
+    def _load_icon(self, code: str) -> Image.Image:
         """
-        Returns the color code, depending on the temperature value.
+        Loads the weather icon into memory.
 
-        :param temperature: Temperature value.
-        :return: Temperature color code.
+        :param code: Weather condition icon code.
+        :return: Image.Image object.
         """
-        if temperature[-1:] == "C":
-            temp: int = int(temperature.removesuffix("°C"))
-        else:
-            temp = round((int(temperature.removesuffix("°F")) - 32) * (5 / 9))
-
-        if temp >= 50:
-            temp_color: str = "#2b0001"
-        elif 49 >= temp >= 40:
-            temp_color = "#6b1527"
-        elif 39 >= temp >= 30:
-            temp_color = "#b73466"
-        elif 29 >= temp >= 25:
-            temp_color = "#db6c54"
-        elif 24 >= temp >= 20:
-            temp_color = "#e09f41"
-        elif 19 >= temp >= 15:
-            temp_color = "#e1ce39"
-        elif 14 >= temp >= 10:
-            temp_color = "#b8db41"
-        elif 9 >= temp >= 5:
-            temp_color = "#5ac84b"
-        elif 4 >= temp >= 0:
-            temp_color = "#4db094"
-        elif -1 >= temp >= -5:
-            temp_color = "#4178be"
-        elif -6 >= temp >= -10:
-            temp_color = "#5751ac"
-        elif -11 >= temp >= -15:
-            temp_color = "#291e6a"
-        elif -16 >= temp >= -20:
-            temp_color = "#8e108e"
-        elif -21 >= temp >= -30:
-            temp_color = "#f3a5f3"
-        else:
-            temp_color = "#e3e3e3"
-        return temp_color
+        with Image.open(fp=path.join(self._ICONS_DIR, f"{code}.png"), mode="r", formats=("PNG",)) as icon:
+            return icon.copy()
 
     @staticmethod
-    def _get_wind_color(wind_speed: str) -> str:
+    def _invert_image_color(image: Image.Image) -> Image.Image:
         """
-        Returns the color code, depending on the wind speed value.
+        Inverts the black color in the image.
 
-        :param wind_speed: Wind speed value.
-        :return: Wind speed color code.
+        :param image: Image.Image object.
+        :return: Image.Image object with inverted colors.
         """
-        if wind_speed[-1:] == "s":
-            speed: int = int(wind_speed.removesuffix(" m/s"))
-        else:
-            speed = round(float(wind_speed.removesuffix(" mph")) / 2.237)
-
-        if 0 <= speed <= 9:
-            wind_speed_color: str = "#5a5673"
-        elif 10 <= speed <= 19:
-            wind_speed_color = "#5258ab"
-        elif 20 <= speed <= 29:
-            wind_speed_color = "#4083b8"
-        elif 30 <= speed <= 39:
-            wind_speed_color = "#4ea98f"
-        elif 40 <= speed <= 49:
-            wind_speed_color = "#4abe47"
-        elif 50 <= speed <= 59:
-            wind_speed_color = "#8ec94b"
-        elif 60 <= speed <= 69:
-            wind_speed_color = "#cad63e"
-        elif 70 <= speed <= 79:
-            wind_speed_color = "#d8bf3d"
-        elif 80 <= speed <= 89:
-            wind_speed_color = "#d69b44"
-        elif 90 <= speed <= 99:
-            wind_speed_color = "#d5784c"
-        elif 100 <= speed <= 109:
-            wind_speed_color = "#c7466f"
-        elif 110 <= speed <= 119:
-            wind_speed_color = "#a3355b"
-        elif 120 <= speed <= 129:
-            wind_speed_color = "#901c4f"
-        elif 130 <= speed <= 139:
-            wind_speed_color = "#631a1b"
-        else:
-            wind_speed_color = "#2b0001"
-        return wind_speed_color
+        white_image: Image.Image = Image.new(mode="RGBA", size=image.size, color="#ffffff")
+        white_image.putalpha(alpha=image.getchannel("A"))
+        return white_image
 
-    @staticmethod
-    def _get_color_of_text_temperature(temperature: str) -> str:
-        """
-        Returns the temperature text color code, depending on the temperature value.
+    # endregion
 
-        :param temperature: Temperature value.
-        :return: Temperature text color code.
+    @property
+    def file_extension(self) -> str:
         """
-        if temperature[-1:] == "C":
-            temp: int = int(temperature.removesuffix("°C"))
-        else:
-            temp = round((int(temperature.removesuffix("°F")) - 32) * (5 / 9))
-
-        if 24 >= temp >= 0 or temp <= -21:
-            return "#000000"
-        return "#ffffff"
+        Returns the extension of the image files produced by the encoder profile.
 
-    @staticmethod
-    def _get_color_of_text_wind(wind_speed: str) -> str:
+        :return: File extension.
         """
-        Returns the wind speed text color code, depending on the wind speed value.
+        return self._encoder.file_extension
 
-        :param wind_speed: Wind speed value.
-        :return: Wind speed text color code.
+    def encode_image(self, canvas: Image.Image) -> bytes:
         """
-        if wind_speed[-1:] == "s":
-            speed: int = int(wind_speed.removesuffix(" m/s"))
-        else:
-            speed = round(float(wind_speed.removesuffix(" mph")) / 2.237)
+        Encodes the image with the encoder profile.
 
-        if 99 >= speed >= 40:
-            return "#000000"
-        return "#ffffff"
-
-    @staticmethod
-    def _invert_image_color(image: Image.Image) -> Image.Image:
+        :param canvas: Image.Image object.
+        :return: Encoded image.
         """
-        Inverts the black color in the image.
-
-        :param image: Image.Image object.
-        :return: Image.Image object with inverted colors.
+        image: Image.Image = canvas if canvas.mode == self._encoder.mode else canvas.convert(mode=self._encoder.mode)
+        if self._encoder.palette_colors:
+            image = image.quantize(colors=self._encoder.palette_colors, method=Image.Quantize.FASTOCTREE)
+        buffer: BytesIO = BytesIO()
+        image.save(fp=buffer, format=self._encoder.image_format, **self._encoder.options)
+        return buffer.getvalue()
+
+    def draw_image(self, data: ForecastData) -> bytes:
         """
-        white_image: Image.Image = Image.new(mode="RGBA", size=image.size, color="#ffffff")
-        white_image.putalpha(alpha=image.getchannel("A"))
-        return white_image
+        Draws an image with weather forecast information.
 
-    # endregion
+        :param data: Weather forecast data.
+        :return: Generated image encoded with the encoder profile.
+        """
+        canvas: Image.Image = self.draw_canvas(data=data)
+        image: bytes = self.encode_image(canvas=canvas)
+        canvas.close()
+        return image
 
-    def draw_image(self, data: ForecastData, user_id: int) -> Path:
+    def draw_canvas(self, data: ForecastData) -> Image.Image:
         """
-        Draws an image with weather forecast information.
+        Draws the weather forecast on a new canvas, pasting the forecast columns onto the background.
 
         :param data: Weather forecast data.
-        :param user_id: User id (for generate filename).
-        :return: Path to generated image file.
+        :return: Image.Image object in RGBA mode.
         """
-        cursor: Cursor = Cursor()
-        canvas: Image.Image = Image.new(mode="RGBA", size=(799, 199), color="#262626")
-        draw: ImageDraw.ImageDraw = ImageDraw.Draw(im=canvas)
+        columns: int = len(data.time)
+        background: Image.Image | None = self._backgrounds.get(columns)
+        if background is None:
+            background = Image.new(mode="RGBA", size=(100 * columns - 1, 199), color=self._BACKGROUND_COLOR)
+            self._backgrounds[columns] = background
+        canvas: Image.Image = background.copy()
+        for column, (timestamp, icon, temp, wind_speed) in enumerate(
+            zip(data.time, data.icon, data.temp, data.wind_speed)
+        ):
+            key: tuple[str, int, int, int, str] = (
+                datetime.fromtimestamp(timestamp).strftime("%H:%M"),
+                icon,
+                temp,
+                wind_speed,
+                data.units,
+            )
+            with self._tiles_lock:
+                tile: Image.Image | None = self._tiles.get(key=key)
+            if tile is None:
+                tile = self._draw_tile(key=key)
+                with self._tiles_lock:
+                    self._tiles.set(key=key, value=tile)
+            canvas.paste(im=tile, box=(100 * column, 0))
+        return canvas
+
+    def _draw_tile(self, key: tuple[str, int, int, int, str]) -> Image.Image:
+        """
+        Draws a forecast column.
 
-        temp: list[str] = data.temp
-        time: list[str] = data.time
-        ico_code: list[str] = data.ico_code
-        wind_speed: list[str] = data.wind_speed
+        :param key: Time label, icon index, temperature, wind speed and measurement units of the column.
+        :return: Image.Image object in RGBA mode.
+        """
+        time_label, icon, temp, wind_speed, units = key
+        tile: Image.Image = Image.new(mode="RGBA", size=self._TILE_SIZE, color=self._BACKGROUND_COLOR)
+        draw: ImageDraw.ImageDraw = ImageDraw.Draw(im=tile)
+        is_metric: bool = units == "metric"
 
-        def draw_text_align_center(pos_x: int, pos_y: int, font_size: int, text: str, color: str) -> None:
+        def draw_text_align_center(pos_y: int, font_size: int, text: str, color: str) -> None:
             """
             Draws specified text with center alignment.
 
-            :param pos_x: X-axis position.
             :param pos_y: Y-axis position.
             :param font_size: Font size.
             :param text: Text to output.
             :param color: Text color
             :return: None
             """
-            font: ImageFont.FreeTypeFont = ImageFont.truetype(font=self._FONT, size=font_size)
-            offset: int = round((99 - draw.textlength(text=text, font=font)) / 2)
-            draw.text(xy=(pos_x + offset, pos_y), text=text, font=font, fill=color)
-
-        for idx in range(8):
-            # Fill temperature columns
-            cursor.pos_y = 0
-            draw.rectangle(
-                xy=(cursor.pos_x, cursor.pos_y, cursor.pos_x + 98, cursor.pos_y + 163),
-                fill=self._get_temp_color(temperature=temp[idx]),
-            )
-            # Draw time
-            color_of_text: str = self._get_color_of_text_temperature(temperature=temp[idx])
-            cursor.pos_y = 15
-            draw_text_align_center(
-                pos_x=cursor.pos_x, pos_y=cursor.pos_y, font_size=24, text=time[idx], color=color_of_text
-            )
-            # Draw weather icons
-            cursor.pos_y = 50
-            file_path: str = path.join(self._ICONS_DIR, f"{ico_code[idx]}.png")
-            weather_icon: Image.Image = Image.open(fp=file_path, mode="r", formats=("PNG",))
-            if color_of_text == "#ffffff":
-                weather_icon = self._invert_image_color(image=weather_icon)
-            canvas.alpha_composite(im=weather_icon, dest=(cursor.pos_x + 17, cursor.pos_y))
-            weather_icon.close()
-            # Draw temperature
-            cursor.pos_y = 126
-            draw_text_align_center(
-                pos_x=cursor.pos_x, pos_y=cursor.pos_y, font_size=24, text=temp[idx], color=color_of_text
-            )
-            # Fill wind speed columns
-            cursor.pos_y = 165
-            draw.rectangle(
-                xy=(cursor.pos_x, cursor.pos_y, cursor.pos_x + 98, cursor.pos_y + 34),
-                fill=self._get_wind_color(wind_speed=wind_speed[idx]),
-            )
-            # Draw wind speed
-            color_of_text = self._get_color_of_text_wind(wind_speed=wind_speed[idx])
-            cursor.pos_y = 173
-            draw_text_align_center(
-                pos_x=cursor.pos_x, pos_y=cursor.pos_y, font_size=18, text=wind_speed[idx], color=color_of_text
-            )
-            # Shift to the next column
-            cursor.pos_x += 100
-
-        path_to_image: Path = Path(self._TEMP_DIR, f"{user_id}.png")
-        canvas.save(fp=path_to_image, format="PNG")
-        canvas.close()
+            font: ImageFont.FreeTypeFont = self._fonts[font_size]
+            offset: int | None = self._text_offsets.get((text, font_size))
+            if offset is None:
+                offset = round((99 - draw.textlength(text=text, font=font)) / 2)
+                self._text_offsets[(text, font_size)] = offset
+            draw.text(xy=(offset, pos_y), text=text, font=font, fill=color)
+
+        # Colors are selected by values in Celsius and meters per second
+        temp_colors: ScaleColors = get_temp_colors(temp=temp if is_metric else round((temp - 32) * (5 / 9)))
+        wind_colors: ScaleColors = get_wind_colors(speed=wind_speed if is_metric else round(wind_speed / 2.237))
+        # Fill temperature column
+        draw.rectangle(xy=(0, 0, 98, 163), fill=temp_colors.background)
+        # Draw time
+        draw_text_align_center(pos_y=15, font_size=24, text=time_label, color=temp_colors.text)
+        # Draw weather icon
+        weather_icon: Image.Image = self._inverted_icons[icon] if temp_colors.text == "#ffffff" else self._icons[icon]
+        tile.alpha_composite(im=weather_icon, dest=(17, 50))
+        # Draw temperature
+        draw_text_align_center(pos_y=126, font_size=24, text=f"{temp}{self._TEMP_UNITS[units]}", color=temp_colors.text)
+        # Fill wind speed column
+        draw.rectangle(xy=(0, 165, 98, 199), fill=wind_colors.background)
+        # Draw wind speed
+        draw_text_align_center(
+            pos_y=173, font_size=18, text=f"{wind_speed}{self._SPEED_UNITS[units]}", color=wind_colors.text
+        )
+        return tile
+
+    @property
+    def tile_cache_stats(self) -> TileCacheStats:
+        """
+        Returns usage statistics of the forecast columns cache.
 
-        return path_to_image
+        :return: Statistics as TileCacheStats object.
+        """
+        with self._tiles_lock:
+            stats: CacheStats = self._tiles.stats
+        width, height = self._TILE_SIZE
+        return TileCacheStats(cache=stats, memory=stats.size * width * height * 4)  # 4 bytes per RGBA pixel
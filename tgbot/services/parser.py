@@ -1,9 +1,11 @@
 """Parses raw data on weather with OpenWeatherAPI."""
 
+from array import array
 from datetime import datetime, timedelta, timezone
+from math import log
 
 from tgbot.misc.logger import logger
-from tgbot.services.classes import CityData, CurrentWeatherData, ForecastData
+from tgbot.services.classes import FORECAST_ICON_CODES, CityData, CurrentWeatherData, ForecastData
 
 __all__: tuple[str] = ("ParseWeather",)
 
@@ -39,78 +41,116 @@ class ParseWeather:
             logger.error("Error when parsing city data: %s", ex)
         return None
 
-    # pylint: disable=too-many-locals
     @staticmethod
-    async def parse_current_weather(raw_data: dict) -> CurrentWeatherData | None:
+    def _convert_temperature(celsius: float, units: str) -> int:
+        """
+        Converts the temperature from Celsius to the user's measurement units.
+
+        :param celsius: Temperature in Celsius.
+        :param units: Measurement units ('metric' or 'imperial').
+        :return: Rounded temperature in Celsius or Fahrenheit.
+        """
+        return round(celsius if units == "metric" else celsius * 9 / 5 + 32)
+
+    @staticmethod
+    def _convert_speed(meters_per_second: float, units: str) -> int:
+        """
+        Converts the speed from meters per second to the user's measurement units.
+
+        :param meters_per_second: Speed in meters per second.
+        :param units: Measurement units ('metric' or 'imperial').
+        :return: Rounded speed in meters per second or miles per hour.
+        """
+        return round(meters_per_second if units == "metric" else meters_per_second * 2.237)
+
+    @staticmethod
+    def _calculate_dew_point(temp: float, humidity: int) -> float:
+        """
+        Calculates the surface temperature at which condensation occurs (dew point).
+
+        :param temp: Temperature in Celsius.
+        :param humidity: Humidity.
+        :return: Dew point in Celsius.
+        """
+        const_a: float = 17.27
+        const_b: float = 237.7
+        gamma: float = (const_a * temp) / (const_b + temp) + log(humidity / 100)
+        return (const_b * gamma) / (const_a - gamma)
+
+    # pylint: disable=too-many-locals
+    async def parse_current_weather(self, raw_data: dict, units: str) -> CurrentWeatherData | None:
         """
         Parses current weather data from OpenWeatherAPI response.
 
-        :param raw_data: Raw weather data from OpenWeatherAPI.
+        :param raw_data: Raw weather data in metric units from OpenWeatherAPI.
+        :param units: Measurement units ('metric' or 'imperial')
         :return: Parsed weather data as CurrentWeatherData object or None in case of error.
         """
         try:
-            temp: int = round(raw_data["main"]["temp"])
-            feels_like: int = round(raw_data["main"]["feels_like"])
+            temp: float = raw_data["main"]["temp"]
+            feels_like: float = raw_data["main"]["feels_like"]
             weather_code: int = raw_data["weather"][0]["id"]
             weather_description: str = raw_data["weather"][0]["description"]
-            wind_speed: int = round(raw_data["wind"]["speed"])
-            gust: int | None = round(raw_data["wind"]["gust"]) if raw_data["wind"].get("gust") else None
+            wind_speed: float = raw_data["wind"]["speed"]
+            gust: float | None = raw_data["wind"].get("gust")
             humidity: int = raw_data["main"]["humidity"]
             pressure: int = raw_data["main"]["pressure"]
-            visibility: float | None = round(raw_data["visibility"] / 1000, 1) if raw_data.get("visibility") else None
+            visibility: float | None = raw_data["visibility"] / 1000 if raw_data.get("visibility") else None
             if raw_data.get("snow"):
                 precipitation: float | None = raw_data["snow"]["1h"]
             elif raw_data.get("rain"):
                 precipitation = raw_data["rain"]["1h"]
             else:
                 precipitation = None
+            if units != "metric":  # Distances are converted to miles and precipitation to inches
+                visibility = visibility / 1.609 if visibility else None
+                precipitation = round(precipitation / 25.4, 2) if precipitation else None
             # Calculation of sunrise and sunset times for the requested city based on the local time of that city
             city_timezone: timezone = timezone(timedelta(seconds=raw_data["timezone"]))
             dt_object: datetime = datetime.fromtimestamp(raw_data["dt"], city_timezone)
             sunrise_object: datetime = datetime.fromtimestamp(raw_data["sys"]["sunrise"], city_timezone)
             sunset_object: datetime = datetime.fromtimestamp(raw_data["sys"]["sunset"], city_timezone)
-            time: str = dt_object.strftime("%d %b %H:%M")
-            sunrise: str = sunrise_object.strftime("%H:%M")
-            sunset: str = sunset_object.strftime("%H:%M")
             return CurrentWeatherData(
-                temp=temp,
-                feels_like=feels_like,
+                temp=self._convert_temperature(celsius=temp, units=units),
+                feels_like=self._convert_temperature(celsius=feels_like, units=units),
                 weather_code=weather_code,
                 weather_description=weather_description,
-                wind_speed=wind_speed,
-                gust=gust,
+                wind_speed=self._convert_speed(meters_per_second=wind_speed, units=units),
+                gust=self._convert_speed(meters_per_second=gust, units=units) if gust else None,
                 humidity=humidity,
+                dew_point=self._convert_temperature(
+                    celsius=self._calculate_dew_point(temp=temp, humidity=humidity), units=units
+                ),
                 pressure=pressure,
-                visibility=visibility,
+                visibility=round(visibility, 1) if visibility else None,
                 precipitation=precipitation,
-                time=time,
-                sunrise=sunrise,
-                sunset=sunset,
+                time=dt_object.strftime("%d %b %H:%M"),
+                sunrise=sunrise_object.strftime("%H:%M"),
+                sunset=sunset_object.strftime("%H:%M"),
             )
         except KeyError as ex:
             logger.error("Error when parsing current weather data: %s", ex)
         return None
 
-    @staticmethod
-    async def parse_weather_forecast(raw_data: dict, units: str) -> ForecastData | None:
+    async def parse_weather_forecast(self, raw_data: dict, units: str) -> ForecastData | None:
         """
         Parses weather forecast data from OpenWeatherAPI response.
 
-        :param raw_data: Raw forecast data from OpenWeatherAPI.
+        :param raw_data: Raw forecast data in metric units from OpenWeatherAPI.
         :param units: Measurement units ('metric' or 'imperial')
         :return: Parsed forecast data as ForecastData object or None in case of error.
         """
-        time: list[str] = []
-        ico_code: list[str] = []
-        temp: list[str] = []
-        wind_speed: list[str] = []
+        time: array = array("q")
+        icon: array = array("B")
+        temp: array = array("h")
+        wind_speed: array = array("h")
         try:
             for item in raw_data["list"]:
-                time.append(datetime.fromtimestamp(item["dt"]).strftime("%H:%M"))
-                ico_code.append(item["weather"][0]["icon"])
-                temp.append(f"{round(item['main']['temp'])}{'°C' if units == 'metric' else '°F'}")
-                wind_speed.append(f"{round(item['wind']['speed'])} {'m/s' if units == 'metric' else 'mph'}")
-            return ForecastData(time=time, ico_code=ico_code, temp=temp, wind_speed=wind_speed)
-        except KeyError as ex:
+                time.append(item["dt"])
+                icon.append(FORECAST_ICON_CODES.index(item["weather"][0]["icon"]))
+                temp.append(self._convert_temperature(celsius=item["main"]["temp"], units=units))
+                wind_speed.append(self._convert_speed(meters_per_second=item["wind"]["speed"], units=units))
+            return ForecastData(time=time, icon=icon, temp=temp, wind_speed=wind_speed, units=units)
+        except (KeyError, ValueError) as ex:
             logger.error("Error when parsing weather forecast data: %s", ex)
         return None
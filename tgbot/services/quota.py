@@ -0,0 +1,135 @@
+"""Distribution of requests to the OpenWeatherMap API within the rate limit and the monthly budget."""
+
+from datetime import datetime
+from enum import IntEnum
+from hashlib import sha256
+
+from tgbot.services.ratelimit import TokenBucket
+
+__all__: tuple[str, ...] = ("Priority", "QuotaExceeded", "QuotaGovernor")
+
+
+class Priority(IntEnum):
+    """Priority of a request to the API."""
+
+    INTERACTIVE = 0  # Requests from the user dialog
+    SCHEDULED = 1  # Scheduled weather updates
+
+
+class QuotaExceeded(Exception):
+    """Raised when the request is declined because the budget for its priority has been spent."""
+
+
+class QuotaGovernor:
+    """Rotates requests across API keys, limits their rate and keeps each key within its monthly budget."""
+
+    def __init__(self, tokens: tuple[str, ...], calls_per_minute: int, monthly_budget: int, reserve: float) -> None:
+        """
+        Defines the limits of the API keys.
+
+        :param tokens: OpenWeatherMap API tokens.
+        :param calls_per_minute: Maximum number of requests per minute for one token.
+        :param monthly_budget: Maximum number of requests per month for one token.
+        :param reserve: Share of the rate and budget of each token reserved for interactive requests.
+        """
+        self._tokens: tuple[str, ...] = tokens
+        self._buckets: dict[str, TokenBucket] = {
+            token: TokenBucket(rate=calls_per_minute / 60, capacity=calls_per_minute) for token in tokens
+        }
+        self._monthly_budget: int = monthly_budget
+        self._reserve: float = reserve
+        self._month: str = datetime.now().strftime("%Y.%m")
+        self._usage: dict[str, int] = dict.fromkeys(tokens, 0)
+        self._next_token: int = 0
+
+    @staticmethod
+    def get_key_id(token: str) -> str:
+        """
+        Returns the identifier of the API token, which is safe to store and show.
+
+        :param token: OpenWeatherMap API token.
+        :return: Token identifier.
+        """
+        return sha256(token.encode()).hexdigest()[:8]
+
+    @property
+    def key_ids(self) -> tuple[str, ...]:
+        """
+        Returns the identifiers of the API tokens in the order of the tokens.
+
+        :return: Token identifiers.
+        """
+        return tuple(self.get_key_id(token=token) for token in self._tokens)
+
+    def _roll_over_month(self) -> None:
+        """
+        Resets the usage of the tokens at the beginning of a new month.
+
+        :return: None
+        """
+        month: str = datetime.now().strftime("%Y.%m")
+        if month != self._month:
+            self._month = month
+            self._usage = dict.fromkeys(self._tokens, 0)
+
+    def _select_token(self, priority: Priority) -> str:
+        """
+        Selects the next token that has a budget left for the request priority.
+
+        :param priority: Request priority.
+        :return: OpenWeatherMap API token.
+        :raises QuotaExceeded: If all tokens have spent the budget for the request priority.
+        """
+        budget: float = self._monthly_budget
+        if priority is Priority.SCHEDULED:
+            budget *= 1 - self._reserve
+        for shift in range(len(self._tokens)):
+            token: str = self._tokens[(self._next_token + shift) % len(self._tokens)]
+            if self._usage[token] < budget:
+                self._next_token = (self._next_token + shift + 1) % len(self._tokens)
+                return token
+        raise QuotaExceeded(f"The monthly budget of requests with priority {priority.name} has been spent")
+
+    def load_usage(self, usage: dict[str, int]) -> None:
+        """
+        Sets the number of requests made by the tokens since the beginning of the month.
+
+        :param usage: Number of requests by token identifiers.
+        :return: None
+        """
+        self._roll_over_month()
+        for token in self._tokens:
+            self._usage[token] = usage.get(self.get_key_id(token=token), 0)
+
+    async def acquire(self, priority: Priority) -> str:
+        """
+        Waits for the rate limit and returns the token for the request.
+
+        The request is counted before waiting, so the requests waiting at the same time cannot exceed the budget.
+        A request that is cancelled while waiting is not counted.
+
+        :param priority: Request priority.
+        :return: OpenWeatherMap API token.
+        :raises QuotaExceeded: If the monthly budget for the request priority has been spent.
+        """
+        self._roll_over_month()
+        token: str = self._select_token(priority=priority)
+        month: str = self._month
+        self._usage[token] += 1
+        bucket: TokenBucket = self._buckets[token]
+        try:
+            await bucket.acquire(reserve=0 if priority is Priority.INTERACTIVE else bucket.capacity * self._reserve)
+        except BaseException:
+            if self._month == month:  # The usage of a previous month has already been reset
+                self._usage[token] -= 1
+            raise
+        return token
+
+    @property
+    def total_budget(self) -> int:
+        """
+        Returns the monthly budget of all tokens.
+
+        :return: Maximum number of requests per month.
+        """
+        return self._monthly_budget * len(self._tokens)
@@ -0,0 +1,86 @@
+"""Rate limiting of operations with a token bucket."""
+
+from asyncio import sleep
+from time import monotonic
+
+__all__: tuple[str] = ("TokenBucket",)
+
+
+class TokenBucket:
+    """Limits the rate of operations, tokens are refilled at a constant rate up to the bucket capacity."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Defines the parameters of the bucket, the bucket is initially full.
+
+        :param rate: Number of tokens added per second.
+        :param capacity: Maximum number of tokens in the bucket (the allowed burst).
+        """
+        self._rate: float = rate
+        self._capacity: float = capacity
+        self._tokens: float = capacity
+        self._updated_at: float = monotonic()
+
+    def _refill(self) -> None:
+        """
+        Adds the tokens accumulated since the last update.
+
+        :return: None
+        """
+        now: float = monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def try_acquire(self, reserve: float = 0) -> bool:
+        """
+        Takes a token from the bucket if it is available.
+
+        :param reserve: Number of tokens that must remain in the bucket for other callers.
+        :return: True if the token was taken, otherwise False.
+        """
+        self._refill()
+        if self._tokens - reserve >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, reserve: float = 0) -> None:
+        """
+        Waits until a token is available and takes it.
+
+        Callers with a smaller reserve get tokens first when the bucket is nearly empty.
+
+        :param reserve: Number of tokens that must remain in the bucket for other callers.
+        :return: None
+        """
+        while not self.try_acquire(reserve=reserve):
+            await sleep(delay=(1 + reserve - self._tokens) / self._rate)
+
+    @property
+    def capacity(self) -> float:
+        """
+        Returns the maximum number of tokens in the bucket.
+
+        :return: Bucket capacity.
+        """
+        return self._capacity
+
+    @property
+    def rate(self) -> float:
+        """
+        Returns the number of tokens added per second.
+
+        :return: Refill rate.
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value: float) -> None:
+        """
+        Changes the number of tokens added per second.
+
+        :param value: New refill rate.
+        :return: None
+        """
+        self._refill()
+        self._rate = value
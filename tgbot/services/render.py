@@ -0,0 +1,280 @@
+"""Rendering of weather forecast images with reuse of identical images."""
+
+from asyncio import gather, get_running_loop, to_thread
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
+from math import ceil
+from multiprocessing import get_context
+from os import getpid
+
+from tgbot.config import RenderParams
+from tgbot.misc.logger import logger
+from tgbot.services.cache import CacheStats, LRUCache
+from tgbot.services.classes import ForecastData, ForecastImage
+from tgbot.services.image import ENCODER_PROFILES, DrawWeatherImage, TileCacheStats
+from tgbot.services.singleflight import SingleFlight
+
+__all__: tuple[str] = ("ForecastRenderer",)
+
+
+@cache
+def _get_drawer(encoder: str, tile_cache_size: int) -> DrawWeatherImage:
+    """
+    Returns the drawer of the current process, creating it on the first call (at the start of a rendering process).
+
+    The cache keys the calls by the form of the arguments as well, so the drawer is always requested with positional
+    arguments, as the initializer of the rendering processes does.
+
+    :param encoder: Name of the image encoder profile.
+    :param tile_cache_size: Maximum number of cached forecast columns.
+    :return: DrawWeatherImage object with the preloaded fonts and icons.
+    """
+    return DrawWeatherImage(encoder=encoder, tile_cache_size=tile_cache_size)
+
+
+def _get_process_id() -> int:
+    """
+    Returns the ID of the current process, it is used to start the rendering processes in advance.
+
+    :return: Process ID.
+    """
+    return getpid()
+
+
+def _draw_images(
+    batch: list[ForecastData], encoder: str, tile_cache_size: int
+) -> tuple[int, list[bytes], TileCacheStats]:
+    """
+    Draws a batch of forecast images.
+
+    :param batch: Weather forecast data.
+    :param encoder: Name of the image encoder profile.
+    :param tile_cache_size: Maximum number of cached forecast columns.
+    :return: ID of the rendering process, encoded images in the order of the data and the columns cache statistics.
+    """
+    drawer: DrawWeatherImage = _get_drawer(encoder, tile_cache_size)
+    return getpid(), [drawer.draw_image(data=data) for data in batch], drawer.tile_cache_stats
+
+
+# pylint: disable=too-many-instance-attributes
+class ForecastRenderer:
+    """Draws each distinct forecast once and remembers the Telegram file id of its first upload."""
+
+    def __init__(self, params: RenderParams) -> None:
+        """
+        Initializes the caches of images and file ids, the images are keyed by the hash of the forecast data.
+
+        :param params: Rendering parameters.
+        :raises ValueError: If the image encoder profile is unknown.
+        """
+        if params.encoder not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown image encoder profile: {params.encoder}")
+        self._workers: int = params.workers
+        self._encoder: str = params.encoder
+        self._tile_cache_size: int = params.tile_cache_size
+        self._tile_stats: dict[int, TileCacheStats] = {}  # The latest statistics of each rendering process
+        self._pool: ProcessPoolExecutor | None = None
+        self._images: LRUCache[bytes] = LRUCache(maxsize=params.image_cache.maxsize, ttl=params.image_cache.ttl)
+        self._file_ids: LRUCache[str] = LRUCache(maxsize=params.image_cache.maxsize, ttl=params.image_cache.ttl)
+        self._renders_in_flight: SingleFlight[dict[str, bytes]] = SingleFlight()
+
+    async def start(self) -> None:
+        """
+        Starts the rendering processes, each of them preloads the fonts and icons.
+
+        Without rendering processes the images are drawn in a thread of the bot process.
+
+        :return: None
+        """
+        if self._workers <= 0:
+            await to_thread(_get_drawer, self._encoder, self._tile_cache_size)
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self._workers,
+            mp_context=get_context("spawn"),
+            initializer=_get_drawer,
+            initargs=(self._encoder, self._tile_cache_size),
+        )
+        loop = get_running_loop()
+        await gather(*(loop.run_in_executor(self._pool, _get_process_id) for _ in range(self._workers)))
+
+    def close(self) -> None:
+        """
+        Stops the rendering processes and drops the statistics of their caches.
+
+        :return: None
+        """
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._tile_stats.clear()  # The restarted processes have other ids and empty caches
+
+    async def _draw_in_pool(
+        self, pool: ProcessPoolExecutor, jobs: dict[str, ForecastData], batches: list[list[str]]
+    ) -> list[tuple[int, list[bytes], TileCacheStats]]:
+        """
+        Draws the batches of forecast images in the rendering processes.
+
+        :param pool: Pool of the rendering processes.
+        :param jobs: Weather forecast data by content hashes.
+        :param batches: Content hashes of the images drawn by each process.
+        :return: Results of the batches in their order.
+        """
+        loop = get_running_loop()
+        return await gather(
+            *(
+                loop.run_in_executor(
+                    pool, _draw_images, [jobs[image_id] for image_id in batch], self._encoder, self._tile_cache_size
+                )
+                for batch in batches
+            )
+        )
+
+    async def _render(self, jobs: dict[str, ForecastData]) -> dict[str, bytes]:
+        """
+        Draws the forecast images, splitting them into one batch per rendering process, and caches them.
+
+        :param jobs: Weather forecast data by content hashes.
+        :return: Encoded images by content hashes.
+        """
+        image_ids: list[str] = list(jobs)
+        pool: ProcessPoolExecutor | None = self._pool
+        if pool is None:
+            batches: list[list[str]] = [image_ids]
+            results: list[tuple[int, list[bytes], TileCacheStats]] = [
+                await to_thread(
+                    _draw_images, [jobs[image_id] for image_id in image_ids], self._encoder, self._tile_cache_size
+                )
+            ]
+        else:
+            batch_size: int = ceil(len(image_ids) / self._workers)
+            batches = [image_ids[idx : idx + batch_size] for idx in range(0, len(image_ids), batch_size)]
+            try:
+                results = await self._draw_in_pool(pool=pool, jobs=jobs, batches=batches)
+            except BrokenProcessPool:
+                if self._pool is pool:  # The pool has not been restarted by a concurrent rendering yet
+                    logger.error("A rendering process has terminated abruptly, the rendering processes are restarted")
+                    self.close()
+                    await self.start()
+                if self._pool is None:
+                    raise
+                pool = self._pool
+                results = await self._draw_in_pool(pool=pool, jobs=jobs, batches=batches)
+        images: dict[str, bytes] = {}
+        for batch, (process_id, batch_images, tile_stats) in zip(batches, results):
+            if self._pool is pool:  # The statistics of the stopped processes are not kept
+                self._tile_stats[process_id] = tile_stats
+            for image_id, image in zip(batch, batch_images):
+                self._images.set(key=image_id, value=image)
+                images[image_id] = image
+        return images
+
+    def _get_ready_image(self, image_id: str) -> ForecastImage | None:
+        """
+        Returns the uploaded or already drawn forecast image.
+
+        :param image_id: Content hash of the forecast data.
+        :return: Forecast image as ForecastImage object or None if the image has not been drawn.
+        """
+        file_id: str | None = self._file_ids.get(key=image_id)
+        if file_id is not None:
+            return ForecastImage(image_id=image_id, image=None, file_id=file_id)
+        image: bytes | None = self._images.get(key=image_id)
+        if image is not None:
+            return ForecastImage(image_id=image_id, image=image, file_id=None)
+        return None
+
+    async def get_image(self, data: ForecastData) -> ForecastImage:
+        """
+        Returns the forecast image: the file id if the same image has been uploaded, otherwise the drawn image.
+
+        :param data: Weather forecast data.
+        :return: Forecast image as ForecastImage object.
+        """
+        image_id: str = data.content_hash
+        ready_image: ForecastImage | None = self._get_ready_image(image_id=image_id)
+        if ready_image is not None:
+            return ready_image
+        images: dict[str, bytes] = await self._renders_in_flight.do(
+            key=image_id, func=lambda: self._render(jobs={image_id: data})
+        )
+        return ForecastImage(image_id=image_id, image=images[image_id], file_id=None)
+
+    async def get_images(self, batch: list[ForecastData]) -> list[ForecastImage]:
+        """
+        Returns the forecast images, all images that have not been drawn yet are drawn in parallel.
+
+        The images that are already being drawn for other callers are not drawn again.
+
+        :param batch: Weather forecast data.
+        :return: Forecast images as ForecastImage objects in the order of the data.
+        """
+        image_ids: list[str] = [data.content_hash for data in batch]
+        forecast_images: dict[str, ForecastImage] = {}
+        jobs: dict[str, ForecastData] = {}
+        for image_id, data in zip(image_ids, batch):
+            if image_id in forecast_images or image_id in jobs:
+                continue
+            ready_image: ForecastImage | None = self._get_ready_image(image_id=image_id)
+            if ready_image is None:
+                jobs[image_id] = data
+            else:
+                forecast_images[image_id] = ready_image
+        if jobs:
+            # The images drawn in flight for other callers are joined, the others are drawn together
+            rendered: list[dict[str, bytes]] = await self._renders_in_flight.do_many(
+                keys=jobs,
+                func=lambda missing_ids: self._render(jobs={image_id: jobs[image_id] for image_id in missing_ids}),
+            )
+            for images in rendered:
+                for image_id, image in images.items():
+                    if image_id in jobs:
+                        forecast_images[image_id] = ForecastImage(image_id=image_id, image=image, file_id=None)
+        return [forecast_images[image_id] for image_id in image_ids]
+
+    def save_file_id(self, image_id: str, file_id: str) -> None:
+        """
+        Remembers the Telegram file id of the uploaded image, the image itself is no longer needed.
+
+        :param image_id: Content hash of the forecast data.
+        :param file_id: Telegram file id of the uploaded image.
+        :return: None
+        """
+        self._file_ids.set(key=image_id, value=file_id)
+
+    @property
+    def file_extension(self) -> str:
+        """
+        Returns the extension of the image files produced by the encoder profile.
+
+        :return: File extension.
+        """
+        return ENCODER_PROFILES[self._encoder].file_extension
+
+    @property
+    def image_cache_stats(self) -> CacheStats:
+        """
+        Returns usage statistics of the forecast images cache.
+
+        :return: Cache statistics as CacheStats object.
+        """
+        return self._images.stats
+
+    @property
+    def tile_cache_stats(self) -> TileCacheStats:
+        """
+        Returns usage statistics of the forecast columns caches of all rendering processes.
+
+        :return: Statistics as TileCacheStats object.
+        """
+        stats: list[TileCacheStats] = list(self._tile_stats.values())
+        return TileCacheStats(
+            cache=CacheStats(
+                hits=sum(item.cache.hits for item in stats),
+                misses=sum(item.cache.misses for item in stats),
+                size=sum(item.cache.size for item in stats),
+                maxsize=self._tile_cache_size * max(self._workers, 1),
+            ),
+            memory=sum(item.memory for item in stats),
+        )
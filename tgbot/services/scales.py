@@ -0,0 +1,123 @@
+"""Scales for classifying weather values into emoji and colors."""
+
+from typing import NamedTuple
+
+__all__: tuple[str, ...] = ("ScaleColors", "get_temp_colors", "get_weather_emoji", "get_wind_colors")
+
+_BLACK: str = "#000000"
+_WHITE: str = "#ffffff"
+
+
+class ScaleColors(NamedTuple):
+    """
+    A class describing the colors of a scale band.
+
+    :param background: Background color code.
+    :param text: Color code of the text on the background.
+    """
+
+    background: str
+    text: str
+
+
+# Weather emoji by groups of OpenWeatherMap weather condition codes
+_WEATHER_EMOJI: tuple[tuple[str, tuple[int, ...]], ...] = (
+    ("☀", (800,)),  # clear
+    ("🌤", (801,)),  # light clouds
+    ("🌥", (803, 804)),  # clouds
+    ("☁", (802,)),  # scattered clouds
+    ("🌦", (500, 501, 502, 503, 504)),  # rain
+    ("🌧", (300, 301, 302, 310, 311, 312, 313, 314, 321, 520, 521, 522, 531)),  # drizzle
+    ("⛈", (200, 201, 202, 210, 211, 212, 221, 230, 231, 232)),  # thunderstorm
+    ("🌨", (511, 600, 601, 602, 611, 612, 613, 615, 616, 620, 621, 622)),  # snow
+    ("🌫", (701, 711, 721, 731, 741, 751, 761, 762, 771, 781)),  # atmosphere
+)
+_DEFAULT_WEATHER_EMOJI: str = "🌀"
+
+# Temperature bands in Celsius: (minimum, maximum, colors), the values outside the bands are clamped to the edges
+_TEMP_MIN: int = -31
+_TEMP_MAX: int = 50
+_TEMP_BANDS: tuple[tuple[int, int, ScaleColors], ...] = (
+    (_TEMP_MIN, -31, ScaleColors(background="#e3e3e3", text=_BLACK)),
+    (-30, -21, ScaleColors(background="#f3a5f3", text=_BLACK)),
+    (-20, -16, ScaleColors(background="#8e108e", text=_WHITE)),
+    (-15, -11, ScaleColors(background="#291e6a", text=_WHITE)),
+    (-10, -6, ScaleColors(background="#5751ac", text=_WHITE)),
+    (-5, -1, ScaleColors(background="#4178be", text=_WHITE)),
+    (0, 4, ScaleColors(background="#4db094", text=_BLACK)),
+    (5, 9, ScaleColors(background="#5ac84b", text=_BLACK)),
+    (10, 14, ScaleColors(background="#b8db41", text=_BLACK)),
+    (15, 19, ScaleColors(background="#e1ce39", text=_BLACK)),
+    (20, 24, ScaleColors(background="#e09f41", text=_BLACK)),
+    (25, 29, ScaleColors(background="#db6c54", text=_WHITE)),
+    (30, 39, ScaleColors(background="#b73466", text=_WHITE)),
+    (40, 49, ScaleColors(background="#6b1527", text=_WHITE)),
+    (50, _TEMP_MAX, ScaleColors(background="#2b0001", text=_WHITE)),
+)
+
+# Wind speed bands in meters per second: (minimum, maximum, colors), the values outside the bands use the last band
+_WIND_MAX: int = 140
+_WIND_BANDS: tuple[tuple[int, int, ScaleColors], ...] = (
+    (0, 9, ScaleColors(background="#5a5673", text=_WHITE)),
+    (10, 19, ScaleColors(background="#5258ab", text=_WHITE)),
+    (20, 29, ScaleColors(background="#4083b8", text=_WHITE)),
+    (30, 39, ScaleColors(background="#4ea98f", text=_WHITE)),
+    (40, 49, ScaleColors(background="#4abe47", text=_BLACK)),
+    (50, 59, ScaleColors(background="#8ec94b", text=_BLACK)),
+    (60, 69, ScaleColors(background="#cad63e", text=_BLACK)),
+    (70, 79, ScaleColors(background="#d8bf3d", text=_BLACK)),
+    (80, 89, ScaleColors(background="#d69b44", text=_BLACK)),
+    (90, 99, ScaleColors(background="#d5784c", text=_BLACK)),
+    (100, 109, ScaleColors(background="#c7466f", text=_WHITE)),
+    (110, 119, ScaleColors(background="#a3355b", text=_WHITE)),
+    (120, 129, ScaleColors(background="#901c4f", text=_WHITE)),
+    (130, 139, ScaleColors(background="#631a1b", text=_WHITE)),
+    (_WIND_MAX, _WIND_MAX, ScaleColors(background="#2b0001", text=_WHITE)),
+)
+
+
+def _build_lookup_table(bands: tuple[tuple[int, int, ScaleColors], ...]) -> tuple[ScaleColors, ...]:
+    """
+    Expands the bands of a scale into a table with an entry for each integer value from the first band to the last.
+
+    :param bands: Consecutive bands of the scale as (minimum, maximum, colors).
+    :return: Colors by value offset from the minimum of the first band.
+    """
+    return tuple(colors for minimum, maximum, colors in bands for _ in range(minimum, maximum + 1))
+
+
+_EMOJI_TABLE: tuple[str, ...] = tuple(
+    next((emoji for emoji, codes in _WEATHER_EMOJI if code in codes), _DEFAULT_WEATHER_EMOJI) for code in range(1000)
+)
+_TEMP_TABLE: tuple[ScaleColors, ...] = _build_lookup_table(bands=_TEMP_BANDS)
+_WIND_TABLE: tuple[ScaleColors, ...] = _build_lookup_table(bands=_WIND_BANDS)
+
+
+def get_weather_emoji(weather_code: int) -> str:
+    """
+    Returns emoji by weather code from OpenWeatherMap.
+
+    :param weather_code: Weather code.
+    :return: Corresponding emoji.
+    """
+    return _EMOJI_TABLE[weather_code] if 0 <= weather_code < len(_EMOJI_TABLE) else _DEFAULT_WEATHER_EMOJI
+
+
+def get_temp_colors(temp: int) -> ScaleColors:
+    """
+    Returns the background and text colors, depending on the temperature value.
+
+    :param temp: Temperature in Celsius.
+    :return: Colors as ScaleColors object.
+    """
+    return _TEMP_TABLE[min(max(temp, _TEMP_MIN), _TEMP_MAX) - _TEMP_MIN]
+
+
+def get_wind_colors(speed: int) -> ScaleColors:
+    """
+    Returns the background and text colors, depending on the wind speed value.
+
+    :param speed: Wind speed in meters per second.
+    :return: Colors as ScaleColors object.
+    """
+    return _WIND_TABLE[speed if 0 <= speed < _WIND_MAX else _WIND_MAX]
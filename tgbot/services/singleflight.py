@@ -0,0 +1,95 @@
+"""Coalescing of identical concurrent calls into a single execution."""
+
+from asyncio import Task, create_task, gather, shield
+from collections.abc import Callable, Coroutine, Hashable, Iterable
+from typing import Any, Generic, TypeVar
+
+__all__: tuple[str] = ("SingleFlight",)
+
+_Key = TypeVar("_Key", bound=Hashable)
+_Result = TypeVar("_Result")
+
+
+class SingleFlight(Generic[_Result]):
+    """Runs only one call per key at a time, all concurrent callers with the same key share its result."""
+
+    def __init__(self) -> None:
+        """Initializes the registry of calls in flight."""
+        self._calls: dict[Hashable, Task[_Result]] = {}
+
+    def _forget(self, key: Hashable, task: Task[_Result]) -> None:
+        """
+        Removes the completed call from the registry.
+
+        :param key: Call key.
+        :param task: Completed call task.
+        :return: None
+        """
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Marks the exception as retrieved, if all callers have already been cancelled
+
+    async def do(self, key: Hashable, func: Callable[[], Coroutine[Any, Any, _Result]]) -> _Result:
+        """
+        Runs the call, or joins the call with the same key that is already in flight.
+
+        The call runs in a separate task, so cancelling one of the callers does not cancel it for the others.
+        An exception raised by the call is propagated to every caller.
+
+        :param key: Call key.
+        :param func: Function that returns the coroutine of the call.
+        :return: Result of the call.
+        """
+        task: Task[_Result] | None = self._calls.get(key)
+        if task is None:
+            task = create_task(func())
+            self._register(key=key, task=task)
+        return await shield(task)
+
+    def _register(self, key: Hashable, task: Task[_Result]) -> None:
+        """
+        Adds the call to the registry until it is completed.
+
+        :param key: Call key.
+        :param task: Call task.
+        :return: None
+        """
+        self._calls[key] = task
+        task.add_done_callback(lambda completed: self._forget(key=key, task=completed))
+
+    async def do_many(
+        self, keys: Iterable[_Key], func: Callable[[list[_Key]], Coroutine[Any, Any, _Result]]
+    ) -> list[_Result]:
+        """
+        Runs a single call for all keys that are not in flight, and joins the calls in flight for the other keys.
+
+        The call made for several keys is in flight for each of them, so a later call with any of these keys joins it.
+
+        :param keys: Call keys.
+        :param func: Function that returns the coroutine of the call for the list of keys.
+        :return: Results of the distinct calls for the keys, the caller picks the results of its keys from them.
+        """
+        tasks: dict[Task[_Result], None] = {}  # Distinct calls in the order of the keys
+        missing_keys: dict[_Key, None] = {}
+        for key in keys:
+            task: Task[_Result] | None = self._calls.get(key)
+            if task is None:
+                missing_keys[key] = None
+            else:
+                tasks[task] = None
+        if missing_keys:
+            new_task: Task[_Result] = create_task(func(list(missing_keys)))
+            for key in missing_keys:
+                self._register(key=key, task=new_task)
+            tasks[new_task] = None
+        return list(await shield(gather(*tasks)))
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Returns the number of calls in flight.
+
+        :return: Number of calls in flight.
+        """
+        return len(self._calls)
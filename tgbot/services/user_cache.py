@@ -0,0 +1,114 @@
+"""Cache of the dialog message ids of the users in Redis."""
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from tgbot.misc.logger import logger
+
+__all__: tuple[str] = ("UserCache",)
+
+
+class UserCache:
+    """
+    Keeps a Redis hash per user with the dialog message id.
+
+    The database remains the source of truth: the cache is filled on reads and updated after writes to the database.
+    Redis errors are logged and treated as cache misses, so the bot keeps working with the database alone.
+    """
+
+    _PREFIX: str = "open_weather_bot_users"
+
+    def __init__(self, redis: Redis, ttl: int) -> None:
+        """
+        Defines the cache parameters.
+
+        :param redis: Redis client.
+        :param ttl: Lifetime of a cached user in seconds.
+        """
+        self._redis: Redis = redis
+        self._ttl: int = ttl
+
+    def _get_key(self, user_id: int) -> str:
+        """
+        Returns the key of the user hash.
+
+        :param user_id: Telegram user id.
+        :return: Redis key.
+        """
+        return f"{self._PREFIX}:{user_id}"
+
+    async def get_dialog_id(self, user_id: int) -> int | None:
+        """
+        Returns the cached id of the dialog message with the user.
+
+        :param user_id: Telegram user id.
+        :return: Last dialogue message id or None if it is not cached.
+        """
+        try:
+            # The commands of redis-py are typed for both clients, synchronous and asynchronous
+            dialog_id: str | None = await self._redis.hget(  # type: ignore[misc]
+                self._get_key(user_id=user_id), "dialog_id"
+            )
+        except RedisError as exc:
+            logger.warning("Failed to get the cached dialog id of user %s: %s", user_id, exc)
+            return None
+        return int(dialog_id) if dialog_id is not None else None
+
+    async def update(self, user_id: int, fields: dict[str, str | int | float | None]) -> None:
+        """
+        Saves the user fields in the cache and prolongs their lifetime.
+
+        The fields without a value are removed from the cache, so the hash never holds outdated values.
+
+        :param user_id: Telegram user id.
+        :param fields: Values of the user fields by their names.
+        :return: None
+        """
+        key: str = self._get_key(user_id=user_id)
+        values: dict[str, str | int | float] = {name: value for name, value in fields.items() if value is not None}
+        empty_fields: list[str] = [name for name, value in fields.items() if value is None]
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                if values:
+                    pipe.hset(key, mapping=values)
+                if empty_fields:
+                    pipe.hdel(key, *empty_fields)
+                pipe.expire(key, self._ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning("Failed to cache user %s, the cached data is removed: %s", user_id, exc)
+            await self.delete(user_ids=[user_id])
+
+    async def update_dialog_ids(self, dialog_ids: dict[int, int]) -> None:
+        """
+        Saves the ids of the dialog messages with several users in the cache.
+
+        :param dialog_ids: Last dialogue message ids by Telegram user ids.
+        :return: None
+        """
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for user_id, dialog_id in dialog_ids.items():
+                    key: str = self._get_key(user_id=user_id)
+                    pipe.hset(key, mapping={"dialog_id": dialog_id})
+                    pipe.expire(key, self._ttl)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning(
+                "Failed to cache the dialog ids of %s users, the cached data is removed: %s", len(dialog_ids), exc
+            )
+            await self.delete(user_ids=list(dialog_ids))
+
+    async def delete(self, user_ids: list[int]) -> None:
+        """
+        Removes the users from the cache.
+
+        :param user_ids: Telegram user ids.
+        :return: None
+        """
+        if not user_ids:
+            return
+        try:
+            await self._redis.delete(*(self._get_key(user_id=user_id) for user_id in user_ids))
+        except RedisError as exc:
+            logger.error("Failed to remove %s users from the cache: %s", len(user_ids), exc)
@@ -1,60 +1,301 @@
 """Module for getting weather information."""
 
-from asyncio import to_thread
-from pathlib import Path
+from asyncio import TimeoutError as AsyncTimeoutError, gather, sleep
+from collections.abc import Iterator
+from functools import partial
+from random import uniform
 
 from aiogram.types import Location
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
 
-from tgbot.config import load_config, BOT_LOGO
-from tgbot.middlewares.localization import i18n
+from tgbot.config import CacheParams, HttpClient, RenderParams, WeatherApiKeys
+from tgbot.misc.locale_bundle import LocaleBundle, locale_bundles
 from tgbot.misc.logger import logger
-from tgbot.services.database import database
-from tgbot.services.classes import CityData, CurrentWeatherData, ForecastData, UserWeatherSettings
+from tgbot.services.breaker import CircuitBreaker
+from tgbot.services.cache import CacheStats, LRUCache
+from tgbot.services.database import Database
+from tgbot.services.classes import (
+    CityData,
+    CurrentWeatherData,
+    ForecastData,
+    ForecastImage,
+    UserWeatherSettings,
+    WeatherBundle,
+    WeatherResponse,
+)
 from tgbot.services.formatter import FormatWeather
-from tgbot.services.image import DrawWeatherImage
+from tgbot.services.image import TileCacheStats
 from tgbot.services.parser import ParseWeather
+from tgbot.services.quota import Priority, QuotaExceeded, QuotaGovernor
+from tgbot.services.render import ForecastRenderer
+from tgbot.services.singleflight import SingleFlight
 
-__all__: tuple[str, ...] = ("WeatherAPI", "weather")
-
-_ = i18n.gettext  # Alias for gettext method
+__all__: tuple[str] = ("WeatherAPI",)
 
 
+# pylint: disable=too-many-instance-attributes
 class WeatherAPI:
     """A class for working with the OpenWeatherMap API."""
 
     _GEOCODING_API_URL: str = "https://api.openweathermap.org/geo/1.0"
     _CURRENT_WEATHER_API_URL: str = "https://api.openweathermap.org/data/2.5/weather"
     _WEATHER_FORECAST_API_URL: str = "https://api.openweathermap.org/data/2.5/forecast"
+    _CACHE_GRID_PRECISION: int = 2  # Coordinates are rounded to a cell of 0.01° (about 1 km)
+    _STALE_DATA_MAX_AGE: float = 21600  # The last received data is shown for 6 hours if the API is unavailable
 
-    def __init__(self, token: str) -> None:
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        api_keys: WeatherApiKeys,
+        http_client: HttpClient,
+        weather_cache: CacheParams,
+        geocoding_cache: CacheParams,
+        render: RenderParams,
+        database: Database,
+    ) -> None:
         """
-        Gets OpenWeatherAPI token.
+        Gets OpenWeatherAPI tokens.
 
-        :param token: OpenWeatherAPI token.
+        :param api_keys: OpenWeatherAPI tokens and their limits.
+        :param http_client: Parameters of the HTTP connection pool.
+        :param weather_cache: Parameters of the weather data cache.
+        :param geocoding_cache: Parameters of the city search results cache.
+        :param render: Parameters of the forecast images rendering.
+        :param database: Database that keeps the API request counters and the city search results.
         """
-        self._api_key: str = token
+        self._database: Database = database
+        self._governor: QuotaGovernor = QuotaGovernor(
+            tokens=api_keys.tokens,
+            calls_per_minute=api_keys.calls_per_minute,
+            monthly_budget=api_keys.monthly_budget,
+            reserve=api_keys.reserve,
+        )
+        self._http_client: HttpClient = http_client
+        self._session: ClientSession | None = None
+        self._weather_cache: LRUCache[dict] = LRUCache(maxsize=weather_cache.maxsize, ttl=weather_cache.ttl)
+        self._stale_weather_cache: LRUCache[dict] = LRUCache(
+            maxsize=weather_cache.maxsize, ttl=self._STALE_DATA_MAX_AGE
+        )
+        self._breaker: CircuitBreaker = CircuitBreaker(
+            name="OpenWeatherMap API",
+            failure_threshold=http_client.failure_threshold,
+            recovery_timeout=http_client.recovery_timeout,
+        )
+        self._geocoding_cache: LRUCache[tuple[CityData, ...]] = LRUCache(
+            maxsize=geocoding_cache.maxsize, ttl=geocoding_cache.ttl
+        )
+        self._requests_in_flight: SingleFlight[list | dict | None] = SingleFlight()
         self._formatter: FormatWeather = FormatWeather()
         self._parser: ParseWeather = ParseWeather()
-        self._image: DrawWeatherImage = DrawWeatherImage()
+        self._renderer: ForecastRenderer = ForecastRenderer(params=render)
 
-    @staticmethod
-    async def _get_response_from_api(api_url: str) -> list | dict | None:
+    async def _get_session(self) -> ClientSession:
         """
-        Returns response from OpenWeatherMAp API.
+        Creates and returns a session with a pool of keep-alive connections to the OpenWeatherMap API.
+
+        :return: An instance of aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            connector: TCPConnector = TCPConnector(
+                limit=0,  # The total number of connections is limited only per host
+                limit_per_host=self._http_client.limit_per_host,
+                ttl_dns_cache=self._http_client.dns_cache_ttl,
+                keepalive_timeout=self._http_client.keepalive_timeout,
+            )
+            timeout: ClientTimeout = ClientTimeout(
+                total=self._http_client.total_timeout, connect=self._http_client.connect_timeout
+            )
+            self._session = ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def _send_request(self, api_url: str, priority: Priority) -> list | dict | None:
+        """
+        Sends a single request to the OpenWeatherMap API with the token issued by the quota governor.
+
+        :param api_url: API url without the token.
+        :param priority: Request priority.
+        :return: Raw API response or None if the API rejected the request.
+        :raises QuotaExceeded: If the budget for the request priority has been spent.
+        :raises ClientError: If the API is unavailable or responded with a server error.
+        """
+        token: str = await self._governor.acquire(priority=priority)
+        session: ClientSession = await self._get_session()
+        async with session.get(url=f"{api_url}&appid={token}") as response:
+            self._database.increase_api_counter(key_id=self._governor.get_key_id(token=token))
+            if response.status == 200:
+                result: list | dict = await response.json()
+                return result
+            if response.status >= 500 or response.status == 429:
+                response.raise_for_status()  # Temporary errors, the request can be repeated
+            error: dict = await response.json()
+            logger.error("Error when requesting WeatherGeocodeAPI: %s", error.get("message"))
+            return None
+
+    async def _request_api(self, api_url: str, priority: Priority) -> list | dict | None:
+        """
+        Makes a request to the OpenWeatherMap API, repeating it with a random growing delay in case of failure.
+
+        Requests are not sent while the circuit breaker is open.
 
-        :param api_url: API url.
+        :param api_url: API url without the token.
+        :param priority: Request priority.
         :return: Raw API response or None in case of error.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent.
         """
-        async with ClientSession() as session:
-            async with session.get(url=api_url) as response:
-                await database.increase_api_counter()
-                if response.status == 200:
-                    result: list | dict = await response.json()
-                    return result
-                error: dict = await response.json()
-                logger.error("Error when requesting WeatherGeocodeAPI: %s", error.get("message"))
+        for attempt in range(self._http_client.retries + 1):
+            if attempt:
+                await sleep(delay=uniform(0, self._http_client.retry_backoff * 2**attempt))
+            if not self._breaker.allow_request():
                 return None
+            try:
+                result: list | dict | None = await self._send_request(api_url=api_url, priority=priority)
+            except QuotaExceeded as ex:
+                if priority is Priority.SCHEDULED:
+                    raise
+                logger.error("Request to OpenWeatherMap API declined: %s", ex)
+                return None
+            except (ClientError, AsyncTimeoutError) as ex:  # Before Python 3.11 it is not the built-in TimeoutError
+                logger.error("Error when connecting to OpenWeatherMap API: %s", repr(ex))
+                self._breaker.record_failure()
+                continue
+            self._breaker.record_success()
+            return result
+        return None
+
+    async def _get_response_from_api(self, api_url: str, priority: Priority) -> list | dict | None:
+        """
+        Returns response from OpenWeatherMAp API.
+
+        Concurrent requests with the same url and priority are combined into one request to the API, so interactive
+        requests never wait behind the reserve of scheduled ones or get their QuotaExceeded.
+
+        :param api_url: API url without the token.
+        :param priority: Request priority.
+        :return: Raw API response or None in case of error.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent.
+        """
+        return await self._requests_in_flight.do(
+            key=(priority, api_url), func=partial(self._request_api, api_url=api_url, priority=priority)
+        )
+
+    async def _get_weather_data(
+        self, api_url: str, user_settings: UserWeatherSettings, priority: Priority, extra_params: str = ""
+    ) -> WeatherResponse | None:
+        """
+        Returns weather data for the coordinate grid cell of the user's city from the cache or from the API.
+
+        The data is always requested in metric units and without localization, so that one response serves users
+        with any measurement units and language. If the API is unavailable, the last received data is returned.
+
+        :param api_url: API url without query parameters.
+        :param user_settings: User weather settings.
+        :param priority: Request priority.
+        :param extra_params: Additional query parameters of the API url.
+        :return: API response as WeatherResponse object or None in case of error.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent.
+        """
+        latitude: float = round(user_settings.latitude, self._CACHE_GRID_PRECISION)
+        longitude: float = round(user_settings.longitude, self._CACHE_GRID_PRECISION)
+        cache_key: tuple = (api_url, latitude, longitude)
+        cached_data: dict | None = self._weather_cache.get(key=cache_key)
+        if cached_data is not None:
+            return WeatherResponse(data=cached_data, is_stale=False)
+        raw_data: list | dict | None = await self._get_response_from_api(
+            api_url=f"{api_url}?lat={latitude}&lon={longitude}&units=metric{extra_params}", priority=priority
+        )
+        if isinstance(raw_data, dict):
+            self._weather_cache.set(key=cache_key, value=raw_data)
+            self._stale_weather_cache.set(key=cache_key, value=raw_data)
+            return WeatherResponse(data=raw_data, is_stale=False)
+        stale_data: dict | None = self._stale_weather_cache.get(key=cache_key)
+        return WeatherResponse(data=stale_data, is_stale=True) if stale_data is not None else None
+
+    @property
+    def total_api_budget(self) -> int:
+        """
+        Returns the monthly budget of requests of all API tokens.
+
+        :return: Maximum number of requests per month.
+        """
+        return self._governor.total_budget
+
+    @property
+    def weather_cache_stats(self) -> CacheStats:
+        """
+        Returns usage statistics of the weather data cache.
+
+        :return: Cache statistics as CacheStats object.
+        """
+        return self._weather_cache.stats
+
+    @property
+    def image_cache_stats(self) -> CacheStats:
+        """
+        Returns usage statistics of the forecast images cache.
+
+        :return: Cache statistics as CacheStats object.
+        """
+        return self._renderer.image_cache_stats
+
+    @property
+    def tile_cache_stats(self) -> TileCacheStats:
+        """
+        Returns usage statistics of the forecast columns caches.
+
+        :return: Statistics as TileCacheStats object.
+        """
+        return self._renderer.tile_cache_stats
+
+    def save_image_file_id(self, weather_bundle: WeatherBundle, file_id: str) -> None:
+        """
+        Remembers the Telegram file id of the sent forecast image, so that the other users get it without uploading.
+
+        :param weather_bundle: Sent weather bundle.
+        :param file_id: Telegram file id of the sent photo.
+        :return: None
+        """
+        if weather_bundle.image_id is not None and weather_bundle.file_id is None:
+            self._renderer.save_file_id(image_id=weather_bundle.image_id, file_id=file_id)
+
+    async def start(self) -> None:
+        """
+        Opens the pool of connections to the OpenWeatherMap API, loads the usage of the API tokens and starts
+        the rendering of forecast images.
+
+        :return: None
+        """
+        await self._get_session()
+        # The requests of the single token used before the key rotation are counted for the first token
+        await self._database.migrate_api_counters(key_id=self._governor.key_ids[0])
+        self._governor.load_usage(usage=await self._database.get_api_counters())
+        await self._renderer.start()
+
+    async def close(self) -> None:
+        """
+        Closes the pool of connections to the OpenWeatherMap API and stops the rendering of forecast images.
+
+        :return: None
+        """
+        if self._session:
+            await self._session.close()
+            self._session = None
+        self._renderer.close()
+
+    async def _get_cached_cities(self, cache_key: str) -> list[CityData] | None:
+        """
+        Returns the results of the city search from the in-memory cache or from the database.
+
+        :param cache_key: City search key.
+        :return: List of CityData objects or None if the search results are not cached.
+        """
+        cities: tuple[CityData, ...] | None = self._geocoding_cache.get(key=cache_key)
+        if cities is not None:
+            return list(cities)
+        saved_cities: list[CityData] | None = await self._database.get_cached_cities(
+            key=cache_key, max_age=self._geocoding_cache.ttl or 0
+        )
+        if saved_cities:
+            self._geocoding_cache.set(key=cache_key, value=tuple(saved_cities))
+        return saved_cities
 
     async def get_list_cities(self, city_name_or_location: str | Location, lang_code: str) -> list[CityData] | None:
         """
@@ -65,46 +306,49 @@ class WeatherAPI:
         :return: list of CityData objects or None.
         """
         if isinstance(city_name_or_location, Location):
-            api_url: str = (
-                f"{self._GEOCODING_API_URL}/reverse"
-                f"?lat={city_name_or_location.latitude}&lon={city_name_or_location.longitude}"
-                f"&limit=5&appid={self._api_key}"
-            )
+            latitude: float = round(city_name_or_location.latitude, self._CACHE_GRID_PRECISION)
+            longitude: float = round(city_name_or_location.longitude, self._CACHE_GRID_PRECISION)
+            cache_key: str = f"reverse:{lang_code}:{latitude}:{longitude}"
+            api_url: str = f"{self._GEOCODING_API_URL}/reverse?lat={latitude}&lon={longitude}"
         else:
-            api_url = (
-                f"{self._GEOCODING_API_URL}/direct"
-                f"?q={await self._formatter.correct_user_input(raw_city_name=city_name_or_location)}"
-                f"&limit=5&appid={self._api_key}"
-            )
-        raw_city_data: list | dict | None = await self._get_response_from_api(api_url=api_url)
+            city_name: str = await self._formatter.correct_user_input(raw_city_name=city_name_or_location)
+            cache_key = f"direct:{lang_code}:{' '.join(city_name.casefold().split())}"
+            api_url = f"{self._GEOCODING_API_URL}/direct?q={city_name}"
+        cached_cities: list[CityData] | None = await self._get_cached_cities(cache_key=cache_key)
+        if cached_cities is not None:
+            return cached_cities
+        raw_city_data: list | dict | None = await self._get_response_from_api(
+            api_url=f"{api_url}&limit=5", priority=Priority.INTERACTIVE
+        )
         if isinstance(raw_city_data, list):
             city_list: list[CityData] = []
             for raw_city in raw_city_data:
                 city: CityData | None = await self._parser.parse_city_data(raw_data=raw_city, lang_code=lang_code)
                 if city:
                     city_list.append(city)
+            if city_list:
+                self._geocoding_cache.set(key=cache_key, value=tuple(city_list))
+                await self._database.save_cached_cities(key=cache_key, cities=city_list)
             return city_list
         return None
 
-    async def get_current_weather(self, user_id: int) -> str:
+    async def _get_current_weather(self, user_settings: UserWeatherSettings, priority: Priority) -> str:
         """
         Gets current weather data from the OpenWeatherMap service and outputs them in formatted form.
 
-        :param user_id: Telegram user ID.
+        :param user_settings: User weather settings.
+        :param priority: Request priority.
         :return: Formatted string with a description of the current weather or an error message.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent.
         """
-        user_settings: UserWeatherSettings = await database.get_user_settings(user_id=user_id)
-        api_url: str = (
-            f"{self._CURRENT_WEATHER_API_URL}"
-            f"?lat={user_settings.latitude}"
-            f"&lon={user_settings.longitude}"
-            f"&lang={user_settings.lang}"
-            f"&units={user_settings.units}"
-            f"&appid={self._api_key}"
+        bundle: LocaleBundle = locale_bundles.get(lang_code=user_settings.lang)
+        response: WeatherResponse | None = await self._get_weather_data(
+            api_url=self._CURRENT_WEATHER_API_URL, user_settings=user_settings, priority=priority
         )
-        raw_data: list | dict | None = await self._get_response_from_api(api_url=api_url)
-        if isinstance(raw_data, dict):
-            weather_data: CurrentWeatherData | None = await self._parser.parse_current_weather(raw_data=raw_data)
+        if response:
+            weather_data: CurrentWeatherData | None = await self._parser.parse_current_weather(
+                raw_data=response.data, units=user_settings.units
+            )
             if weather_data:
                 current_weather: str = await self._formatter.format_current_weather(
                     weather_data=weather_data,
@@ -112,38 +356,139 @@ class WeatherAPI:
                     city=user_settings.city,
                     lang_code=user_settings.lang,
                 )
+                if response.is_stale:
+                    current_weather += bundle.weather_captions[user_settings.units].stale_notice.format(
+                        time=weather_data.time
+                    )
                 return current_weather
-        current_weather = "❌ " + _("Failed to obtain data about the current weather.", locale=user_settings.lang)
-        return current_weather
+        return bundle.weather_failed_text
 
-    async def get_weather_forecast(self, user_id: int) -> Path:
+    async def _get_weather_forecast(
+        self, user_settings: UserWeatherSettings, priority: Priority
+    ) -> ForecastData | None:
         """
-        Returns the weather forecast data in the desired form.
+        Returns the weather forecast data for drawing the forecast image.
 
-        :param user_id: Telegram user ID.
-        :return: Path to the generated weather forecast image or bot logo in case of error.
+        :param user_settings: User weather settings.
+        :param priority: Request priority.
+        :return: Parsed forecast data as ForecastData object or None in case of error.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent.
         """
-        user_settings: UserWeatherSettings = await database.get_user_settings(user_id=user_id)
-        api_url: str = (
-            f"{self._WEATHER_FORECAST_API_URL}"
-            f"?lat={user_settings.latitude}"
-            f"&lon={user_settings.longitude}"
-            f"&lang={user_settings.lang}"
-            f"&units={user_settings.units}"
-            "&cnt=8"
-            f"&appid={self._api_key}"
+        response: WeatherResponse | None = await self._get_weather_data(
+            api_url=self._WEATHER_FORECAST_API_URL,
+            user_settings=user_settings,
+            priority=priority,
+            extra_params="&cnt=8",
         )
-        raw_data: list | dict | None = await self._get_response_from_api(api_url=api_url)
-        if isinstance(raw_data, dict):
+        if response:
             weather_forecast_data: ForecastData | None = await self._parser.parse_weather_forecast(
-                raw_data=raw_data, units=user_settings.units
+                raw_data=response.data, units=user_settings.units
             )
-            if weather_forecast_data:
-                forecast_image: Path = await to_thread(
-                    self._image.draw_image, data=weather_forecast_data, user_id=user_id
-                )
-                return forecast_image
-        return BOT_LOGO  # Return bot logo if image generate fails
+            return weather_forecast_data
+        return None
+
+    def _create_weather_bundle(self, caption: str, forecast_image: ForecastImage | None) -> WeatherBundle:
+        """
+        Combines the current weather caption and the forecast image.
+
+        :param caption: Formatted description of the current weather.
+        :param forecast_image: Forecast image as ForecastImage object or None if there is no forecast.
+        :return: WeatherBundle object.
+        """
+        if forecast_image is None:
+            return WeatherBundle(caption=caption, image=None)
+        return WeatherBundle(
+            caption=caption,
+            image=forecast_image.image,
+            image_id=forecast_image.image_id,
+            file_id=forecast_image.file_id,
+            image_name=f"forecast.{self._renderer.file_extension}",
+        )
 
+    async def get_weather_bundle(
+        self, user_settings: UserWeatherSettings, priority: Priority = Priority.INTERACTIVE
+    ) -> WeatherBundle:
+        """
+        Returns the current weather and the weather forecast, requesting them from the API concurrently.
+
+        :param user_settings: User weather settings.
+        :param priority: Request priority.
+        :return: Current weather caption and forecast image as WeatherBundle object.
+        :raises QuotaExceeded: If the budget for scheduled requests has been spent and the data is not cached.
+        """
+        current_weather, weather_forecast = await gather(
+            self._get_current_weather(user_settings=user_settings, priority=priority),
+            self._get_weather_forecast(user_settings=user_settings, priority=priority),
+        )
+        forecast_image: ForecastImage | None = None
+        if weather_forecast:
+            try:
+                forecast_image = await self._renderer.get_image(data=weather_forecast)
+            except Exception as exc:  # The user gets the bot logo with the current weather
+                logger.error("Failed to draw the forecast image: %s", repr(exc))
+        return self._create_weather_bundle(caption=current_weather, forecast_image=forecast_image)
+
+    async def _get_weather_parts(
+        self, user_settings: UserWeatherSettings, priority: Priority
+    ) -> tuple[str, ForecastData | None] | None:
+        """
+        Returns the current weather caption and the forecast data of the user.
+
+        :param user_settings: User weather settings.
+        :param priority: Request priority.
+        :return: Caption and forecast data or None if the budget for the request priority has been spent.
+        """
+        try:
+            current_weather, weather_forecast = await gather(
+                self._get_current_weather(user_settings=user_settings, priority=priority),
+                self._get_weather_forecast(user_settings=user_settings, priority=priority),
+            )
+        except QuotaExceeded:
+            return None
+        except Exception as exc:  # The weather of the other users of the batch is still sent
+            logger.error("Failed to get the weather of %s: %s", user_settings.city, repr(exc))
+            return locale_bundles.get(lang_code=user_settings.lang).weather_failed_text, None
+        return current_weather, weather_forecast
 
-weather: WeatherAPI = WeatherAPI(token=load_config().weather_api.token)
+    async def _draw_forecast_images(self, batch: list[ForecastData]) -> list[ForecastImage | None]:
+        """
+        Returns the forecast images, the users get the bot logo if the images could not be drawn.
+
+        :param batch: Weather forecast data.
+        :return: Forecast images as ForecastImage objects or None in the order of the data.
+        """
+        try:
+            return list(await self._renderer.get_images(batch=batch))
+        except Exception as exc:
+            logger.error("Failed to draw %s forecast images: %s", len(batch), repr(exc))
+            return [None] * len(batch)
+
+    async def get_weather_bundles(
+        self, users_settings: list[UserWeatherSettings], priority: Priority = Priority.SCHEDULED
+    ) -> list[WeatherBundle | None]:
+        """
+        Returns the weather of several users, the forecast images of all users are drawn in one batch.
+
+        :param users_settings: Weather settings of the users.
+        :param priority: Request priority.
+        :return: WeatherBundle objects in the order of the users, None for the users whose data has not been received
+            because the budget for the request priority has been spent.
+        """
+        weather_parts: list[tuple[str, ForecastData | None] | None] = await gather(
+            *(self._get_weather_parts(user_settings=settings, priority=priority) for settings in users_settings)
+        )
+        forecast_images: Iterator[ForecastImage | None] = iter(
+            await self._draw_forecast_images(
+                batch=[parts[1] for parts in weather_parts if parts is not None and parts[1] is not None]
+            )
+        )
+        return [
+            (
+                self._create_weather_bundle(
+                    caption=parts[0], forecast_image=next(forecast_images) if parts[1] is not None else None
+                )
+                if parts is not None
+                else None
+            )
+            for parts in weather_parts
+        ]